@@ -1,3 +1,7 @@
+import collections
+
+from .common import objectDict
+
 ABSATER = 'ABSATER'
 ATTRIB = 'ATTRIB'
 INVATR = 'INVATR'
@@ -17,6 +21,30 @@ ComponentRole = {
     '111': SET
 }
 
+# Bits of a component descriptor, the role is in the 3 most significant bits, then 5 format bits whose meaning depends
+# on the role: type and name for a set, name for an object, label, count, representation code, units and value for
+# an attribute.
+DESC_ROLE_SHIFT = 5
+DESC_LABEL = 0x10
+DESC_COUNT = 0x08
+DESC_REP_CODE = 0x04
+DESC_UNITS = 0x02
+DESC_VALUE = 0x01
+# All the format bits, an attribute without any of them keeps every template default.
+DESC_FORMAT = DESC_LABEL | DESC_COUNT | DESC_REP_CODE | DESC_UNITS | DESC_VALUE
+DESC_SET_TYPE = DESC_LABEL
+DESC_SET_NAME = DESC_COUNT
+DESC_OBJECT_NAME = DESC_LABEL
+
+Descriptor = collections.namedtuple('Descriptor', 'role hasLabel hasCount hasRepCode hasUnits hasValue')
+
+_ROLES = (ABSATER, ATTRIB, INVATR, OBJECT, 'reserved', RDSET, RSET, SET)
+
+# A precomputed descriptor for each of the 256 descriptor bytes.
+DESCRIPTORS = tuple(Descriptor(_ROLES[b >> DESC_ROLE_SHIFT], b & DESC_LABEL != 0, b & DESC_COUNT != 0,
+                               b & DESC_REP_CODE != 0, b & DESC_UNITS != 0, b & DESC_VALUE != 0)
+                    for b in range(256))
+
 """
 -   An EFLR begins with a Set components. Type in Set is mandatory, name is optional. 
     -   A Redundant Set is an identical copy of some Set written previously in the same Logical File, including the Set 
@@ -57,19 +85,26 @@ ComponentRole = {
 
 class Component(object):
     """
-    Represent Component in RP 66, super class for set, object, attribute
+    Represent Component in RP 66, super class for set, object, attribute. Components are slotted since an EFLR may
+    have hundreds of thousands of them.
     """
+    __slots__ = ()
+
     def toJSON(self):
-        return self.__dict__
+        return objectDict(self)
 
 
 class Object(Component):
     """
     Object. Each object only have two things: name and a list of attributes.
     """
+    __slots__ = ('_name', '_attributes', '_template')
+
     def __init__(self):
         self._name = None
         self._attributes= []
+        # The template of the set which this object belongs to, used to find attributes by label.
+        self._template = None
 
     @property
     def name(self):
@@ -83,6 +118,39 @@ class Object(Component):
     def attributes(self):
         return self._attributes
 
+    def getAttr(self, label):
+        """
+        Find an attribute by its label. It is an index lookup with the template of the set, so an attribute at its
+        template position is found in constant time.
+
+        :type label: str
+        :param label: The attribute label.
+
+        :return: The attribute, or None if this object doesn't have it.
+        """
+        attributes = self._attributes
+        if self._template is not None:
+            i = self._template.labelIndex.get(label)
+            if i is not None and i < len(attributes) and attributes[i]._label == label:
+                return attributes[i]
+        for attribute in attributes:
+            if attribute._label == label:
+                return attribute
+        return None
+
+    def getAttrValue(self, label):
+        """
+        :type label: str
+        :param label: The attribute label.
+
+        :return: Value of the attribute, or None if this object doesn't have it.
+        """
+        attribute = self.getAttr(label)
+        return attribute._value if attribute is not None else None
+
+    def toJSON(self):
+        return {k: v for k, v in objectDict(self).items() if k != '_template'}
+
     def __str__(self):
         attrStr = "\n    ".join(map(str, self.attributes))
         return "Object[name:{} with attributes:\n{}]".format(self.name, attrStr)
@@ -92,6 +160,8 @@ class Attribute(Component):
     """
     Represent Attribute in RP66.
     """
+    # _channelValue is only set for an attribute with value in a template.
+    __slots__ = ('_label', '_count', '_repCode', '_units', '_value', '_channelValue')
 
     def __init__(self):
         self._label = ''
@@ -141,6 +211,7 @@ class AbsentAttribute(Attribute):
     """
     Represent Absent Attribute.
     """
+    __slots__ = ()
 
     def __init__(self, attr):
         self._label = attr._label
@@ -153,18 +224,22 @@ class InvariantAttribute(Attribute):
     """
     Represent Invariant attribute.
     """
-    pass
+    __slots__ = ()
 
 class Set(Component):
     """
     Represent set. Set is central piece in EFLR, each set has a name, type and a template which defines attributes each
     of objects should have, then a list of objects.
     """
+    __slots__ = ('_type', '_name', 'template', '_objects', '_loadObjects')
+
     def __init__(self):
         self._type = None
         self._name = None
         self.template = None
-        self.objects = []
+        self._objects = []
+        # Decodes the objects on first access when the set is decoded lazily, None once they are decoded.
+        self._loadObjects = None
 
     @property
     def type(self):
@@ -174,6 +249,49 @@ class Set(Component):
     def name(self):
         return self._name
 
+    @property
+    def objects(self):
+        """
+        :return: The objects of this set, they are decoded now if the set is decoded lazily.
+        """
+        if self._loadObjects is not None:
+            self._objects = self._loadObjects()
+            self._loadObjects = None
+        return self._objects
+
+    @objects.setter
+    def objects(self, objects):
+        self._objects = objects
+        self._loadObjects = None
+
+    @property
+    def isLazy(self):
+        """
+        :return: True if the objects of this set are not decoded yet.
+        """
+        return self._loadObjects is not None
+
+    @property
+    def labelIndex(self):
+        """
+        :return: A dict with key as attribute label and value is its column position in the template.
+        """
+        return self.template.labelIndex if self.template is not None else {}
+
+    def column(self, label):
+        """
+        Get one attribute of all the objects in this set at once.
+
+        :type label: str
+        :param label: The attribute label.
+
+        :return: A list with the value of the attribute for each object, None for an object without it.
+        """
+        return getColumn(self.template, self.objects, label)
+
+    def toJSON(self):
+        return dict(_type=self._type, _name=self._name, template=self.template, objects=self.objects)
+
     def __str__(self):
         return 'Set[type:{} name:{} numOfObjects:{}]'.format(self._type, self._name, len(self.objects))
 
@@ -181,30 +299,72 @@ class RedundantSet(Set):
     """
     Represent Redundant set.
     """
-    pass
+    __slots__ = ()
 
 
 class ReplacementSet(Set):
     """
     Represent replacementset.
     """
-    pass
+    __slots__ = ()
 
 class Template(object):
     """
     Template. Template only contains a list of attribute which should be included in each objects in the same set.
      It is similar to database columns.
     """
+    __slots__ = ('_attrList', '_objectParser', '_labelIndex')
+
     def __init__(self):
         self._attrList = []
+        # The parser compiled from this template, see :class:`.LogicalRecord.ObjectParser`.
+        self._objectParser = None
+        self._labelIndex = None
 
     @property
     def attrList(self):
         return self._attrList
 
+    @property
+    def labelIndex(self):
+        """
+        :return: A dict with key as attribute label and value is its column position, shared by all the objects of
+         the set.
+        """
+        if self._labelIndex is None:
+            labelIndex = {}
+            for i, attr in enumerate(self._attrList):
+                labelIndex.setdefault(attr._label, i)
+            self._labelIndex = labelIndex
+        return self._labelIndex
+
     def __str__(self):
         attrListStr = '\n    '.join(map(str, self._attrList))
         return "Template with attributes [\n{}]".format(attrListStr)
 
     def toJSON(self):
-       return dict(attributeList=self._attrList)
\ No newline at end of file
+       return dict(attributeList=self._attrList)
+
+def getColumn(template, objects, label):
+    """
+    Get one attribute of all the given objects at once.
+
+    :type template: Template
+    :param template: The template of the set which the objects belong to, could be None.
+
+    :param objects: A list of objects.
+
+    :type label: str
+    :param label: The attribute label.
+
+    :return: A list with the value of the attribute for each object, None for an object without it.
+    """
+    i = template.labelIndex.get(label) if template is not None else None
+    values = []
+    for obj in objects:
+        attributes = obj._attributes
+        if i is not None and i < len(attributes) and attributes[i]._label == label:
+            values.append(attributes[i]._value)
+        else:
+            values.append(obj.getAttrValue(label))
+    return values
@@ -0,0 +1,356 @@
+import bisect
+import collections
+import io
+import lzma
+import os
+import zlib
+from struct import Struct
+
+from .common import myLogger
+
+logger = myLogger("CompressedFile")
+
+"""
+Random access to gzip or xz compressed DLIS files. Compressed streams can only be decompressed from the beginning, so
+a seek-point index is kept for each compressed file:
+
+-   gzip: while the file is decompressed forward, a copy of the decompressor state is kept every SPAN bytes of
+    decompressed data, then a seek restarts from the closest copy before the target position.
+
+-   xz: blocks of a xz stream are compressed independently, the position of every block is read from the index at the
+    end of each xz stream. A single block file (default of `xz` without `-T` or `--block-size`) has only one seek
+    point.
+
+The seek-point index is built once and cached by file path, size and mtime, so lazy loading of IFLRs with another
+:class:`CompressedFile` of the same file reuses it.
+"""
+
+GZIP = 'gzip'
+XZ = 'xz'
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+XZ_FOOTER_MAGIC = b'YZ'
+XZ_HEADER_SIZE = 12
+XZ_FOOTER_SIZE = 12
+
+# Size of compressed data fed into the decompressor at a time.
+CHUNK_SIZE = 64 * 1024
+# Distance between two gzip seek points in the decompressed data.
+SPAN = 16 * 1024 * 1024
+# Max number of cached seek-point index.
+MAX_CACHED_INDEX = 16
+
+S_XZ_BACKWARD_SIZE = Struct('<I')
+
+_seekIndexCache = collections.OrderedDict()
+
+
+def compression(path):
+    """
+    Detect the compression of a file from its magic bytes.
+
+    :type path: str
+    :param path: Path to the file.
+
+    :return: 'gzip', 'xz' or None if the file is not compressed.
+    """
+    with open(path, 'rb') as fs:
+        magic = fs.read(len(XZ_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return GZIP
+    if magic == XZ_MAGIC:
+        return XZ
+    return None
+
+
+class _GzipSeekIndex(object):
+    """
+    Seek points of a gzip file. Each seek point is a tuple (decompressed position, compressed position, decompressor)
+    where the decompressor is a copy of zlib decompressor state, or None at the beginning of a gzip member.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.positions = [0]
+        self.points = [(0, 0, None)]
+        self.size = None
+
+    def add(self, pos, compressedPos, decompressor):
+        if pos >= self.positions[-1] + self.span:
+            self.positions.append(pos)
+            self.points.append((pos, compressedPos, decompressor))
+
+    def find(self, pos):
+        """
+        :return: The last seek point before pos.
+        """
+        return self.points[bisect.bisect_right(self.positions, pos) - 1]
+
+
+class _XzSeekIndex(object):
+    """
+    Seek points of a xz file. Each seek point is a tuple (decompressed position, compressed position, stream header,
+    compressed position where the blocks of the stream end), one for each block.
+    """
+
+    def __init__(self, fs, fileSize):
+        streams = []
+        end = fileSize
+        while end > 0:
+            # stream padding is a multiple of 4 null bytes.
+            fs.seek(end - 4)
+            if fs.read(4) == b'\x00\x00\x00\x00':
+                end -= 4
+                continue
+            fs.seek(end - XZ_FOOTER_SIZE)
+            footer = fs.read(XZ_FOOTER_SIZE)
+            if footer[-2:] != XZ_FOOTER_MAGIC:
+                raise Exception('Invalid xz stream footer at position {}'.format(end - XZ_FOOTER_SIZE))
+            indexSize = (S_XZ_BACKWARD_SIZE.unpack_from(footer, 4)[0] + 1) * 4
+            indexPos = end - XZ_FOOTER_SIZE - indexSize
+            fs.seek(indexPos)
+            blocks = _parseXzIndex(fs.read(indexSize))
+            streamPos = indexPos - sum((unpaddedSize + 3) // 4 * 4 for unpaddedSize, _ in blocks) - XZ_HEADER_SIZE
+            fs.seek(streamPos)
+            streamHeader = fs.read(XZ_HEADER_SIZE)
+            if not streamHeader.startswith(XZ_MAGIC):
+                raise Exception('Invalid xz stream header at position {}'.format(streamPos))
+            streams.append((streamPos, streamHeader, indexPos, blocks))
+            end = streamPos
+
+        self.positions = []
+        self.points = []
+        pos = 0
+        for streamPos, streamHeader, indexPos, blocks in reversed(streams):
+            compressedPos = streamPos + XZ_HEADER_SIZE
+            for unpaddedSize, uncompressedSize in blocks:
+                self.positions.append(pos)
+                self.points.append((pos, compressedPos, streamHeader, indexPos))
+                compressedPos += (unpaddedSize + 3) // 4 * 4
+                pos += uncompressedSize
+        self.size = pos
+
+    def find(self, pos):
+        """
+        :return: The last seek point before pos, or None if there is no data.
+        """
+        i = bisect.bisect_right(self.positions, pos) - 1
+        return self.points[max(i, 0)] if len(self.points) > 0 else None
+
+    def next(self, compressedPos):
+        """
+        :return: The first seek point at or after given compressed position, or None.
+        """
+        for point in self.points:
+            if point[1] >= compressedPos:
+                return point
+        return None
+
+
+def _readMultibyte(buf, offset):
+    """
+    Read a xz variable-length integer.
+    """
+    value = 0
+    shift = 0
+    while True:
+        b = buf[offset]
+        offset += 1
+        value |= (b & 0x7F) << shift
+        if b & 0x80 == 0:
+            return value, offset
+        shift += 7
+
+
+def _parseXzIndex(buf):
+    """
+    Parse the index of a xz stream.
+
+    :return: A list of tuples (unpadded size, uncompressed size) for each block.
+    """
+    if buf[0] != 0:
+        raise Exception('Invalid xz index')
+    numOfRecords, offset = _readMultibyte(buf, 1)
+    blocks = []
+    for i in range(numOfRecords):
+        unpaddedSize, offset = _readMultibyte(buf, offset)
+        uncompressedSize, offset = _readMultibyte(buf, offset)
+        blocks.append((unpaddedSize, uncompressedSize))
+    return blocks
+
+
+def _getSeekIndex(path, fs, format, span):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, span)
+    seekIndex = _seekIndexCache.get(key)
+    if seekIndex is None:
+        seekIndex = _GzipSeekIndex(span) if format == GZIP else _XzSeekIndex(fs, stat.st_size)
+        _seekIndexCache[key] = seekIndex
+        while len(_seekIndexCache) > MAX_CACHED_INDEX:
+            _seekIndexCache.popitem(last=False)
+    return seekIndex
+
+
+class CompressedFile(object):
+    """
+    A read-only, seekable file like stream of the decompressed content of a gzip or xz file. A seek jumps to the
+    closest seek point before the target position instead of decompressing from the beginning.
+    """
+
+    def __init__(self, path, span=SPAN):
+        """
+        :type path: str
+        :param path: Path to the gzip or xz file.
+
+        :type span: int
+        :param span: Distance between two gzip seek points in the decompressed data. Each seek point keeps about
+         40KB of decompressor state in memory.
+        """
+        self._format = compression(path)
+        if self._format is None:
+            raise Exception('{} is neither gzip nor xz file'.format(path))
+        self._file = open(path, 'rb')
+        try:
+            self._index = _getSeekIndex(path, self._file, self._format, span)
+        except Exception:
+            self._file.close()
+            raise
+        self._pos = 0
+        self._restore(0)
+
+    @property
+    def size(self):
+        """
+        :return: Size of the decompressed content, None if it is unknown yet.
+        """
+        return self._index.size
+
+    def _restore(self, pos):
+        """
+        Restart decompression from the last seek point before pos.
+        """
+        self._buf = b''
+        point = self._index.find(pos)
+        if self._format == GZIP:
+            self._bufStart, self._compressedPos, decompressor = point
+            self._decompressor = decompressor.copy() if decompressor is not None else None
+            self._compressedEnd = None
+        elif point is None:
+            # empty xz file
+            self._bufStart, self._compressedPos, self._compressedEnd = 0, 0, 0
+            self._decompressor = None
+        else:
+            self._bufStart, self._compressedPos, streamHeader, self._compressedEnd = point
+            self._decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+            self._decompressor.decompress(streamHeader)
+        self._file.seek(self._compressedPos)
+
+    def _fill(self):
+        """
+        Decompress the next chunk, self._buf is replaced by the new decompressed data.
+
+        :return: False if there is no more data.
+        """
+        if self._format == GZIP:
+            out = self._fillGzip()
+        else:
+            out = self._fillXz()
+        if out is None:
+            return False
+        self._bufStart += len(self._buf)
+        self._buf = out
+        return True
+
+    def _fillGzip(self):
+        data = self._file.read(CHUNK_SIZE)
+        if len(data) == 0:
+            if self._decompressor is not None and not self._decompressor.eof:
+                raise Exception('Compressed file ended before the end-of-stream marker was reached')
+            self._index.size = self._bufStart + len(self._buf)
+            return None
+        self._compressedPos += len(data)
+        out = []
+        while len(data) > 0:
+            if self._decompressor is None or self._decompressor.eof:
+                if not data.startswith(GZIP_MAGIC):
+                    # trailing garbage after the last gzip member is ignored, like gzip does.
+                    self._file.seek(0, io.SEEK_END)
+                    self._compressedPos = self._file.tell()
+                    break
+                # start a new gzip member
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            out.append(self._decompressor.decompress(data))
+            data = self._decompressor.unused_data if self._decompressor.eof else b''
+        out = b''.join(out)
+        self._index.add(self._bufStart + len(self._buf) + len(out), self._compressedPos,
+                        self._decompressor.copy() if not self._decompressor.eof else None)
+        return out
+
+    def _fillXz(self):
+        while self._compressedPos >= self._compressedEnd:
+            # move to the next xz stream
+            point = self._index.next(self._compressedEnd + 1)
+            if point is None:
+                return None
+            bufEnd = self._bufStart + len(self._buf)
+            self._restore(point[0])
+            self._bufStart = bufEnd
+            self._buf = b''
+        data = self._file.read(min(CHUNK_SIZE, self._compressedEnd - self._compressedPos))
+        if len(data) == 0:
+            raise Exception('Compressed file ended before the end-of-stream marker was reached')
+        self._compressedPos += len(data)
+        return self._decompressor.decompress(data)
+
+    def read(self, n=-1):
+        result = []
+        remaining = n
+        while n is None or n < 0 or remaining > 0:
+            offset = self._pos - self._bufStart
+            if 0 <= offset < len(self._buf):
+                end = len(self._buf) if n is None or n < 0 else offset + remaining
+                data = self._buf[offset:end]
+                result.append(data)
+                self._pos += len(data)
+                remaining -= len(data)
+            elif not self._fill():
+                break
+        return b''.join(result)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            if self._index.size is None:
+                # decompress everything to know the size
+                self._pos = self._bufStart + len(self._buf)
+                while self._fill():
+                    self._pos = self._bufStart + len(self._buf)
+            pos = self._index.size + offset
+        else:
+            raise ValueError('Invalid whence {}'.format(whence))
+        if pos < 0:
+            raise ValueError('Negative seek position {}'.format(pos))
+        bufEnd = self._bufStart + len(self._buf)
+        if pos < self._bufStart or (pos > bufEnd and self._index.find(pos)[0] > bufEnd):
+            # backward, or there is a seek point closer than current position
+            self._restore(pos)
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
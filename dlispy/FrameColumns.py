@@ -0,0 +1,291 @@
+from array import array
+from collections.abc import Sequence
+
+from .common import myLogger
+from .FrameDecoder import np, NUMPY_DTYPES, STRUCT_FORMATS
+from .LogicalRecord import FrameData
+
+logger = myLogger("FrameColumns")
+
+"""
+Column-wise storage of the FData records of a frame. The values of each channel are kept in one typed buffer, which
+takes the size of its representation code per value instead of a Python object per value.
+"""
+
+# Capacity of the buffers when the number of records is not known.
+INITIAL_CAPACITY = 1024
+# Number of records converted to FrameData at once when iterating over the records.
+CHUNK_SIZE = 4096
+
+
+def _channelShape(channel):
+    """
+    :return: The shape of the values of a channel in one record, by its DIMENSION. () for a single value.
+    """
+    if channel.NumOfValue == 1:
+        return ()
+    dimension = channel.Dimension.value if channel.Dimension is not None else None
+    shape = tuple(dimension) if type(dimension) is list else (dimension,)
+    size = 1
+    for n in shape:
+        size *= n if type(n) is int else 0
+    # a DIMENSION which doesn't match the number of values is flattened
+    return shape if size == channel.NumOfValue else (channel.NumOfValue,)
+
+
+def _newColumn(channel, capacity):
+    """
+    :return: The column for the values of a channel, typed if the channel has a representation code in
+     STRUCT_FORMATS.
+    """
+    if channel.RepCode not in STRUCT_FORMATS or type(channel.NumOfValue) is not int or channel.NumOfValue <= 0:
+        return _ListColumn()
+    if np is None:
+        return _ArrayColumn(STRUCT_FORMATS[channel.RepCode], channel.NumOfValue)
+    return _NumpyColumn(np.dtype(NUMPY_DTYPES[channel.RepCode]).newbyteorder('='), _channelShape(channel), capacity)
+
+
+class FrameColumns(Sequence):
+    """
+    The FData records of a frame stored column-wise, with one growable typed buffer per channel: a NumPy array shaped
+    by the DIMENSION of the channel, or an :class:`array.array` with all the values of a record one after another when
+    NumPy is not available. A channel whose representation code is not a plain number is kept in a list.
+
+    It is a read-only sequence of :class:`.FrameData` like the list of FData records it replaces in
+    :attr:`.LogicalFile.LogicalFile.frameDataDict`, a :class:`.FrameData` is created for each access.
+
+    Attributes:
+        frameName   -   The frame name.
+
+        channels    -   The :class:`.LogicalFile.SimpleChannel` list of the columns.
+    """
+
+    def __init__(self, frameName, channels, capacity = None):
+        """
+        :type frameName: ObName
+        :param frameName: The frame name.
+
+        :param channels: The :class:`.LogicalFile.SimpleChannel` list of the decoded channels of the frame.
+
+        :type capacity: int
+        :param capacity: The number of records, when it is known, so the buffers are allocated only once.
+        """
+        self.frameName = frameName
+        self.channels = channels
+        capacity = capacity or INITIAL_CAPACITY
+        self._size = 0
+        self._frameNumbers = _NumpyColumn(np.dtype('i8'), (), capacity) if np is not None else _ArrayColumn('q', 1)
+        self._columns = [_newColumn(c, capacity) for c in channels]
+        # position -> slots of the records which don't have one slot per channel
+        self._irregular = {}
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        if type(key) is slice:
+            start, stop, step = key.indices(self._size)
+            if step != 1:
+                return [self[position] for position in range(start, stop, step)]
+            return [self._frameData(row) for row in self._rows(start, max(start, stop))]
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError('Record {} out of frame {} with {} records'.format(key, self.frameName, self._size))
+        return self._frameData(self._rows(key, key + 1)[0])
+
+    def __iter__(self):
+        for start in range(0, self._size, CHUNK_SIZE):
+            for row in self._rows(start, min(start + CHUNK_SIZE, self._size)):
+                yield self._frameData(row)
+
+    def __str__(self):
+        return 'FrameColumns[frameName:{} numOfRecords:{}]'.format(self.frameName, self._size)
+
+    @property
+    def frameNumbers(self):
+        """
+        :return: The frame numbers of all the records, a NumPy array or an :class:`array.array`.
+        """
+        return self._frameNumbers.values(self._size)
+
+    @property
+    def columns(self):
+        """
+        :return: A dict with key as channel name and value is the values of this channel in all the records. A
+         NumPy array has one row per record and the shape of the channel DIMENSION for each row, an
+         :class:`array.array` has all the values of a record one after another. Values of a record which doesn't
+         have one slot per channel are not included, see :meth:`__getitem__`.
+        """
+        return {c.ObName: column.values(self._size) for c, column in zip(self.channels, self._columns)}
+
+    def append(self, fData):
+        """
+        Add a record at the end.
+
+        :type fData: FrameData
+        :param fData: The record, a multi-valued channel is a list in its slots.
+
+        :return: None
+        """
+        self._frameNumbers.append(self._size, fData.frameNumber)
+        if len(fData.slots) == len(self._columns):
+            for column, slot in zip(self._columns, fData.slots):
+                column.append(self._size, slot)
+        else:
+            # the values of the record are kept as they are, with empty values in the columns
+            self._irregular[self._size] = fData.slots
+            for column in self._columns:
+                column.appendEmpty(self._size)
+        self._size += 1
+
+    def extendColumns(self, frameNumbers, columns):
+        """
+        Add records at the end in bulk.
+
+        :param frameNumbers: The frame numbers of the records.
+
+        :param columns: A list of arrays, one for each channel, see :meth:`.FrameDecoder.NumpyFrameDecoder.decode` and
+         :meth:`.FrameDecoder.StructFrameDecoder.decode`.
+
+        :return: None
+        """
+        self._frameNumbers.extend(self._size, frameNumbers)
+        for column, values in zip(self._columns, columns):
+            column.extend(self._size, values)
+        self._size += len(frameNumbers)
+
+    def trim(self):
+        """
+        Release the capacity of the buffers which is not used, like when the EoD of the frame is read.
+
+        :return: None
+        """
+        self._frameNumbers.trim(self._size)
+        for column in self._columns:
+            column.trim(self._size)
+
+    def _rows(self, start, stop):
+        """
+        :return: A list of tuples (frame number, slots) of the records from start to stop.
+        """
+        frameNumbers = self._frameNumbers.rows(start, stop)
+        rows = [list(slots) for slots in zip(*[column.rows(start, stop) for column in self._columns])] \
+            if len(self._columns) > 0 else [[] for _ in frameNumbers]
+        return [(frameNumber, self._irregular.get(position, slots))
+                for position, frameNumber, slots in zip(range(start, stop), frameNumbers, rows)]
+
+    def _frameData(self, row):
+        fData = FrameData(row[0], self.frameName)
+        fData.slots = row[1]
+        return fData
+
+
+class _ListColumn(object):
+    """
+    A column of Python values.
+    """
+
+    def __init__(self):
+        self._data = []
+
+    def append(self, size, value):
+        self._data.append(value)
+
+    def appendEmpty(self, size):
+        self._data.append(None)
+
+    def extend(self, size, values):
+        self._data.extend(values.tolist() if hasattr(values, 'tolist') else values)
+
+    def trim(self, size):
+        pass
+
+    def values(self, size):
+        return self._data
+
+    def rows(self, start, stop):
+        return self._data[start:stop]
+
+
+class _ArrayColumn(object):
+    """
+    A column in an :class:`array.array`, with width values per record.
+    """
+
+    def __init__(self, typecode, width):
+        self._data = array(typecode)
+        self._width = width
+
+    def append(self, size, value):
+        if self._width == 1:
+            self._data.append(value)
+        else:
+            self._data.extend(value)
+
+    def appendEmpty(self, size):
+        self._data.extend([0] * self._width)
+
+    def extend(self, size, values):
+        self._data.extend(values.ravel().tolist() if hasattr(values, 'ravel') else values)
+
+    def trim(self, size):
+        # a copy has no over-allocation
+        self._data = array(self._data.typecode, self._data)
+
+    def values(self, size):
+        return self._data
+
+    def rows(self, start, stop):
+        if self._width == 1:
+            return self._data[start:stop].tolist()
+        values = self._data[start * self._width:stop * self._width].tolist()
+        return [values[i:i + self._width] for i in range(0, len(values), self._width)]
+
+
+class _NumpyColumn(object):
+    """
+    A column in a NumPy array with one row per record, whose capacity is doubled when it is full.
+    """
+
+    def __init__(self, dtype, shape, capacity):
+        self._data = np.empty((capacity,) + shape, dtype)
+        self._shape = shape
+
+    def _reserve(self, size):
+        if size <= len(self._data):
+            return
+        data = np.empty((max(size, 2 * len(self._data)),) + self._shape, self._data.dtype)
+        data[:len(self._data)] = self._data
+        self._data = data
+
+    def append(self, size, value):
+        self._reserve(size + 1)
+        if len(self._shape) > 1:
+            # the values of a multi-dimensional channel are flattened in the slots
+            self._data[size] = np.reshape(value, self._shape)
+        else:
+            self._data[size] = value
+
+    def appendEmpty(self, size):
+        self._reserve(size + 1)
+        self._data[size] = 0
+
+    def extend(self, size, values):
+        # the values of a record may be one after another, see StructFrameDecoder.decode
+        values = np.asarray(values).reshape((-1,) + self._shape)
+        self._reserve(size + len(values))
+        self._data[size:size + len(values)] = values
+
+    def trim(self, size):
+        if size < len(self._data):
+            self._data = self._data[:size].copy()
+
+    def values(self, size):
+        return self._data[:size]
+
+    def rows(self, start, stop):
+        data = self._data[start:stop]
+        if len(self._shape) > 1:
+            data = data.reshape(len(data), -1)
+        return data.tolist()
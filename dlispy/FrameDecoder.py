@@ -0,0 +1,221 @@
+from array import array
+from struct import Struct
+
+from .common import myLogger
+from .RCReader import CODECS, decodeOBNAME, decodeUVARI
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = myLogger("FrameDecoder")
+
+"""
+Decoders of the FData records of a frame. All the FData records of a frame have the same layout, which is given by
+the representation codes and dimensions of its channels, so a decoder is compiled once per frame and reused for every
+record of that frame.
+"""
+
+# Representation codes with a fixed size which can be decoded as plain numbers, with their struct format, see
+# :data:`.RCReader.CODECS`.
+STRUCT_FORMATS = {code: codec.format for code, codec in CODECS.items() if codec.format is not None}
+
+# NumPy dtype of the representation codes in STRUCT_FORMATS, all big-endian.
+NUMPY_DTYPES = {2: '>f4',
+                7: '>f8',
+                12: '>i1',
+                13: '>i2',
+                14: '>i4',
+                15: '>u1',
+                16: '>u2',
+                17: '>u4',
+                26: '>u1'}
+
+
+def _validChannel(channel):
+    return channel.RepCode in STRUCT_FORMATS and type(channel.NumOfValue) is int and channel.NumOfValue > 0
+
+
+def channelSize(channel):
+    """
+    :param channel: A :class:`.LogicalFile.SimpleChannel`.
+
+    :return: Size in bytes of the values of the channel in a FData record, None if it has a variable size.
+    """
+    size = CODECS[channel.RepCode].size if channel.RepCode in CODECS else None
+    if size is None or type(channel.NumOfValue) is not int:
+        return None
+    return size * channel.NumOfValue
+
+
+def buildFrameDecoder(channels, selected = None):
+    """
+    Compile the decoder of a frame.
+
+    :param channels: The :class:`.LogicalFile.SimpleChannel` list of the frame.
+
+    :param selected: A list of bool, one for each channel, True if the channel is decoded. Channels which are not
+     selected are skipped by their size. By default, all the channels are decoded.
+
+    :return: A :class:`NumpyFrameDecoder` if NumPy is available, otherwise a :class:`StructFrameDecoder`. None if a
+     selected channel doesn't have a fixed size representation code in STRUCT_FORMATS, or a skipped channel doesn't
+     have a fixed size.
+    """
+    if selected is None:
+        selected = [True] * len(channels)
+    if not any(selected):
+        return None
+    for c, decoded in zip(channels, selected):
+        if not (_validChannel(c) if decoded else channelSize(c) is not None):
+            return None
+    if np is None:
+        return StructFrameDecoder(channels, selected)
+    return NumpyFrameDecoder(channels, selected)
+
+
+def decodeIndexValue(lrBytes, codec):
+    """
+    :param lrBytes: The body of a FData record.
+
+    :param codec: The :class:`.RCReader.Codec` of the index channel, i.e. the first channel of the frame.
+
+    :return: The index value of the FData record.
+    """
+    _, offset = decodeOBNAME(lrBytes, 0)
+    _, offset = decodeUVARI(lrBytes, offset)
+    return codec.decode(lrBytes, offset)[0]
+
+
+class StructFrameDecoder(object):
+    """
+    Decode the channel values of a FData record with a single struct unpack, or of many FData records with
+    :meth:`decode`.
+
+    Attributes:
+        channels    -   The :class:`.LogicalFile.SimpleChannel` list of the decoded channels of the frame.
+
+        struct      -   The compiled struct of the channel values of one FData record.
+
+        itemsize    -   Size of the channel values of one FData record in bytes.
+    """
+
+    def __init__(self, channels, selected = None):
+        """
+        :param channels: The :class:`.LogicalFile.SimpleChannel` list of the frame, all the selected ones must have a
+         representation code in STRUCT_FORMATS, the others must have a fixed size.
+
+        :param selected: A list of bool, one for each channel, True if the channel is decoded, see
+         :func:`buildFrameDecoder`.
+        """
+        if selected is None:
+            selected = [True] * len(channels)
+        self.channels = [c for c, decoded in zip(channels, selected) if decoded]
+        # a skipped channel is pad bytes
+        self.struct = Struct('>' + ''.join('{}{}'.format(c.NumOfValue, STRUCT_FORMATS[c.RepCode]) if decoded
+                                           else '{}x'.format(channelSize(c))
+                                           for c, decoded in zip(channels, selected)))
+        self.itemsize = self.struct.size
+        # (start, number of values) of multi-valued channels in the unpacked tuple, None if there is no such channel.
+        self._layout = None
+        if any(c.NumOfValue > 1 for c in self.channels):
+            self._layout = []
+            start = 0
+            for c in self.channels:
+                self._layout.append((start, c.NumOfValue))
+                start += c.NumOfValue
+
+    def decodeSlots(self, buf, offset=0):
+        """
+        Decode the channel values of one FData record.
+
+        :param buf: The body of the FData record.
+
+        :param offset: Where the channel values start, right after the frame number.
+
+        :return: The slots of the record, a multi-valued channel is a list in the slots.
+        """
+        values = self.struct.unpack_from(buf, offset)
+        if self._layout is None:
+            return list(values)
+        return [values[start] if n == 1 else list(values[start:start + n]) for start, n in self._layout]
+
+    def decode(self, buf):
+        """
+        Decode the channel values of FData records.
+
+        :param buf: The channel values of all the FData records put together, without OBNAME and frame number.
+
+        :return: A list of :class:`array.array`, one for each channel, with the values of all the records one after
+         another.
+        """
+        values = [value for record in self.struct.iter_unpack(buf) for value in record]
+        # number of values of one record
+        width = sum(c.NumOfValue for c in self.channels)
+        columns = []
+        start = 0
+        for c in self.channels:
+            if c.NumOfValue == 1:
+                column = values[start::width]
+            else:
+                column = [value for offset in range(start, len(values), width)
+                          for value in values[offset:offset + c.NumOfValue]]
+            columns.append(array(STRUCT_FORMATS[c.RepCode], column))
+            start += c.NumOfValue
+        return columns
+
+
+class NumpyFrameDecoder(StructFrameDecoder):
+    """
+    Decode the channel values of many FData records at once with a structured NumPy dtype, one field per channel. A
+    single record is still decoded with :meth:`StructFrameDecoder.decodeSlots`.
+
+    Attributes:
+        dtype       -   The NumPy dtype of the channel values of one FData record.
+    """
+
+    def __init__(self, channels, selected = None):
+        """
+        :param channels: The :class:`.LogicalFile.SimpleChannel` list of the frame, all the selected ones must have a
+         representation code in NUMPY_DTYPES, the others must have a fixed size.
+
+        :param selected: A list of bool, one for each channel, True if the channel is decoded, see
+         :func:`buildFrameDecoder`.
+        """
+        super(NumpyFrameDecoder, self).__init__(channels, selected)
+        if selected is None:
+            selected = [True] * len(channels)
+        self._fields = ['c{}'.format(i) for i in range(len(self.channels))]
+        # skipped channels are left out of the dtype by the offsets of the decoded ones
+        offsets = []
+        offset = 0
+        for c, decoded in zip(channels, selected):
+            if decoded:
+                offsets.append(offset)
+            offset += channelSize(c)
+        self.dtype = np.dtype({'names': self._fields,
+                               'formats': [(NUMPY_DTYPES[c.RepCode], (c.NumOfValue,)) if c.NumOfValue > 1
+                                           else NUMPY_DTYPES[c.RepCode] for c in self.channels],
+                               'offsets': offsets,
+                               'itemsize': offset})
+        assert(self.dtype.itemsize == self.itemsize)
+
+    def decode(self, buf):
+        """
+        Decode the channel values of FData records.
+
+        :param buf: The channel values of all the FData records put together, without OBNAME and frame number.
+
+        :return: A list of arrays, one for each channel. An array has one row per record, and one column per value
+         for a multi-valued channel.
+        """
+        records = np.frombuffer(buf, dtype=self.dtype)
+        return [records[field] for field in self._fields]
+
+    def toSlots(self, columns):
+        """
+        Convert channel arrays returned by :meth:`decode` to the slots of each :class:`.FrameData`.
+
+        :return: A list of slots for each record, a multi-valued channel is a list in the slots.
+        """
+        return [list(slots) for slots in zip(*[column.tolist() for column in columns])]
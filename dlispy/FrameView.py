@@ -0,0 +1,187 @@
+import bisect
+from struct import error as StructError
+
+from .common import myLogger
+from .SegmentTable import INDEX_SAMPLE_STEP
+from .FrameDecoder import decodeIndexValue
+from . import RCReader as reader
+
+logger = myLogger("FrameView")
+
+
+class FrameView(object):
+    """
+    A lazy, read-only view of the FData records of a frame, backed by the rows of the records in the segment table,
+    see :attr:`.LogicalFile.LogicalFile.frameIndex`. Only the records which are touched are read and decoded, nothing
+    is kept in :attr:`.LogicalFile.LogicalFile.frameDataDict`.
+
+    Records are indexed by frame number, which increases from one record to the next::
+
+        view = lf.frames[frameName]
+        len(view)           # number of records, without reading anything
+        view[1]             # the record with frame number 1
+        view[100:200]       # the records with frame number from 100 to 199
+        view.at(-1)         # the last record
+        view.between(1000.0, 1050.0)    # the records with index from 1000.0 to 1050.0
+
+    The records are read from the DLIS file the logical file is parsed from, or from the given stream.
+    """
+
+    def __init__(self, lf, frameName, fs = None):
+        """
+        :type lf: LogicalFile
+        :param lf: The logical file parsed with a segment table, i.e. not read forward only.
+
+        :type frameName: ObName
+        :param frameName: The frame name.
+
+        :type fs: FileIO
+        :param fs: File stream of the original DLIS file. By default, the file is opened from the path it is parsed
+         from for each access.
+        """
+        self.frameName = frameName
+        self.fs = fs
+        self._lf = lf
+        self._rows = lf.frameIndex.get(frameName, [])
+        # position -> frame number, only for the records whose frame number has been read.
+        self._frameNumbers = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        with self._stream() as fs:
+            for position in range(len(self._rows)):
+                yield self._decode(position, fs)
+
+    def __getitem__(self, key):
+        """
+        :param key: A frame number, or a slice of frame numbers.
+
+        :return: The :class:`.FrameData` with the frame number, or a list of them for a slice.
+        """
+        with self._stream() as fs:
+            if type(key) is slice:
+                start = 0 if key.start is None else self._bisect(key.start, fs)
+                stop = len(self._rows) if key.stop is None else self._bisect(key.stop, fs)
+                return [self._decode(position, fs) for position in range(start, stop, key.step or 1)]
+            position = self._bisect(key, fs)
+            if position == len(self._rows) or self._frameNumberAt(position, fs) != key:
+                raise KeyError('No frame number {} in frame {}'.format(key, self.frameName))
+            return self._decode(position, fs)
+
+    def at(self, position):
+        """
+        :type position: int
+        :param position: The position of the record in the frame, negative from the end.
+
+        :return: The :class:`.FrameData` at the position.
+        """
+        if position < 0:
+            position += len(self._rows)
+        if not 0 <= position < len(self._rows):
+            raise IndexError('Position {} out of frame {} with {} records'
+                             .format(position, self.frameName, len(self._rows)))
+        with self._stream() as fs:
+            return self._decode(position, fs)
+
+    def between(self, start, stop):
+        """
+        :param start: The index value where the range starts, included.
+
+        :param stop: The index value where the range stops, excluded.
+
+        :return: A list of the :class:`.FrameData` whose index is in the range, see
+         :meth:`.LogicalFile.LogicalFile.read_frames`.
+        """
+        # the index samples and the records are found in the segment table
+        self._lf._checkRandomAccess()
+        if len(self._rows) == 0:
+            return []
+        with self._stream() as fs:
+            samples = self._lf._indexSamples(self.frameName, fs)
+            if samples is None:
+                raise Exception('Frame {} has no numeric index channel'.format(self.frameName))
+            # search a decreasing index as an increasing one
+            sign = -1 if samples[-1] < samples[0] else 1
+            start, stop = sign * start, sign * stop
+            keys = [sign * value for value in samples[:-1]]
+            # samples before lo are all less than start, samples from hi are all greater than or equal to stop
+            lo = max(bisect.bisect_left(keys, start) - 1, 0)
+            hi = bisect.bisect_left(keys, stop)
+            # the index channel may not be decoded into the slots, see LogicalFile.channels
+            codec = reader.getCodec(self._lf._getSimpleChannelsFromFrame(self.frameName)[0].RepCode)
+            fDataList = []
+            for position in range(lo * INDEX_SAMPLE_STEP, min(hi * INDEX_SAMPLE_STEP, len(self._rows))):
+                lrBytes = self._lf._readLrBytesAt(self._rows[position], fs)
+                key = sign * decodeIndexValue(lrBytes, codec)
+                if key >= stop:
+                    break
+                if key >= start:
+                    fDataList.append(self._decodeBytes(position, lrBytes))
+            return fDataList
+
+    @property
+    def frameNumbers(self):
+        """
+        :return: The frame numbers of all the records, only the beginning of each record is read.
+        """
+        with self._stream() as fs:
+            return [self._frameNumberAt(position, fs) for position in range(len(self._rows))]
+
+    def _stream(self):
+        return self._lf._openStream(self.fs)
+
+    def _decode(self, position, fs):
+        return self._decodeBytes(position, self._lf._readLrBytesAt(self._rows[position], fs))
+
+    def _decodeBytes(self, position, lrBytes):
+        fData = self._lf._decodeIFLR(0, lrBytes)
+        if fData is None:
+            raise Exception('FData of frame {} can not be decoded, the frame or its channels are not found, or none '
+                            'of its channels is decoded'.format(self.frameName))
+        self._frameNumbers[position] = fData.frameNumber
+        return fData
+
+    def _frameNumberAt(self, position, fs):
+        frameNumber = self._frameNumbers.get(position)
+        if frameNumber is None:
+            row = self._rows[position]
+            try:
+                lrBytes = self._lf.segTable.readBody(row, fs)
+                frameNumber = reader.decodeUVARI(lrBytes, reader.decodeOBNAME(lrBytes, 0)[1])[0]
+            except (IndexError, StructError):
+                # the frame number is not complete in the first segment
+                lrBytes = self._lf._readLrBytesAt(row, fs)
+                frameNumber = reader.decodeUVARI(lrBytes, reader.decodeOBNAME(lrBytes, 0)[1])[0]
+            self._frameNumbers[position] = frameNumber
+        return frameNumber
+
+    def _bisect(self, frameNumber, fs):
+        """
+        :return: The position of the first record whose frame number is not less than given frame number.
+        """
+        n = len(self._rows)
+        if n == 0:
+            return 0
+        # frame numbers are usually consecutive, so try the direct position first.
+        guess = frameNumber - self._frameNumberAt(0, fs)
+        if 0 <= guess < n and self._frameNumberAt(guess, fs) == frameNumber:
+            return guess
+        return bisect.bisect_left(_FrameNumbers(self, fs), frameNumber)
+
+
+class _FrameNumbers(object):
+    """
+    The frame numbers of a view as a sequence, read on demand by bisect.
+    """
+
+    def __init__(self, view, fs):
+        self._view = view
+        self._fs = fs
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getitem__(self, position):
+        return self._view._frameNumberAt(position, self._fs)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import sys
+from array import array
+from struct import Struct
+
+from .SegmentTable import SegmentTable, INDEX_SAMPLE_STEP
+from .LogicalRecordSegment import EncryptionPacket
+from .common import myLogger, MemoryViewStream
+
+logger = myLogger("IndexFile")
+
+"""
+A sidecar index file (.dlisidx) persists the :class:`.SegmentTable` of a DLIS file, so that the file can be opened
+again without scanning all its Visible Records. The index file includes:
+
+-   Magic bytes and a JSON header. The header has the size, mtime and content hash of the DLIS file which are used to
+    detect a stale index, the number of segments, the encryption packets, the number of rows of each frame and the
+    number of index samples of each sampled frame.
+
+-   The columns of the segment table, the FHLR rows (Logical File boundaries), the FData rows of each frame and the
+    index samples of each sampled frame, all as little-endian arrays.
+"""
+
+INDEX_EXT = '.dlisidx'
+INDEX_MAGIC = b'DLISIDX'
+INDEX_VERSION = 2
+# Number of bytes at the beginning and at the end of the DLIS file included in the content hash.
+HASH_BLOCK_SIZE = 64 * 1024
+
+S_HEADER_LEN = Struct('<I')
+S_ENCRYPT_PKT_HEADER = Struct('>HH')
+
+
+def indexPath(path, index_dir=None):
+    """
+    Where the index of given DLIS file is stored.
+
+    :type path: str
+    :param path: Path to the DLIS file.
+
+    :type index_dir: str
+    :param index_dir: A cache directory for index files. If None, the index is next to the DLIS file.
+
+    :return: Path to the index file.
+    """
+    if index_dir is None:
+        return path + INDEX_EXT
+    pathHash = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(index_dir, '{}-{}{}'.format(os.path.basename(path), pathHash, INDEX_EXT))
+
+
+def _fileKey(path):
+    """
+    :return: A dict which identifies the current content of the DLIS file, including size, mtime and a hash of its
+     first and last blocks.
+    """
+    stat = os.stat(path)
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as fs:
+        sha1.update(fs.read(HASH_BLOCK_SIZE))
+        if stat.st_size > HASH_BLOCK_SIZE:
+            fs.seek(max(HASH_BLOCK_SIZE, stat.st_size - HASH_BLOCK_SIZE))
+            sha1.update(fs.read(HASH_BLOCK_SIZE))
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': sha1.hexdigest()}
+
+
+def _writeArray(outfile, arr):
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    outfile.write(arr.tobytes())
+
+
+def _readArray(buf, offset, typecode, length):
+    arr = array(typecode)
+    end = offset + arr.itemsize * length
+    arr.frombytes(buf[offset:end])
+    if len(arr) != length:
+        raise ValueError('Expect {} items but only {} left'.format(length, len(arr)))
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr, end
+
+
+def saveIndex(path, segTable, index_dir=None):
+    """
+    Write the segment table of a DLIS file into its index file. Failing to write the index is not an error since the
+    index is only a cache.
+
+    :type path: str
+    :param path: Path to the DLIS file.
+
+    :type segTable: SegmentTable
+    :param segTable: The segment table of the DLIS file.
+
+    :type index_dir: str
+    :param index_dir: A cache directory for index files. If None, the index is next to the DLIS file.
+
+    :return: None
+    """
+    output_file = indexPath(path, index_dir)
+    frameKeys = list(segTable.frameRows.keys())
+    header = _fileKey(path)
+    header['version'] = INDEX_VERSION
+    header['numOfSegments'] = len(segTable)
+    header['numOfFhlr'] = len(segTable.fhlrRows)
+    header['encryptPkts'] = {str(row): [pkt.length, pkt.prodCode, bytes(pkt.payload).hex()]
+                             for row, pkt in segTable.encryptPkts.items()}
+    # None key (OBNAME not complete in first segment) is stored as empty string since OBNAME is never empty.
+    header['frames'] = [[key.hex() if key is not None else '', len(segTable.frameRows[key])] for key in frameKeys]
+    sampleKeys = list(segTable.indexSamples.keys())
+    header['indexSampleStep'] = INDEX_SAMPLE_STEP
+    header['indexSamples'] = [[row, len(segTable.indexSamples[row])] for row in sampleKeys]
+    headerBytes = json.dumps(header).encode('utf-8')
+
+    tmp_file = '{}.{}.tmp'.format(output_file, os.getpid())
+    try:
+        if index_dir is not None and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        with open(tmp_file, 'wb') as outfile:
+            outfile.write(INDEX_MAGIC)
+            outfile.write(S_HEADER_LEN.pack(len(headerBytes)))
+            outfile.write(headerBytes)
+            for column in (segTable.startPos, segTable.dataPos, segTable.dataLen, segTable.attrs, segTable.lrType,
+                           segTable.fhlrRows):
+                _writeArray(outfile, column)
+            for key in frameKeys:
+                _writeArray(outfile, segTable.frameRows[key])
+            for row in sampleKeys:
+                _writeArray(outfile, segTable.indexSamples[row])
+        os.replace(tmp_file, output_file)
+        logger.info("Saved index file %s", output_file)
+    except (IOError, OSError) as err:
+        logger.warning("Can't write index file {}: {}".format(output_file, err))
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def loadIndex(path, index_dir=None):
+    """
+    Load the segment table of a DLIS file from its index file.
+
+    :type path: str
+    :param path: Path to the DLIS file.
+
+    :type index_dir: str
+    :param index_dir: A cache directory for index files. If None, the index is next to the DLIS file.
+
+    :return: The segment table, or None if there is no index file or it is stale.
+    """
+    input_file = indexPath(path, index_dir)
+    if not os.path.isfile(input_file):
+        return None
+    try:
+        with open(input_file, 'rb') as infile:
+            buf = infile.read()
+        if buf[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            logger.warning("Invalid index file %s", input_file)
+            return None
+        offset = len(INDEX_MAGIC)
+        headerLen = S_HEADER_LEN.unpack_from(buf, offset)[0]
+        offset += S_HEADER_LEN.size
+        header = json.loads(buf[offset:offset + headerLen].decode('utf-8'))
+        offset += headerLen
+    except (IOError, OSError, ValueError) as err:
+        logger.warning("Can't read index file {}: {}".format(input_file, err))
+        return None
+
+    if header.get('version') != INDEX_VERSION:
+        logger.info("Index file %s has a different version, ignore it", input_file)
+        return None
+    fileKey = _fileKey(path)
+    if any(header.get(k) != v for k, v in fileKey.items()):
+        logger.info("Index file %s is stale", input_file)
+        return None
+
+    try:
+        segTable = SegmentTable()
+        numOfSegments = header['numOfSegments']
+        segTable.startPos, offset = _readArray(buf, offset, 'q', numOfSegments)
+        segTable.dataPos, offset = _readArray(buf, offset, 'q', numOfSegments)
+        segTable.dataLen, offset = _readArray(buf, offset, 'H', numOfSegments)
+        segTable.attrs, offset = _readArray(buf, offset, 'B', numOfSegments)
+        segTable.lrType, offset = _readArray(buf, offset, 'B', numOfSegments)
+        segTable.fhlrRows, offset = _readArray(buf, offset, 'q', header['numOfFhlr'])
+        for key, numOfRows in header['frames']:
+            rows, offset = _readArray(buf, offset, 'q', numOfRows)
+            segTable.frameRows[bytes.fromhex(key) if key != '' else None] = rows
+        for row, numOfSamples in header['indexSamples']:
+            samples, offset = _readArray(buf, offset, 'd', numOfSamples)
+            # samples of a different step are sampled again when they are needed
+            if header['indexSampleStep'] == INDEX_SAMPLE_STEP:
+                segTable.indexSamples[row] = samples
+        for row, (length, prodCode, payload) in header['encryptPkts'].items():
+            pktBytes = S_ENCRYPT_PKT_HEADER.pack(length, prodCode) + bytes.fromhex(payload)
+            segTable.encryptPkts[int(row)] = EncryptionPacket(MemoryViewStream(pktBytes))
+    except (KeyError, ValueError) as err:
+        logger.warning("Invalid index file {}: {}".format(input_file, err))
+        return None
+    if offset != len(buf):
+        logger.warning("Invalid index file %s", input_file)
+        return None
+    logger.info("Loaded %s LR Segments from index file %s", numOfSegments, input_file)
+    return segTable
@@ -1,19 +1,35 @@
+import bisect
+import contextlib
 import csv
 import json
 import os
+from array import array
+from struct import error as StructError
 
 from .LogicalRecord import *
-from .Component import Object
-from .common import switch, myLogger, endPos, ComplexEncoder, JsonAble
+from .Component import Attribute, Object
+from .common import switch, myLogger, ComplexEncoder, JsonAble
+from .FrameDecoder import NumpyFrameDecoder, buildFrameDecoder, channelSize, decodeIndexValue
+from .ObjectRegistry import ObjectRegistry
+from .FrameView import FrameView
+from .FrameColumns import FrameColumns
+from .CompressedFile import CompressedFile, compression
+from .SegmentTable import INDEX_SAMPLE_STEP
 import collections
 from . import RCReader as reader
 
 logger = myLogger('LogicalFile')
 
+# Max number of FData records of a frame decoded together.
+FDATA_BATCH_SIZE = 4096
+
 
 SimpleFrame = collections.namedtuple('SimpleFrame', 'ObName ChannelNames Channels Encrypted')
 SimpleChannel = collections.namedtuple('SimpleChannel', 'ObName RepCode Dimension Units NumOfValue')
 
+# Logical record types whose objects are always decoded, even if EFLRs are decoded lazily.
+LAZY_EXCLUDED_LR_TYPES = {PublicEFLRType.FHLR.value, PublicEFLRType.CHANNL.value, PublicEFLRType.FRAME.value}
+
 
 class LogicalFile(JsonAble):
     """Represent Logical File
@@ -21,65 +37,510 @@ class LogicalFile(JsonAble):
     Attributes:
         eflrList    -   The list of EFLRs
 
-        frameDataDict   -   A dict with key as frame name and value is a list of FrameData for this frame.
+        frameDataDict   -   A dict with key as frame name and value is the :class:`.FrameColumns.FrameColumns` of this
+        frame, which stores the FData records column-wise and is a sequence of FrameData like a list.
+
+        frameIndex  -   A dict with key as frame name and value is the rows of the first segment of each FData record
+        of this frame in the segment table.
+
+        frameDecoders   -   A dict with key as frame name and value is the decoder compiled for the FData records of
+        this frame, or None if the frame is decoded value by value.
 
         noformList  -   All the noformat IFLR in this Logical file.
+
+        registry    -   The :class:`.ObjectRegistry.ObjectRegistry` of all the objects in eflrList, to resolve an
+        OBNAME, OBJREF or ATTREF, see :meth:`resolve`.
+
+        setTypes    -   The set types of the EFLRs which are parsed, None if all the EFLRs are parsed.
+
+        source      -   Path to the DLIS file this logical file is parsed from, to read FData records later with
+        :attr:`frames`. None if it is parsed from a file object.
+
+        skippedFrames   -   The frames whose FData records are dropped, because the frame or one of its channels is
+        not found, like when FRAME or CHANNEL is not in setTypes.
+
+        channels    -   The identifiers of the channels which are decoded from FData records, None if all the
+        channels are decoded, see :meth:`loadIFLR`. The slots of a :class:`.FrameData` only include the decoded channels, in the order of the
+        frame, and the FData records of a frame without any of them are dropped.
     """
 
-    def __init__(self, eflrSegList, iflrSegList, fs, eflrOnly = False):
+    def __init__(self, segTable = None, startRow = 0, endRow = 0, fs = None, eflrOnly = False, lazyEflr = False,
+                 setTypes = None, channels = None):
         """
-        Parse a Logical file.
+        Parse a Logical file. Without segTable, an empty logical file is created, then records are added while
+        they are read, see :func:`.core.iter_records`.
         
-        :type eflrSegList: list
-        :param eflrSegList: all the eflr segments list
+        :type segTable: SegmentTable
+        :param segTable: The segment table of the whole DLIS file.
 
-        :type iflrSegList: list
-        :param iflrSegList: all the iflr segments list
+        :type startRow: int
+        :param startRow: The row of the first segment (FHLR) of this logical file in segTable.
+
+        :type endRow: int
+        :param endRow: The row after the last segment of this logical file in segTable.
 
         :type fs: FileIO
         :param fs: File stream of the original DLIS file. Since the body part of IFLR segment will be loaded when needed, so we still need the file stream.
 
         :type eflrOnly: bool
         :param eflrOnly: If only parse EFLR. When it is true, only EFLR is loaded in this Logical File.
+
+        :type lazyEflr: bool
+        :param lazyEflr: If True, the objects of an EFLR are decoded on first access to its objects, except the
+         objects of FHLR, CHANNEL and FRAME which are always needed.
+
+        :type setTypes: set
+        :param setTypes: The set types of the EFLRs to parse, like {'FILE-HEADER', 'ORIGIN', 'CHANNEL', 'FRAME'}. Other
+         EFLRs are skipped after reading their set header, the FHLR is always parsed. By default all the EFLRs are
+         parsed.
+
+        :type channels: list
+        :param channels: The identifiers of the channels to decode from FData records, like ['TDEP', 'GR']. By
+         default or with an empty list, all the channels are decoded.
         """
 
         self.eflrList = []
+        self.registry = ObjectRegistry()
+        # (set type, set name) -> EFLRs of the original sets, where redundant and replacement sets are merged into
+        self._originalSets = {}
         self.simpleFrames = {}
         self.simpleChannels = {}
         self.frameDataDict = {}
         self.noformList = []
+        self.segTable = segTable
+        self.startRow = startRow
+        self.endRow = endRow
+        self.frameIndex = {}
+        self.frameDecoders = {}
+        # frame name -> how the channels of the frame are decoded, see _getFrameProjection
+        self._frameProjections = {}
+        self.channels = _channelSet(channels)
+        # the channels given when this logical file is created, which loadIFLR decodes by default
+        self._defaultChannels = self.channels
+        self.lazyEflr = lazyEflr
+        self.setTypes = frozenset(setTypes) if setTypes is not None else None
+        self.skippedFrames = set()
+        self.source = None
+        self._frames = None
+        if segTable is None:
+            return
 
-        logger.info("Start parsing %s EFLR Segments", len(eflrSegList))
-        tmpEflrSegList = []
+        logger.info("Start parsing EFLR Segments from row %s to %s", startRow, endRow)
         # First, parse all EFLRs.
-        for eflrSeg in eflrSegList:
-            logger.debug(eflrSeg)
-            tmpEflrSegList.append(eflrSeg)
-            if eflrSeg.hasSucc is False:
-                _check_lr_seg(tmpEflrSegList)
-                self._parseEFLR(tmpEflrSegList, fs = fs)
-                tmpEflrSegList.clear()
+        for rows in self._iterLrRows(True):
+            _check_lr_seg(segTable, rows)
+            self._parseEFLR(rows, fs = fs)
         logger.info("End parsing EFLR Segments, in total %s LRs ", len(self.eflrList))
-
-        self.iflrSegList = iflrSegList
+        self.frameIndex = self._buildFrameIndex(fs)
 
         if eflrOnly is False:
             self.loadIFLR(fs)
 
-    def loadIFLR(self, fs):
+    def _iterLrRows(self, isEFLR):
+        """
+        Group the segments of this logical file into logical records.
+
+        :type isEFLR: bool
+        :param isEFLR: If True, only the EFLR segments are grouped, otherwise only IFLR segments.
+
+        :return: A generator of lists of rows in the segment table, each list is one logical record.
+        """
+        segTable = self.segTable
+        tmpRows = []
+        for row in range(self.startRow, self.endRow):
+            if segTable.isEFLR(row) is not isEFLR:
+                continue
+            tmpRows.append(row)
+            if segTable.hasSucc(row) is False:
+                yield tmpRows
+                tmpRows = []
+
+    def _lrRowsFrom(self, row):
+        """
+        :param row: The row of the first segment of a logical record.
+
+        :return: The rows of all the segments of this logical record.
+        """
+        segTable = self.segTable
+        isEFLR = segTable.isEFLR(row)
+        rows = [row]
+        while segTable.hasSucc(row):
+            row += 1
+            while segTable.isEFLR(row) is not isEFLR:
+                row += 1
+            rows.append(row)
+        return rows
+
+    def _buildFrameIndex(self, fs):
+        """
+        Find the FData records of each frame in this logical file from the segment table.
+
+        :return: A dict with key as frame name and value is the rows of the first segment of each FData record.
+        """
+        frameIndex = {}
+        for key, rows in self.segTable.frameRows.items():
+            lo = bisect.bisect_left(rows, self.startRow)
+            hi = bisect.bisect_left(rows, self.endRow)
+            if lo == hi:
+                continue
+            if key is None:
+                # OBNAME is not complete in the first segment, so read the whole record to get it.
+                for row in rows[lo:hi]:
+                    lrBytes = _readLrBytes(self.segTable, self._lrRowsFrom(row), fs)
+                    _addFrameRows(frameIndex, reader.decodeOBNAME(lrBytes, 0)[0], array('q', [row]))
+            else:
+                _addFrameRows(frameIndex, reader.decodeOBNAME(key, 0)[0], rows[lo:hi])
+        return frameIndex
+
+    def loadIFLR(self, fs, channels = None):
         """
         A method to load all the IFLRs in this logical file. This can be called if eflrOnly is set to False when created.
+
+        :type channels: list
+        :param channels: The identifiers of the channels to decode, which replace :attr:`channels`. An empty list
+         decodes all the channels. By default, the channels given when this logical file is created are decoded. When
+         the channels are different from :attr:`channels`, the FData records loaded before are dropped since they
+         have other channels.
         
         :return: None. But the frameDataDict attribute will be loaded.
         """
-        logger.info("Start parsing %s IFLR Segments", len(self.iflrSegList))
-        tmpIflrSegList = []
-        for iflrSeg in self.iflrSegList:
-            tmpIflrSegList.append(iflrSeg)
-            if iflrSeg.hasSucc is False:
-                # _check_lr_seg(tmpIflrSegList)
-                self._parseIFLR(tmpIflrSegList, fs = fs)
-                tmpIflrSegList.clear()
+        channels = self._defaultChannels if channels is None else _channelSet(channels)
+        if channels != self.channels:
+            self.channels = channels
+            self.frameDecoders.clear()
+            self._frameProjections.clear()
+            self.frameDataDict = {}
+        logger.info("Start parsing IFLR Segments from row %s to %s", self.startRow, self.endRow)
+        # FData records of frames with a NumPy decoder are decoded in batches
+        batches = {}
+        for rows in self._iterLrRows(False):
+            lrType = self.segTable.lrType[rows[0]]
+            lrBytes = _readLrBytes(self.segTable, rows, fs)
+            if lrType == 0 and self._batchFData(batches, lrBytes):
+                continue
+            lr = self._decodeIFLR(lrType, lrBytes)
+            if type(lr) is EoD and lr.frameTypeRef in batches:
+                # the records of the frame are added before its end
+                self._flushFDataBatch(lr.frameTypeRef, batches.pop(lr.frameTypeRef))
+            self._addIFLR(lr)
+        for frameName, batch in batches.items():
+            self._flushFDataBatch(frameName, batch)
+        self._trimFrames()
+
+    def readFrameArrays(self, frameName, fs):
+        """
+        Decode all the FData records of a frame in bulk with NumPy, without creating a :class:`.FrameData` for each
+        record. All the channels of the frame must have a fixed size representation code supported by NumPy, see
+        :data:`.FrameDecoder.NUMPY_DTYPES`.
+
+        :type frameName: ObName
+        :param frameName: The frame name.
+
+        :type fs: FileIO
+        :param fs: File stream of the original DLIS file.
+
+        :return: A tuple, first element is a list of frame numbers, second element is a dict with key as channel name
+         and value is a NumPy array with one row per record.
+        """
+        decoder = self._getFrameDecoder(frameName)
+        if type(decoder) is not NumpyFrameDecoder:
+            raise Exception('Frame {} can not be decoded by NumPy'.format(frameName))
+        frameNumbers = []
+        bodies = []
+        for row in self.frameIndex.get(frameName, []):
+            lrBytes = self._readLrBytesAt(row, fs)
+            _, offset = reader.decodeOBNAME(lrBytes, 0)
+            frameNumber, offset = reader.decodeUVARI(lrBytes, offset)
+            frameNumbers.append(frameNumber)
+            if len(lrBytes) - offset != decoder.itemsize:
+                raise Exception('FData record {} of frame {} has {} bytes, but {} bytes are expected'
+                                .format(frameNumber, frameName, len(lrBytes) - offset, decoder.itemsize))
+            bodies.append(lrBytes[offset:])
+        columns = decoder.decode(b''.join(bodies))
+        return frameNumbers, {c.ObName: column for c, column in zip(decoder.channels, columns)}
+
+    @property
+    def frames(self):
+        """
+        :return: A dict with key as frame name and value is a :class:`.FrameView.FrameView` of the FData records of
+         this frame, which reads and decodes only the records that are accessed. The records are read from
+         :attr:`source`, use :class:`.FrameView.FrameView` directly with a file stream otherwise. The logical file must
+         be parsed with a segment table, not forward only.
+        """
+        self._checkRandomAccess()
+        if self._frames is None:
+            self._frames = {frameName: FrameView(self, frameName) for frameName in self.frameIndex}
+        return self._frames
+
+    def iter_frame_batches(self, frameName, batch_size = FDATA_BATCH_SIZE, fs = None):
+        """
+        Read the FData records of a frame batch by batch, each batch covers batch_size consecutive records and is
+        decoded into one array per channel, so the memory doesn't grow with the number of records. The records of a
+        frame with a decoder, see :attr:`frameDecoders`, are decoded in bulk, the others are decoded value by value. The
+        records are read with the segment table, see :attr:`frameIndex`, and are not kept in frameDataDict, so the
+        logical file must not be read forward only.
+
+        :type frameName: ObName
+        :param frameName: The frame name.
+
+        :type batch_size: int
+        :param batch_size: The number of records in a batch, the last batch may have less records.
+
+        :type fs: FileIO
+        :param fs: File stream of the original DLIS file. By default, the file is opened from :attr:`source`.
+
+        :return: A generator of tuples like :meth:`readFrameArrays`, first element is the frame numbers of the records
+         in the batch, second element is a dict with key as channel name and value is the values of this channel in
+         the batch, see :attr:`.FrameColumns.FrameColumns.columns`.
+        """
+        self._checkRandomAccess()
+        if frameName not in self.simpleFrames or self._getSimpleChannelsFromFrame(frameName) is None:
+            raise Exception('Frame {} or its channels are not found'.format(frameName))
+        channels = self._getProjectedChannels(frameName)
+        decoder = self._getFrameDecoder(frameName)
+        rows = self.frameIndex.get(frameName, [])
+        with self._openStream(fs) as fs:
+            for start in range(0, len(rows), batch_size):
+                batch = FrameColumns(frameName, channels, min(batch_size, len(rows) - start))
+                # channel values of the records which are decoded together
+                frameNumbers, bodies = [], []
+                for row in rows[start:start + batch_size]:
+                    lrBytes = self._readLrBytesAt(row, fs)
+                    if decoder is not None:
+                        _, offset = reader.decodeOBNAME(lrBytes, 0)
+                        frameNumber, offset = reader.decodeUVARI(lrBytes, offset)
+                        if len(lrBytes) - offset == decoder.itemsize:
+                            frameNumbers.append(frameNumber)
+                            bodies.append(lrBytes[offset:])
+                            continue
+                    if len(bodies) > 0:
+                        # keep the order of the records
+                        batch.extendColumns(frameNumbers, decoder.decode(b''.join(bodies)))
+                        frameNumbers, bodies = [], []
+                    fData = self._decodeIFLR(0, lrBytes)
+                    if fData is not None:
+                        batch.append(fData)
+                if len(bodies) > 0:
+                    batch.extendColumns(frameNumbers, decoder.decode(b''.join(bodies)))
+                yield batch.frameNumbers, batch.columns
+
+    def read_frames(self, frameName, start, stop, fs = None):
+        """
+        Read the FData records of a frame whose index, i.e. the value of the first channel like depth or time, is
+        within a range. The index is assumed to be monotonic, increasing or decreasing, as the DIRECTION of the frame.
+        Only the FData records around the range are read and decoded, they are found by binary search in the index
+        values sampled from the records, see :attr:`.SegmentTable.SegmentTable.indexSamples`. The logical file must be
+        parsed with a segment table, not forward only.
+
+        :type frameName: ObName
+        :param frameName: The frame name.
+
+        :param start: The index value where the range starts, included.
+
+        :param stop: The index value where the range stops, excluded. For a decreasing index, start is greater than
+         stop.
+
+        :type fs: FileIO
+        :param fs: File stream of the original DLIS file. By default, the file is opened from :attr:`source`.
+
+        :return: A list of :class:`.FrameData` in the range, in the order of the file.
+        """
+        return FrameView(self, frameName, fs).between(start, stop)
+
+    def _sampleIndex(self, fs):
+        """
+        Sample the index of all the frames of this logical file, so they are saved in the index file.
+
+        :return: None
+        """
+        for frameName in self.frameIndex:
+            self._indexSamples(frameName, fs)
+
+    def _indexSamples(self, frameName, fs):
+        """
+        Sample the index of a frame, which is the index value of every INDEX_SAMPLE_STEP-th FData record and of the
+        last record. The samples are kept in the segment table, so that they are saved in the index file.
+
+        :type frameName: ObName
+        :param frameName: The frame name.
+
+        :return: An array of index values, None if the frame has no FData record or its index is not a number.
+        """
+        rows = self.frameIndex.get(frameName)
+        if not rows:
+            return None
+        samples = self.segTable.indexSamples.get(rows[0])
+        if samples is not None:
+            return samples
+        simpleFrame = self.simpleFrames.get(frameName)
+        if simpleFrame is None or simpleFrame.Encrypted is True:
+            return None
+        channels = self._getSimpleChannelsFromFrame(frameName)
+        if not channels or channels[0].NumOfValue != 1:
+            return None
+        codec = reader.getCodec(channels[0].RepCode)
+        samples = array('d')
+        for position in list(range(0, len(rows), INDEX_SAMPLE_STEP)) + [len(rows) - 1]:
+            value = self._indexValueAt(rows[position], codec, fs)
+            if type(value) is not int and type(value) is not float:
+                logger.warning("Index of frame %s is not a number", frameName)
+                return None
+            samples.append(value)
+        self.segTable.indexSamples[rows[0]] = samples
+        return samples
+
+    def _indexValueAt(self, row, codec, fs):
+        """
+        :param row: The row of the first segment of a FData record.
+
+        :param codec: The codec of the index channel.
+
+        :return: The index value of the FData record, only the beginning of the record is read.
+        """
+        try:
+            return decodeIndexValue(self.segTable.readBody(row, fs), codec)
+        except (IndexError, StructError):
+            # the index value is not complete in the first segment
+            return decodeIndexValue(self._readLrBytesAt(row, fs), codec)
+
+    @contextlib.contextmanager
+    def _openStream(self, fs = None):
+        """
+        :param fs: File stream of the original DLIS file, which is used as it is.
+
+        :return: A context manager of the file stream, the file is opened from :attr:`source` without fs.
+        """
+        if fs is not None:
+            yield fs
+            return
+        if self.source is None:
+            raise Exception('Logical file is not parsed from a file path, a file stream is needed')
+        fs = CompressedFile(self.source) if compression(self.source) is not None else open(self.source, 'rb')
+        try:
+            yield fs
+        finally:
+            fs.close()
+
+    def _checkRandomAccess(self):
+        """
+        Check that the FData records can be read by their rows in the segment table, which a logical file read forward
+        only doesn't have.
+
+        :return: None
+        """
+        if self.segTable is None:
+            raise Exception('Random access to the FData records needs a seekable source, the logical file is read '
+                            'with forward_only')
+
+    def _readLrBytesAt(self, row, fs):
+        """
+        :param row: The row of the first segment of a logical record.
+
+        :return: The body of the logical record.
+        """
+        return _readLrBytes(self.segTable, self._lrRowsFrom(row), fs)
+
+    def _getFrameDecoder(self, frameName):
+        """
+        :return: The decoder of given frame, which is compiled once and cached. None if there is no decoder for it.
+        """
+        if frameName in self.frameDecoders:
+            return self.frameDecoders[frameName]
+        decoder = None
+        simpleFrame = self.simpleFrames.get(frameName)
+        if simpleFrame is not None and simpleFrame.Encrypted is not True:
+            channels = self._getSimpleChannelsFromFrame(frameName)
+            if channels is not None:
+                projection = self._getFrameProjection(frameName)
+                decoder = buildFrameDecoder(channels, None if projection is None
+                                            else [skip is None for skip in projection])
+        self.frameDecoders[frameName] = decoder
+        return decoder
+
+    def _getFrameProjection(self, frameName):
+        """
+        How the channels of a frame are decoded according to :attr:`channels`, which is computed once and cached.
+
+        :return: None if all the channels are decoded. Otherwise a list with one item per channel, which is None if the
+         channel is decoded, or the number of bytes to skip if it is not decoded. A channel with a variable size is not
+         skipped by 0 byte, it is decoded then dropped.
+        """
+        if frameName in self._frameProjections:
+            return self._frameProjections[frameName]
+        projection = None
+        channels = self._getSimpleChannelsFromFrame(frameName)
+        if self.channels is not None and channels is not None:
+            projection = [None if c.ObName.identifier in self.channels else channelSize(c) or 0 for c in channels]
+            if all(skip is None for skip in projection):
+                projection = None
+        self._frameProjections[frameName] = projection
+        return projection
+
+    def _getProjectedChannels(self, frameName):
+        """
+        :return: The simple channels of a frame which are decoded, see :attr:`channels`.
+        """
+        channels = self._getSimpleChannelsFromFrame(frameName)
+        projection = self._getFrameProjection(frameName)
+        if projection is None:
+            return channels
+        return [c for c, skip in zip(channels, projection) if skip is None]
+
+    def _batchFData(self, batches, lrBytes):
+        """
+        Add a FData record to the batch of its frame if the frame has a NumPy decoder.
+
+        :param batches: A dict with key as frame name and value is a tuple (frame numbers, channel values).
+
+        :param lrBytes: The body of the FData record.
+
+        :return: False if the record is not added and it has to be decoded by :meth:`_decodeIFLR`.
+        """
+        frameName, offset = reader.decodeOBNAME(lrBytes, 0)
+        decoder = self._getFrameDecoder(frameName)
+        frameNumber, offset = reader.decodeUVARI(lrBytes, offset)
+        if type(decoder) is not NumpyFrameDecoder or len(lrBytes) - offset != decoder.itemsize:
+            # keep the order of the FData records of this frame
+            if frameName in batches:
+                self._flushFDataBatch(frameName, batches.pop(frameName))
+            return False
+        batch = batches.setdefault(frameName, ([], []))
+        batch[0].append(frameNumber)
+        batch[1].append(lrBytes[offset:])
+        if len(batch[0]) >= FDATA_BATCH_SIZE:
+            self._flushFDataBatch(frameName, batches.pop(frameName))
+        return True
+
+    def _flushFDataBatch(self, frameName, batch):
+        """
+        Decode a batch of FData records of a frame and add them to frameDataDict.
+        """
+        frameNumbers, bodies = batch
+        decoder = self.frameDecoders[frameName]
+        self._getFrameColumns(frameName).extendColumns(frameNumbers, decoder.decode(b''.join(bodies)))
+
+    def _trimFrames(self):
+        """
+        Trim the columns of all the frames once all the FData records of this logical file are added, for the frames
+        without EoD.
+
+        :return: None
+        """
+        for frameColumns in self.frameDataDict.values():
+            frameColumns.trim()
+
+    def _getFrameColumns(self, frameName):
+        """
+        :return: The :class:`.FrameColumns.FrameColumns` of a frame in frameDataDict, which is created for the first
+         FData record of the frame.
+        """
+        frameColumns = self.frameDataDict.get(frameName)
+        if frameColumns is None:
+            rows = self.frameIndex.get(frameName)
+            frameColumns = FrameColumns(frameName, self._getProjectedChannels(frameName),
+                                        len(rows) if rows is not None else None)
+            self.frameDataDict[frameName] = frameColumns
+        return frameColumns
 
 
     def _dump(self, path, eflrOnly = False):
@@ -157,7 +618,7 @@ class LogicalFile(JsonAble):
             frame = self.simpleFrames[frameName]
             file_name = '{}_{}_{}.csv'.format(frameName.origin, frameName.copy, frameName.identifier)
             output_file = os.path.join(path, file_name)
-            channels = frame.Channels
+            channels = self._getProjectedChannels(frameName)
             columnNames = list(map(lambda channel: channel.ObName.identifier+(', '+channel.Units if channel.Units is not None else ''), channels))
             with open(output_file, 'w') as csvfile:
                 writer = csv.DictWriter(csvfile, fieldnames=['frameNumber']+columnNames)
@@ -177,144 +638,281 @@ class LogicalFile(JsonAble):
         :type frameName: ObName
         :param frameName: The target framename
 
-        :return: the simple channels.
+        :return: the simple channels, None if a channel is not found.
 
         """
 
         simpleFrame = self.simpleFrames[frameName]
         # Another lazy loading, if channel is not already loaded, then load them
         if len(simpleFrame.Channels) == 0 and len(simpleFrame.ChannelNames)>0:
+            if any(channelName not in self.simpleChannels for channelName in simpleFrame.ChannelNames):
+                return None
             for channelName in simpleFrame.ChannelNames:
                 simpleFrame.Channels.append(self.simpleChannels[channelName])
         return simpleFrame.Channels
 
-    def _parseIFLR(self, lrSegList, fs):
+    def _parseIFLR(self, rows, fs):
         """
         Parse the IFLR, currently all EoD, FData and  unform are parsed, FDatas and unforms are part of LogicalFile
         object, but not EoD since it doesn't provide any value for upper layer application.
 
-        :param lrSegList: The segments list for this logical record.
+        :param rows: The rows of the segments for this logical record in the segment table.
 
         :return: None
 
         """
-        assert(len(lrSegList)>0)
-        first = lrSegList[0]
-        lrBytes = bytearray()
-        for lrSeg in lrSegList:
-            lrBytes.extend(lrSeg.readBody(fs))
-        bStream = io.BytesIO(lrBytes)
-        eof = endPos(bStream)
-        for case in switch(first.lrType):
-            if case(0):
-                frameObjectName = reader.readOBNAME(bStream)
-                simpleFrame = self.simpleFrames[frameObjectName]
+        assert(len(rows)>0)
+        lr = self._decodeIFLR(self.segTable.lrType[rows[0]], _readLrBytes(self.segTable, rows, fs))
+        self._addIFLR(lr)
+
+    def _addIFLR(self, lr):
+        """
+        Keep a decoded IFLR in this logical file, FDatas go to frameDataDict and unforms go to noformList. The
+        columns of a frame are trimmed at its EoD.
+
+        :param lr: The IFLR returned by :meth:`_decodeIFLR`.
+
+        :return: None
+        """
+        if type(lr) is FrameData:
+            self._getFrameColumns(lr.frameName).append(lr)
+        elif type(lr) is UnformattedDataLR:
+            self.noformList.append(lr)
+        elif type(lr) is EoD and lr.lrType == 0 and lr.frameTypeRef in self.frameDataDict:
+            self.frameDataDict[lr.frameTypeRef].trim()
+
+    def _decodeIFLR(self, lrType, lrBytes):
+        """
+        Decode an IFLR.
 
-                channelObjectList = self._getSimpleChannelsFromFrame(simpleFrame.ObName)
+        :param lrType: The logical record type.
+
+        :param lrBytes: The bodies of all the segments of this logical record.
+
+        :return: A :class:`.FrameData` for FData, or a :class:`.UnformattedDataLR`, :class:`.EoD` or
+         :class:`.PrivateIFLR`. None if the record can't be decoded.
+
+        """
+        lr = None
+        eof = len(lrBytes)
+        for case in switch(lrType):
+            if case(0):
+                frameObjectName, offset = reader.decodeOBNAME(lrBytes, 0)
+                simpleFrame = self.simpleFrames.get(frameObjectName)
+                channelObjectList = None
+                if simpleFrame is not None:
+                    channelObjectList = self._getSimpleChannelsFromFrame(simpleFrame.ObName)
+                if channelObjectList is None:
+                    if frameObjectName not in self.skippedFrames:
+                        logger.warning("Drop FData of frame %s, the frame or its channels are not found",
+                                       frameObjectName)
+                        self.skippedFrames.add(frameObjectName)
+                    break
 
                 if simpleFrame.Encrypted is not None and simpleFrame.Encrypted is True:
                     logger.error("Encrypted FData, not supported")
 
-                fData = FrameData(reader.readUVARI(bStream))
-
-                while bStream.tell() < eof:
-                    for c in channelObjectList:
+                projection = self._getFrameProjection(simpleFrame.ObName)
+                if projection is not None and all(skip is not None for skip in projection):
+                    # none of the channels of this frame is decoded
+                    break
+
+                frameNumber, offset = reader.decodeUVARI(lrBytes, offset)
+                fData = FrameData(frameNumber, simpleFrame.ObName)
+
+                decoder = self._getFrameDecoder(simpleFrame.ObName)
+                if decoder is not None and eof - offset == decoder.itemsize:
+                    fData.slots = decoder.decodeSlots(lrBytes, offset)
+                    lr = fData
+                    break
+
+                if projection is None:
+                    projection = [None] * len(channelObjectList)
+                while offset < eof:
+                    for c, skip in zip(channelObjectList, projection):
+                        if skip:
+                            offset += skip
+                            continue
                         if c.NumOfValue>1:
-                            slot = []
-                            for i in range(c.NumOfValue):
-                                slot.append(reader.readByRC(c.RepCode, bStream))
-                            fData.slots.append(slot)
+                            slot, offset = reader.read_many(c.RepCode, c.NumOfValue, lrBytes, offset)
                         else:
-                            slot = reader.readByRC(c.RepCode, bStream)
+                            slot, offset = reader.getCodec(c.RepCode).decode(lrBytes, offset)
+                        if skip is None:
                             fData.slots.append(slot)
 
-                if simpleFrame.ObName not in self.frameDataDict:
-                    self.frameDataDict[simpleFrame.ObName] = []
-                self.frameDataDict[simpleFrame.ObName].append(fData)
+                lr = fData
                 break
             if case(1):
-                dataDescRef = reader.readOBNAME(bStream)
-                noformatEflr = list(filter((lambda eflr: type(eflr) is UdiEFLR), self.eflrList))
-                noformatObject = None
-                for eflr in noformatEflr:
-                    for obj in eflr.objects: # type:Object
-                        if obj.name == dataDescRef:
-                            noformatObject = obj
-                            break
+                dataDescRef, offset = reader.decodeOBNAME(lrBytes, 0)
+                noformatObject = self.registry.get(NoFormat.SET_TYPE, dataDescRef)
                 if noformatObject is None:
                     logger.error("Can't find noformat object")
                 else:
-                    data =  lrBytes[bStream.tell():]
-                    unformIFLR = UnformattedDataLR(noformatObject, data)
-                    self.noformList.append(unformIFLR)
+                    data =  lrBytes[offset:]
+                    lr = UnformattedDataLR(noformatObject, data)
                 break
             if case(127):
-                dataDescRef = reader.readOBNAME(bStream)
+                dataDescRef, offset = reader.decodeOBNAME(lrBytes, 0)
                 # in some file, seems the data part of EoD IFLR is missing,
                 # for example, BakerHughes/NO_6507_7-A-8/WL_RAW_NMR_MWD_1.DLIS
-                if bStream.tell() == eof:
+                if offset == eof:
                     logger.warning("EoF without logical record type")
                     lr = EoD(dataDescRef, None)
                 else:
-                    lrType = reader.readUSHORT(bStream)
-                    assert(bStream.tell() == eof)
+                    lrType, offset = reader.decodeUSHORT(lrBytes, offset)
+                    assert(offset == eof)
                     lr = EoD(dataDescRef, lrType)
                 break
             if case():
                 lr = PrivateIFLR()
                 break
+        return lr
 
 
-    def _parseEFLR(self, lrSegList, fs):
+    def _parseEFLR(self, rows, fs):
         """
         Parse an EFLR and append to eflr list in this :class:`LogicalFile.LogicalFile`.
 
-        :param lrSegList: A list of :class:`LogicalRecordSegment.LogicalRecordSegment` which compose a LogicalRecord.
+        :param rows: The rows of the segments in the segment table which compose a LogicalRecord.
 
         :return: None
         
         """
-        assert(len(lrSegList)>0)
-        first = lrSegList[0]
+        assert(len(rows)>0)
+        first = rows[0]
+        lrType = self.segTable.lrType[first]
+        encrypted = self.segTable.encrypted(first)
+        if self.setTypes is not None:
+            # the set header is almost always in the first segment
+            skipped = self._isSkippedEFLR(lrType, encrypted, self.segTable.readBody(first, fs))
+            if skipped is None:
+                skipped = self._isSkippedEFLR(lrType, encrypted, _readLrBytes(self.segTable, rows, fs))
+            if skipped:
+                return
+        # For encrypted and private EFLR, we will skip its body
+        lrBytes = None if lrType >11 and encrypted else _readLrBytes(self.segTable, rows, fs)
+        self._addEFLR(self._decodeEFLR(lrType, encrypted, self.segTable.encryptPkts.get(first), lrBytes))
+
+    def _addEFLR(self, lr):
+        """
+        Keep a decoded EFLR in this logical file, its objects are added to the registry.
+
+        :param lr: The EFLR returned by :meth:`_decodeEFLR`.
+
+        :return: False if lr is the original EFLR of a redundant or replacement set which is already kept.
+        """
+        setType = getattr(lr, 'setType', None)
+        if setType is not None:
+            originals = self._originalSets.setdefault((setType, lr.setName), [])
+            if any(eflr is lr for eflr in originals):
+                return False
+            originals.append(lr)
+        self.eflrList.append(lr)
+        self.registry.add(lr)
+        return True
+
+    def findObject(self, setType, name):
+        """
+        Find an object of the EFLRs in this logical file.
+
+        :type setType: str
+        :param setType: The set type, like 'CHANNEL'.
+
+        :type name: ObName
+        :param name: The object name.
+
+        :return: The object, or None if it is not found.
+        """
+        return self.registry.get(setType, name)
+
+    def resolve(self, ref, setType = None):
+        """
+        Resolve a reference to an object of the EFLRs in this logical file, see
+        :meth:`.ObjectRegistry.ObjectRegistry.resolve`.
+
+        :param ref: An ObjRef, an ATTREF, an ObName or a list of them.
+
+        :type setType: str
+        :param setType: The set type of the object an ObName refers to.
+
+        :return: The object, or the attribute for an ATTREF. None if it is not found.
+        """
+        return self.registry.resolve(ref, setType)
+
+    def _isSkippedEFLR(self, lrType, encrypted, lrBytes):
+        """
+        Check if an EFLR is skipped because its set type is not in setTypes.
+
+        :param lrType: The logical record type.
+
+        :param encrypted: If the logical record is encrypted, the set type of an encrypted private EFLR is unknown so
+         it is skipped.
+
+        :param lrBytes: The bodies of the segments of this logical record, or only the first ones.
+
+        :return: True if the EFLR is skipped, False if it is parsed, None if lrBytes doesn't include the whole set
+         header.
+        """
+        if self.setTypes is None or lrType == PublicEFLRType.FHLR.value:
+            return False
+        if lrType > 11 and encrypted:
+            return True
+        try:
+            setHeader, offset = decodeSetHeader(lrBytes)
+        except IndexError:
+            return None
+        if offset > len(lrBytes):
+            return None
+        if setHeader.type not in self.setTypes:
+            logger.debug("Skip EFLR with set type %s", setHeader.type)
+            return True
+        return False
+
+    def _decodeEFLR(self, lrType, encrypted, encryptPkt, lrBytes):
+        """
+        Decode an EFLR, channels and frames are also kept in simpleChannels and simpleFrames of this logical file.
+
+        :param lrType: The logical record type.
+
+        :param encrypted: If the logical record is encrypted.
+
+        :param encryptPkt: The :class:`.EncryptionPacket` of the first segment or None.
+
+        :param lrBytes: The bodies of all the segments of this logical record.
+
+        :return: The EFLR.
+        """
         lr = None
 
         # For encrypted and private EFLR, we will skip its body byt only includes
         # its encrypt packet which has prodCode and payload.
-        if first.lrType >11 and first.encrypted:
-            lr = PrivateEncryptedEFLR(first._encryptPkt)
-            self.eflrList.append(lr)
-            return
-        if first.lrType<0:
-            raise Exception("Unknow EFLR type")
+        if lrType >11 and encrypted:
+            return PrivateEncryptedEFLR(encryptPkt)
 
-        # Put bodies of all LogicalRecordSegments together, so can we can parse the Set.
-        lrBytes = bytearray()
-        for lrSeg in lrSegList:
-            lrBytes.extend(lrSeg.readBody(fs))
+        lazy = self.lazyEflr and lrType not in LAZY_EXCLUDED_LR_TYPES
+        if lazy and isinstance(lrBytes, memoryview):
+            # the objects are decoded later, don't keep a slice of the memory mapped file.
+            lrBytes = bytes(lrBytes)
 
-        bStream = io.BytesIO(lrBytes)
+        if lrType >11:
+            lgSet, _ = decodeSet(lrBytes, lazy=lazy)
+            return self._reconcileSet(lgSet, PrivateEFLR(lgSet, wrapObjects(lgSet)))
 
-        if first.lrType >11:
-            lgSet = parseSet(bStream)
-            lr = PrivateEFLR(lgSet, lgSet.objects)
-            self.eflrList.append(lr)
-            return
-
-        eflrSet = parseSet(bStream)
+        eflrSet, _ = decodeSet(lrBytes, lazy=lazy)
         # TODO： Handle encrypted public EFLR, but we never see one so far.
-        for case in switch(first.lrType):
+        for case in switch(lrType):
             if case(PublicEFLRType.FHLR.value):
                 lr = FhlrEFLR(eflrSet, list(map(lambda obj: FileHeader(obj), eflrSet.objects)))
                 assert(len(lr.objects) == 1)
                 break
             if case(PublicEFLRType.OLR.value):
                 if eflrSet.type == 'ORIGIN':
-                    lr = OlrEFLR(eflrSet, [Origin(obj) for obj in eflrSet.objects])
+                    lr = OlrEFLR(eflrSet, wrapObjects(eflrSet, Origin))
                 elif eflrSet.type == 'WELL-REFERENCE-POINT':
-                    lr = OlrEFLR(eflrSet, [WellReferencePoint(obj) for obj in eflrSet.objects])
+                    lr = OlrEFLR(eflrSet, wrapObjects(eflrSet, WellReferencePoint))
                 break
             if case(PublicEFLRType.AXIS.value):
-                lr = AxisEFLR(eflrSet, [Axis(obj) for obj in eflrSet.objects])
+                lr = AxisEFLR(eflrSet, wrapObjects(eflrSet, Axis))
                 break
             if case(PublicEFLRType.CHANNL.value):
                 channels = [Channel(obj) for obj in eflrSet.objects]
@@ -337,7 +935,7 @@ class LogicalFile(JsonAble):
                             self.simpleFrames[f.name] = \
                                 SimpleFrame(f.name, [f.getAttrValue(Frame.CHANNELS)], [], f.getAttrValue(Frame.ENCRYPTED))
                 elif lr.mySet.type == 'PATH':
-                    lr = FrameEFLR(eflrSet, [Path(obj) for obj in eflrSet.objects])
+                    lr = FrameEFLR(eflrSet, wrapObjects(eflrSet, Path))
                 else:
                     logger.warn("Other frame set type:{}".format(lr.mySet))
                 break
@@ -345,25 +943,70 @@ class LogicalFile(JsonAble):
                 lr = StaticEFLR.getInstance(eflrSet)
                 break
             if case(PublicEFLRType.SCRIPT.value):    # SCRIPT
-                lr = ScriptEFLR(eflrSet, [Comment(obj) for obj in eflrSet.objects])
+                lr = ScriptEFLR(eflrSet, wrapObjects(eflrSet, Comment))
                 break
             if case(PublicEFLRType.UPDATE.value): # UPDATE
-                lr = UpdateEFLR(eflrSet, [Update(obj) for obj in eflrSet.objects])
+                lr = UpdateEFLR(eflrSet, wrapObjects(eflrSet, Update))
                 break
             if case(PublicEFLRType.UDI.value): #UDI
-                lr = UdiEFLR(eflrSet, [NoFormat(obj) for obj in eflrSet.objects])
+                lr = UdiEFLR(eflrSet, wrapObjects(eflrSet, NoFormat))
                 break
             if case(PublicEFLRType.LNAME.value):
 
-                lr = LongNameEFLR(eflrSet, [LongName(obj) for obj in eflrSet.objects])
+                lr = LongNameEFLR(eflrSet, wrapObjects(eflrSet, LongName))
                 break
             if case(PublicEFLRType.SPEC.value):
-                lr = SpecEFLR(eflrSet, [SpecObject(obj) for obj in eflrSet.objects])
+                lr = SpecEFLR(eflrSet, wrapObjects(eflrSet, SpecObject))
                 break
             if case(PublicEFLRType.DICT.value):
-                lr = DictEFLR(eflrSet, eflrSet.objects)
+                lr = DictEFLR(eflrSet, wrapObjects(eflrSet))
                 break
-        self.eflrList.append(lr)
+        if lr is not None:
+            lr = self._reconcileSet(eflrSet, lr)
+        return lr
+
+    def _reconcileSet(self, eflrSet, lr):
+        """
+        Merge a redundant or replacement set into its original set, which has the same set type and set name and
+        is read before. A redundant set is an identical copy of the original so it is dropped. A replacement set
+        updates the attributes of the objects of the original in place.
+
+        :param eflrSet: The decoded set.
+
+        :param lr: The EFLR of the set.
+
+        :return: The original EFLR if the set is merged into it, otherwise lr. :meth:`_addEFLR` doesn't add the
+         original EFLR twice.
+        """
+        if type(eflrSet) is Set:
+            return lr
+        original = self._findOriginalSet(lr)
+        if original is None:
+            logger.warning("Original set of %s with type %s and name %s is not found",
+                           type(eflrSet).__name__, lr.setType, lr.setName)
+            return lr
+        if type(eflrSet) is ReplacementSet:
+            newObjects = _replaceObjects(original, lr)
+            if len(newObjects) > 0:
+                self.registry.addObjects(lr.setType, newObjects)
+            if lr.setType in ('CHANNEL', 'FRAME'):
+                # simpleChannels and simpleFrames have been updated with the replacement set
+                self.frameDecoders.clear()
+                self._frameProjections.clear()
+                for simpleFrame in self.simpleFrames.values():
+                    del simpleFrame.Channels[:]
+        return original
+
+    def _findOriginalSet(self, lr):
+        """
+        :return: The EFLR of the original set of a redundant or replacement set, None if it is not found.
+        """
+        candidates = self._originalSets.get((lr.setType, lr.setName), [])
+        if len(candidates) > 1 and len(lr.objects) > 0:
+            # set name is optional, so find the set with the same objects
+            name = lr.objects[0].name
+            candidates = [eflr for eflr in candidates if any(obj.name == name for obj in eflr.objects)]
+        return candidates[0] if len(candidates) > 0 else None
 
 
     @property
@@ -382,6 +1025,56 @@ class LogicalFile(JsonAble):
         return self.eflrList[0].objects[0].getAttrValue(FileHeader.ID)
 
 
+def _replaceObjects(original, replacement):
+    """
+    Apply the attribute values of the objects of a replacement set to the objects of its original set in place, by
+    their position in the template of the original set. An attribute which is not in the template is dropped. An
+    object which is not in the original set is appended to it.
+
+    :type original: EFLR
+    :param original: The EFLR of the original set.
+
+    :type replacement: EFLR
+    :param replacement: The EFLR of the replacement set.
+
+    :return: The objects appended to the original set.
+    """
+    objects = {obj.name: obj for obj in original.objects}
+    newObjects = []
+    for newObj in replacement.objects:
+        obj = objects.get(newObj.name)
+        if obj is None:
+            logger.warning("Object %s of replacement set is not in its original set", newObj.name)
+            if original.template is None:
+                # an original set without object has no template
+                original.template = replacement.template
+            original.objects.append(newObj)
+            newObjects.append(newObj)
+            continue
+        # the original set has objects, so it has a template
+        attrList = original.template.attrList
+        labelIndex = original.template.labelIndex
+        for attr in newObj.attributes:
+            i = labelIndex.get(attr.label)
+            if i is None:
+                logger.warning("Attribute %s of object %s of replacement set is not in the template of its original "
+                               "set", attr.label, newObj.name)
+                continue
+            # the attributes an object omits at the end of the template have the template defaults
+            obj.attributes.extend(attrList[j].clone(Attribute()) for j in range(len(obj.attributes), i + 1))
+            obj.attributes[i] = attr
+    return newObjects
+
+
+def _channelSet(channels):
+    """
+    :return: The identifiers of the channels to decode as a frozenset, None if all the channels are decoded.
+    """
+    if channels is None or len(channels) == 0:
+        return None
+    return frozenset(channels)
+
+
 def _calculate_num_of_value(dimensionAttr):
     """
     Based on dimension information, caculate how many size of the list when squeeze
@@ -399,23 +1092,51 @@ def _calculate_num_of_value(dimensionAttr):
         return dimensionAttr.value
 
 
-def _check_lr_seg(tmpList):
+def _addFrameRows(frameIndex, frameName, rows):
+    """
+    Add FData rows of a frame to the frame index, rows are kept in order.
+    """
+    if frameName in frameIndex:
+        rows = array('q', sorted(frameIndex[frameName] + rows))
+    frameIndex[frameName] = rows
+
+
+def _readLrBytes(segTable, rows, fs):
+    """
+    Put the bodies of all the segments of a logical record together.
+
+    :param segTable: The segment table.
+
+    :param rows: Rows of the segments which compose a logical record.
+
+    :param fs: File stream of the original DLIS file.
+
+    :return: The body of the logical record. A single segment body is returned as it is, so a slice of a memory
+     mapped file is not copied.
+
+    """
+    if len(rows) == 1:
+        return segTable.readBody(rows[0], fs)
+    return b''.join([segTable.readBody(row, fs) for row in rows])
+
+
+def _check_lr_seg(segTable, rows):
     """
     Helper method to validate the LR Segment.
 
-    :param tmpList: List of LRSegment
+    :param segTable: The segment table.
+
+    :param rows: Rows of the segments which compose a logical record.
 
     :return: None. In case of error, assert will fail.
 
     """
-    assert(len(tmpList)>0)
-    assert(tmpList[0].hasPred is False)
-    for i in range(len(tmpList)):
-        if i == 0:
-            assert(tmpList[i].hasPred is False)
-        else:
-            assert(tmpList[i].hasPred is True)
-        assert(tmpList[i].encrypted == tmpList[0].encrypted)
-        assert(tmpList[i].isEFLR == tmpList[0].isEFLR)
-        assert(tmpList[i].hasTrailingLength == tmpList[0].hasTrailingLength)
-
+    assert(len(rows)>0)
+    first = rows[0]
+    assert(segTable.hasPred(first) is False)
+    for i in range(1, len(rows)):
+        row = rows[i]
+        assert(segTable.hasPred(row) is True)
+        assert(segTable.encrypted(row) == segTable.encrypted(first))
+        assert(segTable.isEFLR(row) == segTable.isEFLR(first))
+        assert(segTable.hasTrailingLength(row) == segTable.hasTrailingLength(first))
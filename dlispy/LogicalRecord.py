@@ -1,22 +1,16 @@
 import io
 from .RCReader import *
 from .Component import *
-from .common import endPos, myLogger
+from .common import myLogger
 
 logger = myLogger("LogicalRecord")
 
 
 def _find_attr(label, object):
-    for attribute in object.attributes:
-        if attribute.label == label:
-            return attribute
-    return None
+    return Object.getAttr(object, label)
 
 def _find_attr_value(label, object):
-    for attribute in object.attributes:
-        if attribute.label == label:
-            return attribute.value
-    return None
+    return Object.getAttrValue(object, label)
 
 
 class LogicalRecord(JsonAble):
@@ -53,12 +47,73 @@ class EFLR(LogicalRecord):
         :param set: The set belongs to this EFLR
 
         :type objects: list
-        :param objects: List of objects in the set.
+        :param objects: List of objects in the set, or a function which returns them, then the objects are only
+         decoded on first access, see :func:`wrapObjects`.
         """
         self.setName = set.name
         self.setType = set.type
         self.template = set.template
-        self.objects = objects
+        self._loadObjects = None
+        if callable(objects):
+            self._objects = None
+            self._loadObjects = objects
+        else:
+            self._objects = objects
+
+    @property
+    def objects(self):
+        """
+        :return: List of objects in the set, they are decoded now if the set is decoded lazily.
+        """
+        if self._loadObjects is not None:
+            self._objects = self._loadObjects()
+            self._loadObjects = None
+        return self._objects
+
+    @objects.setter
+    def objects(self, objects):
+        self._objects = objects
+        self._loadObjects = None
+
+    def toJSON(self):
+        d = {}
+        for k, v in self.__dict__.items():
+            if k == '_objects':
+                d['objects'] = self.objects
+            elif k != '_loadObjects':
+                d[k] = v
+        return {type(self).__name__: d}
+
+    def column(self, label):
+        """
+        Get one attribute of all the objects in this EFLR at once, see :meth:`.Component.Set.column`.
+
+        :type label: str
+        :param label: The attribute label.
+
+        :return: A list with the value of the attribute for each object.
+        """
+        return getColumn(self.template, self.objects, label)
+
+
+def wrapObjects(set, objectClass=None):
+    """
+    Wrap the objects of a set for an EFLR.
+
+    :type set: Set
+    :param set: The set.
+
+    :param objectClass: The class the objects are wrapped into, like :class:`Channel`. By default the objects are
+     kept as they are.
+
+    :return: The list of wrapped objects, or a function which returns it if the set is decoded lazily, so the objects
+     are decoded on first access to :attr:`EFLR.objects`.
+    """
+    def load():
+        if objectClass is None:
+            return list(set.objects)
+        return [objectClass(obj) for obj in set.objects]
+    return load if set.isLazy else load()
 
 
 class PublicEFLR(EFLR):
@@ -91,6 +146,8 @@ class PublicEflrObject(Object):
     """
     Represents object in a specific type of EFLR.
     """
+    __slots__ = ()
+
     def __init__(self, obj):
         """
         
@@ -98,15 +155,10 @@ class PublicEflrObject(Object):
         """
         self._name = obj.name
         self._attributes = obj.attributes
-
-    def getAttrValue(self, attrName):
-        return _find_attr_value(attrName, self)
-
-    def getAttr(self, attrName):
-        return _find_attr(attrName, self)
+        self._template = obj._template
 
     def toJSON(self):
-        return {type(self).__name__: self.__dict__}
+        return {type(self).__name__: Object.toJSON(self)}
 
 
 class IFLR(LogicalRecord):
@@ -119,6 +171,8 @@ class FileHeader(PublicEflrObject):
     """
     Represents object with set type "FILE-HEADER" in FHLR EFLR
     """
+    __slots__ = ()
+
     SEQUENCE_NUMBER = 'SEQUENCE-NUMBER'
     ID = 'ID'
 
@@ -132,6 +186,8 @@ class Origin(PublicEflrObject):
     """
     Represent objects within set "Origin" in Origin EFLR.
     """
+    __slots__ = ()
+
     FILE_ID = 'FILE-ID'
     FILE_SET_NAME = 'FILE-SET-NUMBER'
     FILE_SET_NUMBER = 'FILE-SET-NUMBER'
@@ -177,6 +233,8 @@ class Axis(PublicEflrObject):
     """
     Represents object within set "AXIS" in Axis EFLR
     """
+    __slots__ = ()
+
     AXIS_ID = 'AXIS-ID'
     COORDINATES = 'COORDINATES'
     SPACING = 'SPACING'
@@ -203,6 +261,8 @@ class LongName(PublicEflrObject):
     """
     Represents object within set "LONG-NAME" in LongName EFLR
     """
+    __slots__ = ()
+
     GENERAL_MODIFIER = 'GENERAL-MODIFIER'
     QUANTITY = 'QUANTITY'
     QUANTITY_MODIFIER = 'QUANTITY-MODIFIER'
@@ -224,6 +284,8 @@ class Channel(PublicEflrObject):
     """
     Represents object within set "CHANNEL" in Channel EFLR
     """
+    __slots__ = ()
+
     LONG_NAME = 'LONG-NAME'
     PROPERTIES = 'PROPERTIES'
     REPRESENTATION_CODE = 'REPRESENTATION-CODE'
@@ -239,6 +301,8 @@ class Path(PublicEflrObject):
     """
     Represents object within set "PATH" in Frame EFLR
     """
+    __slots__ = ()
+
     FRAME_TYPE = 'FRAME-TYPE'
     WELL_REFERENCE_POINT = 'WELL-REFERENCE-POINT'
     VALUE = 'VALUE'
@@ -256,6 +320,8 @@ class Frame(PublicEflrObject):
     """
     Represents object within set "FRAME" in Frame EFLR
     """
+    __slots__ = ()
+
     DESCRIPTION = 'DESCRIPTION'
     INDEX_MIN = 'INDEX-MIN'
     INDEX_MAX = 'INDEX-MAX'
@@ -269,6 +335,8 @@ class Zone(PublicEflrObject):
     """
     Represents object within type "ZONE" in Static EFLR
     """
+    __slots__ = ()
+
     DESCRIPTION = 'DESCRIPTION'
     DOMAIN = 'DOMAIN'
     MAXIMUM = 'MAXIMUM'
@@ -279,6 +347,8 @@ class Parameter(PublicEflrObject):
     """
     Represents object within set "PARAMETER" in Static EFLR
     """
+    __slots__ = ()
+
     LONG_NAME = 'LONG-NAME'
     DIMENSION = 'DIMENSION'
     AXIS = 'AXIS'
@@ -290,6 +360,8 @@ class Equipment(PublicEflrObject):
     """
     Represents object within set "EQUIPMENT" in Static EFLR
     """
+    __slots__ = ()
+
     TRADEMARK_NAME = 'TRADEMARK-NAME'
     STATUS = 'STATUS'
     TYPE = 'TYPE'
@@ -314,6 +386,8 @@ class Tool(PublicEflrObject):
     """
     Represents object within set "Tool" in Static EFLR
     """
+    __slots__ = ()
+
     DESCRIPTION = 'DESCRIPTION'
     TRADEMARK_NAME = 'TRADEMARK-NAME'
     GENERIC_NAME = 'GENERIC-NAME'
@@ -327,6 +401,8 @@ class Process(PublicEflrObject):
     """
     Represents object within set "PROCESS" in Static EFLR
     """
+    __slots__ = ()
+
     DESCRIPTION = 'DESCRIPTION'
     TRADEMARK_NAME = 'TRADEMARK-NAME'
     VERSION = 'VERSION'
@@ -344,6 +420,8 @@ class Computation(PublicEflrObject):
     """
     Represents object within set "COMPUTATION" in Static EFLR
     """
+    __slots__ = ()
+
     DESCRIPTION = 'DESCRIPTION'
     PROPERTIES = 'PROPERTIES'
     DIMENSION = 'DIMENSION'
@@ -357,6 +435,8 @@ class CalibrationMeasurement(PublicEflrObject):
     """
     Represents object within set "CALIBRATION-MEASUREMENT" in Static EFLR
     """
+    __slots__ = ()
+
     PHASE = 'PHASE'
     MEASUREMENT_SOURCE = 'MEASUREMENT-SOURCE'
     TYPE = 'TYPE'
@@ -378,6 +458,8 @@ class CalibrationCoefficient(PublicEflrObject):
     """
     Represents object within set "CALIBRATION-COEFFICIENT" in Static EFLR
     """
+    __slots__ = ()
+
     LABEL = 'LABEL'
     COEFFICIENTS = 'COEFFICIENTS'
     REFERENCES = 'REFERENCES'
@@ -389,6 +471,8 @@ class Calibration(PublicEflrObject):
     """
     Represents object within set "CALIBRATION" in Static EFLR
     """
+    __slots__ = ()
+
     CALIBRATED_CHANNELS = 'CALIBRATED-CHANNELS'
     UNCALIBRATED_CHANNELS = 'UNCALIBRATED-CHANNELS'
     COEFFICIENTS = 'COEFFICIENTS'
@@ -401,6 +485,8 @@ class Group(PublicEflrObject):
     """
     Represents object within set "GROUP" in Static EFLR
     """
+    __slots__ = ()
+
     DESCRIPTION = 'DESCRIPTION'
     OBJECT_TYPE = 'OBJECT-TYPE'
     OBJECT_LIST = 'OBJECT-LIST'
@@ -411,6 +497,8 @@ class Splice(PublicEflrObject):
     """
     Represents object within set "SPLICE" in Static EFLR
     """
+    __slots__ = ()
+
     OUTPUT_CHANNELS = 'OUTPUT-CHANNELS'
     INPUT_CHANNELS = 'INPUT-CHANNELS'
     ZONES = 'ZONES'
@@ -446,15 +534,15 @@ class StaticEFLR(PublicEFLR):
         """
         if set.type in StaticEFLR.SET_TYPES:
             objectClassname = globals()[_getClassName(set.type)]
-            return StaticEFLR(set, list(map(lambda obj: objectClassname(obj), set.objects)))
+            return StaticEFLR(set, wrapObjects(set, objectClassname))
         else:
-            return StaticEFLR(set, list(set.objects))
+            return StaticEFLR(set, wrapObjects(set))
             # raise Exception('Unsupported Set Type for STATIC EFLR: {}'.format(set))
                 
 
 class Comment(PublicEflrObject):
     """object within set "COMMENT" in Script EFLR"""
-    pass
+    __slots__ = ()
 
 
 class ScriptEFLR(PublicEFLR):
@@ -464,7 +552,7 @@ class ScriptEFLR(PublicEFLR):
 
 class Update(PublicEflrObject):
     """Object within set "UPDATE" in Update EFLR"""
-    pass
+    __slots__ = ()
 
 
 class UpdateEFLR(PublicEFLR):
@@ -476,6 +564,9 @@ class NoFormat(PublicEflrObject):
     """
     Represents object with type "NO-FORMAT" in UDI EFLR
     """
+    __slots__ = ()
+
+    SET_TYPE = 'NO-FORMAT'
     CONSUMER_NAME = 'CONSUMER-NAME'
     DESCRIPTION = 'DESCRIPTION'
 
@@ -487,7 +578,7 @@ class UdiEFLR(PublicEFLR):
 
 class LongName(PublicEflrObject):
     """Long name object in LongName EFLR"""
-    pass
+    __slots__ = ()
 
 
 class LNameEFLR(PublicEFLR):
@@ -497,11 +588,11 @@ class LNameEFLR(PublicEFLR):
 
 class SpecObject(PublicEflrObject):
     """objects in Spec EFLR"""
-    pass
+    __slots__ = ()
 
 class DictObject(PublicEflrObject):
     """Objects in Dict EFLR"""
-    pass
+    __slots__ = ()
 
 
 class SpecEFLR(PublicEFLR):
@@ -518,8 +609,11 @@ class FrameData:
     """
     Represents object in FData IFLR.
     """
-    def __init__(self, fr):
+    __slots__ = ('frameNumber', 'frameName', 'slots')
+
+    def __init__(self, fr, frameName = None):
         self.frameNumber = fr
+        self.frameName = frameName
         self.slots = []
 
 
@@ -564,17 +658,16 @@ class PrivateIFLR(IFLR):
     # TODO
     pass
 
-def nextRole(bStream):
-    """Return next role in this byte stream, note the position of stream remains the same after this operation.
-    :param bStream: byte stream 
-    :return: ComponentRole next fole in the stream  
+def _parseFromStream(bStream, decode, *args):
+    """
+    Decode a component from the rest of a stream with its buffer decoder, then move the stream right after it.
     """
-    
     currPos = bStream.tell()
-    desc = '{0:08b}'.format(readUSHORT(bStream))
-    role = ComponentRole[desc[:3]]
-    bStream.seek(currPos, io.SEEK_SET)
-    return role
+    buf = bStream.read()
+    value, offset = decode(buf, 0, *args)
+    bStream.seek(currPos + offset, io.SEEK_SET)
+    return value
+
 
 def parseObjects(bStream, template):
     """Parse all the objects in the current set based on given template.
@@ -582,13 +675,7 @@ def parseObjects(bStream, template):
     :param template: Define the schema of the object, like attribute list
     :return: A list of object. It will end until current byte stream (which only includes single set)
     """
-    eof = endPos(bStream)
-    objs = []
-    while bStream.tell() < eof:
-        obj = parseObject(bStream, template)
-        logger.debug(obj)
-        objs.append(obj)
-    return objs
+    return _parseFromStream(bStream, decodeObjects, template)
 
 
 def parseObject(bStream, template):
@@ -597,34 +684,7 @@ def parseObject(bStream, template):
     :param template: Defines The object schema, like attribute list.
     :return: A Object
     """
-
-    eof = endPos(bStream)
-    desc = '{0:08b}'.format(readUSHORT(bStream))
-    role = ComponentRole[desc[:3]]
-    if role == OBJECT:
-        logger.debug("parsing object")
-        obj = Object()
-        # assert(int(desc[3])) # object must have label
-        obj._name = readOBNAME(bStream)
-        i = 0
-        while bStream.tell() < eof and nextRole(bStream) is not OBJECT:
-            if i < len(template.attrList):
-                attrRef = template.attrList[i]
-                attr = parseAttrInObj(bStream, attrRef)
-                if type(attr) is AbsentAttribute:
-                    logger.debug("get absentAttr")
-                obj._attributes.append(attr)
-            else:
-                attr = parseAttrInObjWithoutRef(bStream)
-                if type(attr) is AbsentAttribute:
-                    logger.debug("get absentAttr")
-                obj._attributes.append(attr)
-            i+=1
-        # start to read attributes
-        return obj
-    else:
-        raise Exception("Only object is allowed")
-
+    return _parseFromStream(bStream, decodeObject, template)
 
 
 def parseTemplate(bStream):
@@ -632,21 +692,7 @@ def parseTemplate(bStream):
     :param bStream: Byte stream
     :return: The template.
     """
-    template = Template()
-    eof = endPos(bStream)
-    while True:
-        currPos = bStream.tell()
-        if currPos <eof:
-            desc = '{0:08b}'.format(readUSHORT(bStream))
-            bStream.seek(currPos, io.SEEK_SET)
-            if ComponentRole[desc[:3]] == OBJECT:
-                return template
-            else:
-                assert(int(desc[3])) # all components in Template must have label.
-                template._attrList.append(parseAttributeInTemplate(bStream))
-        else:
-            logger.warning("Encounter a Set without Objects")
-            break
+    return _parseFromStream(bStream, decodeTemplate)
 
 
 def parseAttrInObj(bStream, attrRef):
@@ -655,74 +701,15 @@ def parseAttrInObj(bStream, attrRef):
     :param attrRef: Attribute defination in Template.
     :return: The attribute in current object
     """
-    # logger.debug("Attribute def:{}".format(attrRef))
+    return _parseFromStream(bStream, decodeAttrInObj, attrRef)
 
-    desc = '{0:08b}'.format(readUSHORT(bStream))
-    role = ComponentRole[desc[:3]]
-    if role == ATTRIB:
-        attr = Attribute()
-        attrRef.clone(attr)
-    elif role == INVATR:
-        attr = InvariantAttribute()
-        attrRef.clone(attr)
-    elif role == ABSATER:
-        attr = AbsentAttribute(attrRef)
-        return attr
-    else:
-        raise Exception("Only attribute is allowed")
-    if int(desc[3]): # label
-        attr._label = readIDENT(bStream)
-    if int(desc[4]): # count
-        attr._count = readUVARI(bStream)
-    if int(desc[5]): # representation code
-        attr._repCode = readUSHORT(bStream)
-    if int(desc[6]):
-        attr._units = readUNITS(bStream)
-
-    if int(desc[7]):
-        if attr._count> 1:
-            attr._value =  [readByRC(attr._repCode, bStream) for i in range(attr._count)]
-        else:
-            attr._value =  readByRC(attr._repCode, bStream)
-
-    # logger.debug(attr)
-    return attr
 
 def parseAttrInObjWithoutRef(bStream):
     """Parse Single attribute in an object
     :param bStream: The byte stream
-    :param attrRef: Attribute defination in Template.
     :return: The attribute in current object
     """
-    # logger.debug("Attribute def:{}".format(attrRef))
-
-    desc = '{0:08b}'.format(readUSHORT(bStream))
-    role = ComponentRole[desc[:3]]
-    if role == ATTRIB:
-        attr = Attribute()
-    elif role == INVATR:
-        attr = InvariantAttribute()
-    elif role == ABSATER:
-        attr = AbsentAttribute()
-        return attr
-    else:
-        raise Exception("Only attribute is allowed")
-    if int(desc[3]): # label
-        attr._label = readIDENT(bStream)
-    if int(desc[4]): # count
-        attr._count = readUVARI(bStream)
-    if int(desc[5]): # representation code
-        attr._repCode = readUSHORT(bStream)
-    if int(desc[6]):
-        attr._units = readUNITS(bStream)
-
-    if int(desc[7]):
-        if attr._count> 1:
-            attr._value =  [readByRC(attr._repCode, bStream) for i in range(attr._count)]
-        else:
-            attr._value =  readByRC(attr._repCode, bStream)
-    return attr
-
+    return _parseFromStream(bStream, decodeAttrInObjWithoutRef)
 
 
 def parseAttributeInTemplate(bStream):
@@ -730,31 +717,7 @@ def parseAttributeInTemplate(bStream):
     :param bStream: The byte stream
     :return: An attribute,
     """
-    desc = '{0:08b}'.format(readUSHORT(bStream))
-    role = ComponentRole[desc[:3]]
-    if role == ATTRIB:
-        attr = Attribute()
-    elif role == INVATR:
-        attr = InvariantAttribute()
-    elif role == ABSATER:
-        attr = AbsentAttribute()
-        return attr
-    else:
-        raise Exception("Only attribute is allowed")
-    if int(desc[3]): # label
-        attr._label = readIDENT(bStream)
-    if int(desc[4]): # count
-        attr._count = readUVARI(bStream)
-    if int(desc[5]): # representation code
-        attr._repCode = readUSHORT(bStream)
-    if int(desc[6]):
-        attr._units = readUNITS(bStream)
-    if int(desc[7]):
-        if attr._count> 1:
-            attr._channelValue =  [readByRC(attr._repCode, bStream) for i in range(attr._count)]
-        else:
-            attr._channelValue =  readByRC(attr._repCode, bStream)
-    return attr
+    return _parseFromStream(bStream, decodeAttributeInTemplate)
 
 
 def parseSet(bStream):
@@ -762,22 +725,307 @@ def parseSet(bStream):
     :param bStream: The byte stream
     :return: A set
     """
-    desc = '{0:08b}'.format(readUSHORT(bStream))
-    role = ComponentRole[desc[:3]]
-    if role == SET:
+    return _parseFromStream(bStream, decodeSet)
+
+
+def decodeObjects(buf, offset, template, end = None):
+    """Decode all the objects in the current set based on given template.
+    :param buf: The buffer which includes a single set, like bytes or memoryview.
+    :param offset: Where the first object starts.
+    :param template: Define the schema of the object, like attribute list
+    :param end: Where the set ends, by default the end of the buffer.
+    :return: A tuple (list of objects, offset after the objects).
+    """
+    if end is None:
+        end = len(buf)
+    objs = []
+    while offset < end:
+        obj, offset = decodeObject(buf, offset, template, end)
+        logger.debug(obj)
+        objs.append(obj)
+    return objs, offset
+
+
+def decodeObject(buf, offset, template, end = None):
+    """Decode a single object
+    :param buf: The buffer.
+    :param offset: Where the object starts.
+    :param template: Defines The object schema, like attribute list.
+    :param end: Where the set ends, by default the end of the buffer.
+    :return: A tuple (object, offset after the object).
+    """
+    if end is None:
+        end = len(buf)
+    parser = template._objectParser
+    if parser is None:
+        parser = template._objectParser = ObjectParser(template)
+    return parser.parse(buf, offset, end)
+
+
+class ObjectParser(object):
+    """
+    A parser of the objects of a set, compiled once from the set template and reused for every object. For each
+    template attribute, the local defaults are pre-bound and the value decoder for the template count and
+    representation code is resolved ahead of time, so an attribute which only overrides its value is decoded without
+    looking anything up. An attribute which keeps all the template defaults, or which is absent, is one instance
+    shared by all the objects of the set rather than a copy for each object.
+    """
+
+    def __init__(self, template):
+        """
+        :type template: Template
+        :param template: The template of the set.
+        """
+        self._template = template
+        self._columns = [(attrRef, attrRef._label, attrRef._count, attrRef._repCode, attrRef._units, attrRef._value,
+                          _valueDecoder(attrRef._count, attrRef._repCode), attrRef.clone(Attribute()),
+                          AbsentAttribute(attrRef))
+                         for attrRef in template.attrList]
+
+    def parse(self, buf, offset, end):
+        """
+        Decode a single object.
+
+        :param buf: The buffer.
+
+        :param offset: Where the object starts.
+
+        :param end: Where the set ends.
+
+        :return: A tuple (object, offset after the object).
+        """
+        if DESCRIPTORS[buf[offset]].role is not OBJECT:
+            raise Exception("Only object is allowed")
+        logger.debug("parsing object")
+        obj = Object()
+        # assert(buf[offset] & DESC_OBJECT_NAME) # object must have label
+        obj._name, offset = decodeOBNAME(buf, offset + 1)
+        obj._template = self._template
+        attributes = obj._attributes
+        columns = self._columns
+        numOfColumns = len(columns)
+        while offset < end:
+            b = buf[offset]
+            desc = DESCRIPTORS[b]
+            role = desc.role
+            if role is OBJECT:
+                break
+            if len(attributes) >= numOfColumns:
+                attr, offset = decodeAttrInObjWithoutRef(buf, offset)
+                attributes.append(attr)
+                continue
+            attrRef, label, count, repCode, units, value, decodeValue, default, absent = columns[len(attributes)]
+            offset += 1
+            if role is ATTRIB:
+                if b & DESC_FORMAT == 0:
+                    attributes.append(default)
+                    continue
+                attr = Attribute.__new__(Attribute)
+            elif role is INVATR:
+                attr = InvariantAttribute.__new__(InvariantAttribute)
+            elif role is ABSATER:
+                logger.debug("get absentAttr")
+                attributes.append(absent)
+                continue
+            else:
+                raise Exception("Only attribute is allowed")
+            attr._label = label
+            attr._count = count
+            attr._repCode = repCode
+            attr._units = units
+            attr._value = value
+            if desc.hasLabel or desc.hasCount or desc.hasRepCode or desc.hasUnits:
+                offset = _decodeCharacteristics(buf, offset, desc, attr)
+                if desc.hasCount or desc.hasRepCode:
+                    decodeValue = None
+            if desc.hasValue:
+                if decodeValue is None:
+                    attr._value, offset = _decodeValue(buf, offset, attr)
+                else:
+                    attr._value, offset = decodeValue(buf, offset)
+            attributes.append(attr)
+        return obj, offset
+
+
+def _valueDecoder(count, repCode):
+    """
+    :return: A decoder (buf, offset) -> (value, offset) of a value with given count and representation code, None if
+     the representation code is unknown.
+    """
+    codec = CODECS.get(repCode)
+    if codec is None:
+        return None
+    if count > 1:
+        return lambda buf, offset: read_many(repCode, count, buf, offset)
+    return codec.decode
+
+
+def decodeTemplate(buf, offset, end = None):
+    """Decode the Template, it terminates when meets an object.
+    :param buf: The buffer.
+    :param offset: Where the template starts.
+    :param end: Where the set ends, by default the end of the buffer.
+    :return: A tuple (template, offset after the template). The template is None for a set without objects.
+    """
+    if end is None:
+        end = len(buf)
+    template = Template()
+    while offset < end:
+        desc = DESCRIPTORS[buf[offset]]
+        if desc.role is OBJECT:
+            return template, offset
+        assert(desc.hasLabel) # all components in Template must have label.
+        attr, offset = decodeAttributeInTemplate(buf, offset)
+        template._attrList.append(attr)
+    logger.warning("Encounter a Set without Objects")
+    return None, offset
+
+
+def _decodeCharacteristics(buf, offset, desc, attr):
+    """
+    Decode the label, count, representation code and units of an attribute component into attr.
+
+    :return: offset after the units.
+    """
+    if desc.hasLabel:
+        attr._label, offset = decodeIDENT(buf, offset)
+    if desc.hasCount:
+        attr._count, offset = decodeUVARI(buf, offset)
+    if desc.hasRepCode:
+        attr._repCode = buf[offset]
+        offset += 1
+    if desc.hasUnits:
+        attr._units, offset = decodeUNITS(buf, offset)
+    return offset
+
+
+def _decodeValue(buf, offset, attr):
+    """
+    Decode the value of an attribute with its count and representation code.
+
+    :return: A tuple (value, offset after the value).
+    """
+    if attr._count> 1:
+        return read_many(attr._repCode, attr._count, buf, offset)
+    return getCodec(attr._repCode).decode(buf, offset)
+
+
+def decodeAttrInObj(buf, offset, attrRef):
+    """Decode Single attribute in an object
+    :param buf: The buffer.
+    :param offset: Where the attribute starts.
+    :param attrRef: Attribute defination in Template.
+    :return: A tuple (attribute in current object, offset after the attribute).
+    """
+    desc = DESCRIPTORS[buf[offset]]
+    offset += 1
+    role = desc.role
+    if role is ATTRIB:
+        attr = Attribute()
+        attrRef.clone(attr)
+    elif role is INVATR:
+        attr = InvariantAttribute()
+        attrRef.clone(attr)
+    elif role is ABSATER:
+        return AbsentAttribute(attrRef), offset
+    else:
+        raise Exception("Only attribute is allowed")
+    offset = _decodeCharacteristics(buf, offset, desc, attr)
+    if desc.hasValue:
+        attr._value, offset = _decodeValue(buf, offset, attr)
+    return attr, offset
+
+
+def decodeAttrInObjWithoutRef(buf, offset):
+    """Decode Single attribute in an object which is not defined in Template.
+    :param buf: The buffer.
+    :param offset: Where the attribute starts.
+    :return: A tuple (attribute in current object, offset after the attribute).
+    """
+    desc = DESCRIPTORS[buf[offset]]
+    offset += 1
+    role = desc.role
+    if role is ATTRIB:
+        attr = Attribute()
+    elif role is INVATR:
+        attr = InvariantAttribute()
+    elif role is ABSATER:
+        return AbsentAttribute(Attribute()), offset
+    else:
+        raise Exception("Only attribute is allowed")
+    offset = _decodeCharacteristics(buf, offset, desc, attr)
+    if desc.hasValue:
+        attr._value, offset = _decodeValue(buf, offset, attr)
+    return attr, offset
+
+
+def decodeAttributeInTemplate(buf, offset):
+    """Decode the attribute in current Template
+    :param buf: The buffer.
+    :param offset: Where the attribute starts.
+    :return: A tuple (attribute, offset after the attribute).
+    """
+    desc = DESCRIPTORS[buf[offset]]
+    offset += 1
+    role = desc.role
+    if role is ATTRIB:
+        attr = Attribute()
+    elif role is INVATR:
+        attr = InvariantAttribute()
+    elif role is ABSATER:
+        return AbsentAttribute(Attribute()), offset
+    else:
+        raise Exception("Only attribute is allowed")
+    offset = _decodeCharacteristics(buf, offset, desc, attr)
+    if desc.hasValue:
+        attr._channelValue, offset = _decodeValue(buf, offset, attr)
+    return attr, offset
+
+
+def decodeSetHeader(buf, offset = 0):
+    """Decode the header of a set, which is its set type and set name, without its template and objects.
+    :param buf: The buffer which includes a set, like the body of an EFLR or only its first segment.
+    :param offset: Where the set starts.
+    :return: A tuple (set without template and objects, offset after the header). The offset is beyond the buffer if
+     the header continues after the end of the buffer.
+    """
+    desc = buf[offset]
+    offset += 1
+    role = DESCRIPTORS[desc].role
+    if role is SET:
         mySet = Set()
-    elif role == RDSET:
+    elif role is RDSET:
         mySet = RedundantSet()
-    elif role == RSET:
-        mySet = ReplacementSet
+    elif role is RSET:
+        mySet = ReplacementSet()
     else:
         raise Exception("Only set is allowed")
-    assert(int(desc[3])) # set must have type
-    mySet._type = readIDENT(bStream)
-    if int(desc[4]):
-        mySet._name = readIDENT(bStream)
-
-    mySet.template = parseTemplate(bStream)
-    mySet.objects = parseObjects(bStream, mySet.template)
-
-    return mySet
\ No newline at end of file
+    assert(desc & DESC_SET_TYPE) # set must have type
+    mySet._type, offset = decodeIDENT(buf, offset)
+    if desc & DESC_SET_NAME:
+        mySet._name, offset = decodeIDENT(buf, offset)
+    return mySet, offset
+
+
+def decodeSet(buf, offset = 0, end = None, lazy = False):
+    """Decode a set, with its template and all its objects.
+    :param buf: The buffer which includes a single set, like the body of an EFLR.
+    :param offset: Where the set starts.
+    :param end: Where the set ends, by default the end of the buffer.
+    :param lazy: If True, only the set type, set name and template are decoded, the objects are decoded from the
+     buffer on first access to :attr:`.Component.Set.objects`, so the buffer must not change.
+    :return: A tuple (set, offset after the set).
+    """
+    if end is None:
+        end = len(buf)
+    mySet, offset = decodeSetHeader(buf, offset)
+
+    mySet.template, offset = decodeTemplate(buf, offset, end)
+    if lazy:
+        template = mySet.template
+        start = offset
+        mySet._loadObjects = lambda: decodeObjects(buf, start, template, end)[0]
+        return mySet, end
+    mySet.objects, offset = decodeObjects(buf, offset, mySet.template, end)
+
+    return mySet, offset
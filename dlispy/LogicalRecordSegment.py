@@ -1,16 +1,34 @@
 import io
 
-from .common import myLogger, fs_seek_start, fs_seek_current
+from .common import myLogger, fs_seek_start, fs_seek_current, MemoryViewStream
 from .RCReader import *
 
 logger = myLogger("LogicalRecordSegment")
 
 
 LAZY_LOAD = True
+
+# Bits of the Logical Record Segment Attributes byte, from the most significant one.
+ATTR_EFLR = 0x80
+ATTR_PREDECESSOR = 0x40
+ATTR_SUCCESSOR = 0x20
+ATTR_ENCRYPTED = 0x10
+ATTR_ENCRYPTION_PKT = 0x08
+ATTR_CHECKSUM = 0x04
+ATTR_TRAILING_LENGTH = 0x02
+ATTR_PADDING = 0x01
+
+# Length of checksum and trailing length in the trailer, for each of the 256 attributes bytes. Padding is excluded
+# since its length is in the segment.
+TRAILER_LENGTHS = tuple((2 if b & ATTR_TRAILING_LENGTH else 0) + (2 if b & ATTR_CHECKSUM else 0) for b in range(256))
+
+
 class LogicalRecordSegment(object):
     """
     Represent Logical Record Segment.
     """
+    __slots__ = ('_startPos', '_segLen', '_lrType', '_encryptPkt', '_dataLen', '_padCount', '_checksum', '_attrs',
+                 '_trailerLen', '_body', '_dataStartPos')
 
     def __init__(self):
         self._startPos = 0
@@ -63,42 +81,42 @@ class LogicalRecordSegment(object):
 
     @property
     def isEFLR(self):
-        return int(self._attrs[0]) == 1
+        return self._attrs & ATTR_EFLR != 0
 
 
     @property
     def hasPred(self):
         """True if the segment has a predecessor segment."""
-        return int(self._attrs[1]) == 1
+        return self._attrs & ATTR_PREDECESSOR != 0
 
     @property
     def hasSucc(self):
         """True if the segment has a successor segment."""
-        return int(self._attrs[2]) == 1
+        return self._attrs & ATTR_SUCCESSOR != 0
 
     @property
     def encrypted(self):
-        return int(self._attrs[3]) == 1
+        return self._attrs & ATTR_ENCRYPTED != 0
 
 
     @property
     def hasEncryptionPkt(self):
-        return int(self._attrs[4]) == 1
+        return self._attrs & ATTR_ENCRYPTION_PKT != 0
 
 
     @property
     def hasChecksum(self):
-        return int(self._attrs[5]) == 1
+        return self._attrs & ATTR_CHECKSUM != 0
 
 
     @property
     def hasTrailingLength(self):
-        return int(self._attrs[6]) == 1
+        return self._attrs & ATTR_TRAILING_LENGTH != 0
 
 
     @property
     def hasPadding(self):
-        return int(self._attrs[7]) == 1
+        return self._attrs & ATTR_PADDING != 0
 
 
     @property
@@ -108,9 +126,7 @@ class LogicalRecordSegment(object):
     def readBody(self, fs):
         if self._body is None:
             fs.seek(self._dataStartPos, io.SEEK_SET)
-            r = bytearray()
-            r.extend(readBytes(fs, self._dataLen))
-            self._body =  bytes(r)
+            self._body = readBytes(fs, self._dataLen)
         return self._body
 
     @property
@@ -137,9 +153,7 @@ def _readHeader(fs, lrSeg):
     lrSeg._startPos = fs.tell()
     lrSeg._segLen = readUNORM(fs)
     _checkLrSegLen(lrSeg._segLen)
-    myAttr = readUSHORT(fs)
-    lrSeg._attrs =  '{0:08b}'.format(myAttr)
-    # logger.debug(lrSeg._attrs)
+    lrSeg._attrs = readUSHORT(fs)
     lrSeg._lrType = readUSHORT(fs)
 
     # now fs points to either encryption packet or body.
@@ -182,17 +196,19 @@ def _readBody(fs, lrSeg):
     """
     Read the body of LogicalRecordSegment, if it is part of an EFLR, then read it directly, otherwise,
     just read its index.
+    When fs is a :class:`.common.MemoryViewStream` (memory mapped file), the body is always kept as a zero-copy slice.
     :param fs:
     :param lrSeg:
     :return:
     """
-    if lrSeg.isEFLR is False or (lrSeg.isEFLR and lrSeg.encrypted):
+    if isinstance(fs, MemoryViewStream):
+        lrSeg._dataStartPos = fs.tell()
+        lrSeg._body = readBytes(fs, lrSeg._dataLen)
+    elif lrSeg.isEFLR is False or (lrSeg.isEFLR and lrSeg.encrypted):
         lrSeg._dataStartPos = fs.tell()
         fs.seek(lrSeg._dataLen, io.SEEK_CUR)
     else:
-        r = bytearray()
-        r.extend(readBytes(fs, lrSeg._dataLen))
-        lrSeg._body = bytes(r)
+        lrSeg._body = readBytes(fs, lrSeg._dataLen)
 
 
 def parseLRSegment(fs):
@@ -214,23 +230,11 @@ def _getTrailerLenth(fs, lrSeg):
     Compute total length of trailer including padding (optional),
     checksum and duplicated LR Segment length at the end.
     """
-    lrSeg._trailerLen = 0
-    if lrSeg.hasTrailingLength:
-        lrSeg._trailerLen +=2
-    if lrSeg.hasChecksum:
-        lrSeg._trailerLen +=2
+    lrSeg._trailerLen = TRAILER_LENGTHS[lrSeg._attrs]
     if lrSeg.hasPadding:
         currPos = fs.tell()
 
-        padCountPos = lrSeg.endPos-1
-        if lrSeg.hasTrailingLength:
-            if lrSeg.hasChecksum:
-                padCountPos -= 4
-            else:
-                padCountPos -= 2
-        else:
-            if lrSeg.hasChecksum:
-                padCountPos -= 2
+        padCountPos = lrSeg.endPos - 1 - lrSeg._trailerLen
         # move to the position of pad count byte.
         fs_seek_start(fs, padCountPos)
         lrSeg._padCount = readUSHORT(fs)
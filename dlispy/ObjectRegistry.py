@@ -0,0 +1,124 @@
+from .common import myLogger
+from .RCReader import ObName, ObjRef, ATTREF
+
+logger = myLogger("ObjectRegistry")
+
+
+class ObjectRegistry(object):
+    """
+    All the objects of the EFLRs of a logical file, keyed by (set type, object name), so that an OBNAME, OBJREF or
+    ATTREF is resolved with a dict lookup instead of a scan of every EFLR.
+
+    The objects of an EFLR are only indexed on the first lookup of its set type, so EFLRs decoded lazily are not
+    decoded when they are added. When several objects have the same set type and name, the first one is kept.
+    """
+
+    def __init__(self):
+        # set type -> EFLRs which are not indexed yet
+        self._pending = {}
+        # set type -> {object name -> object}
+        self._index = {}
+        # object name -> first object with this name of any set type, None until it is needed.
+        self._byName = None
+
+    def add(self, eflr):
+        """
+        Add the objects of an EFLR to this registry.
+
+        :type eflr: EFLR
+        :param eflr: The EFLR, an EFLR without set type like :class:`.PrivateEncryptedEFLR` is ignored.
+        """
+        setType = getattr(eflr, 'setType', None)
+        if setType is None:
+            return
+        self._pending.setdefault(setType, []).append(eflr)
+        self._byName = None
+
+    def addObjects(self, setType, objects):
+        """
+        Add objects which are appended to an EFLR already in this registry, like the new objects of a replacement set.
+
+        :type setType: str
+        :param setType: The set type of the EFLR.
+
+        :param objects: The appended objects.
+        """
+        # objects of an EFLR which is not indexed yet are indexed with it
+        index = self._index.get(setType)
+        if index is not None:
+            for obj in objects:
+                index.setdefault(obj.name, obj)
+        self._byName = None
+
+    def _objectsOf(self, setType):
+        """
+        :return: A dict with key as object name and value is the object, for given set type.
+        """
+        objects = self._index.setdefault(setType, {})
+        pending = self._pending.pop(setType, None)
+        if pending is not None:
+            for eflr in pending:
+                for obj in eflr.objects:
+                    objects.setdefault(obj.name, obj)
+        return objects
+
+    def get(self, setType, name):
+        """
+        Find an object by its set type and name.
+
+        :type setType: str
+        :param setType: The set type, like 'CHANNEL'.
+
+        :type name: ObName
+        :param name: The object name.
+
+        :return: The object, or None if it is not found.
+        """
+        return self._objectsOf(setType).get(name)
+
+    def getByName(self, name):
+        """
+        Find an object by its name only, when the set type is not known.
+
+        :type name: ObName
+        :param name: The object name.
+
+        :return: The first object with this name, or None if it is not found.
+        """
+        if self._byName is None:
+            self._byName = {}
+            for setType in list(self._pending.keys()) + list(self._index.keys()):
+                for objName, obj in self._objectsOf(setType).items():
+                    self._byName.setdefault(objName, obj)
+        return self._byName.get(name)
+
+    def setTypes(self):
+        """
+        :return: All the set types in this registry.
+        """
+        return set(self._pending.keys()) | set(self._index.keys())
+
+    def resolve(self, ref, setType = None):
+        """
+        Resolve a reference to an object.
+
+        :param ref: An :class:`.RCReader.ObjRef`, an :class:`.RCReader.ATTREF`, an :class:`.RCReader.ObName` or a list
+         of them, like the value of the CHANNELS attribute of a Tool.
+
+        :type setType: str
+        :param setType: The set type of the object an ObName refers to, like 'CHANNEL' for the channels of a Tool. By
+         default, the object is found by its name only.
+
+        :return: The object for an ObjRef or ObName, the :class:`.Component.Attribute` for an ATTREF, a list for a
+         list of references. None if it is not found.
+        """
+        if type(ref) is list:
+            return [self.resolve(r, setType) for r in ref]
+        if type(ref) is ObName:
+            return self.get(setType, ref) if setType is not None else self.getByName(ref)
+        if type(ref) is ObjRef or type(ref) is ATTREF:
+            obj = self.get(ref.type, ObName.instance(ref.origin, ref.copy, ref.identifier))
+            if type(ref) is ObjRef or obj is None:
+                return obj
+            return obj.getAttr(ref.label)
+        raise Exception('Unexpected reference {}'.format(ref))
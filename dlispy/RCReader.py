@@ -1,7 +1,7 @@
 import datetime
 from enum import Enum
-from .common import JsonAble, readBytes
-from struct import Struct
+from .common import JsonAble, objectDict, readBytes, MemoryViewStream
+from struct import Struct, unpack_from
 
 
 # RP66 V1 Representation code use big-endian.
@@ -19,15 +19,20 @@ S_FSHORT = Struct('>h')
 
 def readFSHORT(stream):
     """
-    Read FSHORT
+    Read FSHORT, Low precision floating point. The fractional part is the 12 high bits in two's complement and the
+    exponent is the 4 low bits.
 
     :type stream: FileIO or ByteIO
     :param stream: the stream object, could be either FileIO or ByteIO
 
     :return: The result
-    :rtype: int
+    :rtype: float
     """
-    return _read_struct(stream, S_FSHORT)
+    return _fshortToFloat(_read_struct(stream, S_FSHORT)[0])
+
+
+def _fshortToFloat(v):
+    return (v >> 4) / 2048.0 * (1 << (v & 0xF))
 
 
 S_FSINGL = Struct('>f')
@@ -107,10 +112,10 @@ def readFSING2(stream):
     return FSING2(stream)
 
 
-#TODO: untested
+S_ISINGL = Struct('>I')
 def readISINGL(stream):
     """
-    Read ISINGL from stream
+    Read ISINGL, IBM single precision floating point, from stream
 
     :type stream: FileIO or ByteIO
     :param stream: stream to be read
@@ -119,14 +124,19 @@ def readISINGL(stream):
     :rtype: float
 
     """
-    # raise Exception("ISINGL not supported")
-    return _read_struct(stream, Struct('>i'))
+    return _ibmToFloat(_read_struct(stream, S_ISINGL)[0])
 
 
-#TODO: untested
+def _ibmToFloat(v):
+    # sign bit, exponent of 16 in excess 64 and 24 bits fraction.
+    value = (v & 0xFFFFFF) / float(1 << 24) * 16.0 ** (((v >> 24) & 0x7F) - 64)
+    return -value if v & 0x80000000 else value
+
+
+S_VSINGL = Struct('<HH')
 def readVSINGL(stream):
     """
-    Read VSINGL from given stream
+    Read VSINGL, VAX single precision floating point, from given stream
 
     :type stream: FileIO or ByteIO
     :param stream: stream to be read
@@ -135,8 +145,16 @@ def readVSINGL(stream):
     :rtype: float
 
     """
-    # raise Exception("VSINGL not supported")
-    return _read_struct(stream, Struct('>i'))
+    return _vaxToFloat(*_read_struct(stream, S_VSINGL))
+
+
+def _vaxToFloat(high, low):
+    # VAX F floating is stored as two little-endian 16 bits words, the high word first.
+    exponent = (high >> 7) & 0xFF
+    if exponent == 0:
+        return 0.0
+    value = (0.5 + (((high & 0x7F) << 16) | low) / float(1 << 24)) * 2.0 ** (exponent - 128)
+    return -value if high & 0x8000 else value
 
 
 S_FDOUBL = Struct('>d')
@@ -232,7 +250,7 @@ def readCSINGL(stream):
     :rtype: complex
 
     """
-    return complex(S_CSINGL.unpack(stream.read(S_CSINGL.size)))
+    return complex(*_read_struct(stream, S_CSINGL))
 
 
 S_CDOUBL = Struct('>dd')
@@ -246,7 +264,7 @@ def readCDOUBL(stream):
     :return: result
     :rtype: complex
     """
-    return complex(S_CDOUBL.unpack(stream.read(S_CDOUBL.size)))
+    return complex(*_read_struct(stream, S_CDOUBL))
 
 
 S_SSHORT = Struct('>b')
@@ -362,9 +380,9 @@ def readIDENT(stream):
     l = stream.read(1)[0]
     payload = stream.read(l)
     try:
-        return payload.decode('ascii')
+        return str(payload, 'ascii')
     except UnicodeDecodeError:
-        return payload.decode('cp1252')
+        return str(payload, 'cp1252')
 
 
 def readASCII(stream):
@@ -381,13 +399,13 @@ def readASCII(stream):
     l = readUVARI(stream)
     payload = stream.read(l)
     try:
-        return payload.decode('ascii')
+        return str(payload, 'ascii')
     except UnicodeDecodeError:
         # Some DLIS file contains some special char which is out of ASCII, try cp1252 instead.
         try:
-            return payload.decode('cp1252')
+            return str(payload, 'cp1252')
         except UnicodeDecodeError:
-            return payload.decode('iso-8859-1')
+            return str(payload, 'iso-8859-1')
 
 
 
@@ -415,8 +433,12 @@ class DTime(JsonAble):
     """
     YEAR_OFFSET = 1900
 
-    def __init__(self, stream):
-        y, tz_m, d, h, min, s, ms = S_DTIME.unpack(stream.read(S_DTIME.size))
+    def __init__(self, stream = None):
+        if stream is not None:
+            self._unpack(S_DTIME.unpack(stream.read(S_DTIME.size)))
+
+    def _unpack(self, values):
+        y, tz_m, d, h, min, s, ms = values
         # Now fix various fields
         y += self.YEAR_OFFSET
         mon = tz_m & 0xF
@@ -460,7 +482,11 @@ class ObName(JsonAble):
         origin - int
         copy - int
         identifier - str
+
+    An ObName must not be changed once it is hashed, the hash is computed once and kept. ObNames decoded from a
+    buffer are interned, see :func:`decodeOBNAME`.
     """
+    __slots__ = ('origin', 'copy', 'identifier', '_hash')
 
     def __init__(self, stream = None):
         if stream is not None:
@@ -469,10 +495,19 @@ class ObName(JsonAble):
             self.identifier = readIDENT(stream)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return self.identifier == other.identifier and self.origin == other.origin and self.copy == other.copy
 
     def __hash__(self):
-        return hash((self.identifier, self.origin, self.copy))
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash((self.identifier, self.origin, self.copy))
+            return self._hash
+
+    def toJSON(self):
+        return {k: v for k, v in objectDict(self).items() if k != '_hash'}
 
     def __str__(self):
         return "OBNAME[origin:{} copy:{} identifier:{}]".format(self.origin, self.copy, self.identifier)
@@ -523,11 +558,14 @@ class ObjRef(JsonAble):
         identifier - str
 
     """
-    def __init__(self, stream):
-        self.type = readIDENT(stream)
-        self.origin = readORIGIN(stream)
-        self.copy = readUVARI(stream)
-        self.identifier = readIDENT(stream)
+    __slots__ = ('type', 'origin', 'copy', 'identifier')
+
+    def __init__(self, stream = None):
+        if stream is not None:
+            self.type = readIDENT(stream)
+            self.origin = readORIGIN(stream)
+            self.copy = readUVARI(stream)
+            self.identifier = readIDENT(stream)
 
 
 def readOBJREF(stream):
@@ -555,13 +593,16 @@ class ATTREF(JsonAble):
         label - str.
 
     """
-    def __init__(self, stream):
+    __slots__ = ('type', 'origin', 'copy', 'identifier', 'label')
+
+    def __init__(self, stream = None):
         """Constructor from a stream."""
-        self.type = readIDENT(stream)
-        self.origin = readORIGIN(stream)
-        self.copy = readUVARI(stream)
-        self.identifier = readIDENT(stream)
-        self.label = readIDENT(stream)
+        if stream is not None:
+            self.type = readIDENT(stream)
+            self.origin = readORIGIN(stream)
+            self.copy = readUVARI(stream)
+            self.identifier = readIDENT(stream)
+            self.label = readIDENT(stream)
 
 
 #TODO: not tested with sample data
@@ -636,16 +677,276 @@ CODE_TO_RC = {1:'FSHORT',
 RC_TO_CODE =  {v: k for k, v in CODE_TO_RC.items()}
 
 
-READ_RC_METHOD = tuple(
-    [globals()['read'+k] for k, _ in RC_TO_CODE.items()]
-)
+# Decoders of a single value at an offset of a buffer, like bytes or memoryview. Each of them returns a tuple (value,
+# offset right after the value), so a whole logical record is decoded without any stream.
+
+def _structDecoder(_struct):
+    """
+    :return: A decoder of a single value struct.
+    """
+    size = _struct.size
+    unpack = _struct.unpack_from
+
+    def decode(buf, offset):
+        return unpack(buf, offset)[0], offset + size
+    return decode
+
+
+def _streamDecoder(read):
+    """
+    :return: A decoder which reads the value with given stream reader, for the rare representation codes.
+    """
+    def decode(buf, offset):
+        stream = MemoryViewStream(buf)
+        stream.seek(offset)
+        return read(stream), stream.tell()
+    return decode
+
+
+decodeFSINGL = _structDecoder(S_FSINGL)
+decodeFDOUBL = _structDecoder(S_FDOUBL)
+decodeSSHORT = _structDecoder(S_SSHORT)
+decodeSNORM = _structDecoder(S_SNORM)
+decodeSLONG = _structDecoder(S_SLONG)
+decodeUSHORT = _structDecoder(S_USHORT)
+decodeUNORM = _structDecoder(S_UNORM)
+decodeULONG = _structDecoder(S_ULONG)
+decodeSTATUS = _structDecoder(S_STATUS)
+decodeFSING1 = _streamDecoder(readFSING1)
+decodeFSING2 = _streamDecoder(readFSING2)
+decodeFDOUB1 = _streamDecoder(readFDOUB1)
+decodeFDOUB2 = _streamDecoder(readFDOUB2)
+
+
+def decodeFSHORT(buf, offset):
+    return _fshortToFloat(S_FSHORT.unpack_from(buf, offset)[0]), offset + S_FSHORT.size
+
+
+def decodeISINGL(buf, offset):
+    return _ibmToFloat(S_ISINGL.unpack_from(buf, offset)[0]), offset + S_ISINGL.size
+
+
+def decodeVSINGL(buf, offset):
+    return _vaxToFloat(*S_VSINGL.unpack_from(buf, offset)), offset + S_VSINGL.size
+
+
+def decodeCSINGL(buf, offset):
+    return complex(*S_CSINGL.unpack_from(buf, offset)), offset + S_CSINGL.size
+
+
+def decodeCDOUBL(buf, offset):
+    return complex(*S_CDOUBL.unpack_from(buf, offset)), offset + S_CDOUBL.size
+
+
+def decodeUVARI(buf, offset):
+    """
+    Decode a Variable-Length Unsigned Integer, see :func:`readUVARI`.
+
+    :param buf: The buffer.
+
+    :param offset: Where the value starts.
+
+    :return: A tuple (value, offset after the value).
+    """
+    b = buf[offset]
+    if b & 0x80 == 0:
+        return b, offset + 1
+    if b & 0x40 == 0:
+        return ((b & 0x7F) << 8) | buf[offset + 1], offset + 2
+    return S_ULONG.unpack_from(buf, offset)[0] & 0x3FFFFFFF, offset + 4
+
+
+def _decodeText(buf, offset, length, encodings):
+    end = offset + length
+    payload = buf[offset:end]
+    for encoding in encodings[:-1]:
+        try:
+            return str(payload, encoding), end
+        except UnicodeDecodeError:
+            pass
+    return str(payload, encodings[-1]), end
+
+
+def decodeIDENT(buf, offset):
+    """
+    Decode a Variable-Length Identifier, see :func:`readIDENT`.
+    """
+    return _decodeText(buf, offset + 1, buf[offset], ('ascii', 'cp1252'))
+
+
+def decodeASCII(buf, offset):
+    """
+    Decode ASCII, see :func:`readASCII`.
+    """
+    length, offset = decodeUVARI(buf, offset)
+    return _decodeText(buf, offset, length, ('ascii', 'cp1252', 'iso-8859-1'))
+
+
+def decodeDTIME(buf, offset):
+    dtime = DTime()
+    dtime._unpack(S_DTIME.unpack_from(buf, offset))
+    return dtime, offset + S_DTIME.size
+
+
+decodeORIGIN = decodeUVARI
+decodeUNITS = decodeASCII
+
+
+# Max number of interned object names, the cache is cleared when it is full.
+MAX_INTERNED_OBNAMES = 1 << 16
+
+# raw bytes of an object name -> ObName
+_obNames = {}
+
+
+def decodeOBNAME(buf, offset):
+    """
+    Decode an object name. Object names are interned by their raw bytes, so the same name, like the frame name at
+    the beginning of every FData record, is decoded once and the same :class:`ObName` is returned.
+
+    :return: A tuple (:class:`ObName`, offset after the object name).
+    """
+    b = buf[offset]
+    # ORIGIN is a UVARI of 1, 2 or 4 bytes, then COPY is a USHORT, then IDENTIFIER is an IDENT
+    identStart = offset + (1 if b & 0x80 == 0 else 2 if b & 0x40 == 0 else 4) + 1
+    end = identStart + 1 + buf[identStart]
+    key = bytes(buf[offset:end])
+    obName = _obNames.get(key)
+    if obName is None:
+        obName = ObName()
+        obName.origin, offset = decodeUVARI(buf, offset)
+        obName.copy = buf[offset]
+        obName.identifier, offset = decodeIDENT(buf, offset + 1)
+        if len(_obNames) >= MAX_INTERNED_OBNAMES:
+            _obNames.clear()
+        _obNames[key] = obName
+    return obName, end
+
+
+def decodeOBJREF(buf, offset):
+    objRef = ObjRef()
+    objRef.type, offset = decodeIDENT(buf, offset)
+    objRef.origin, offset = decodeUVARI(buf, offset)
+    objRef.copy, offset = decodeUVARI(buf, offset)
+    objRef.identifier, offset = decodeIDENT(buf, offset)
+    return objRef, offset
+
+
+def decodeATTREF(buf, offset):
+    attRef = ATTREF()
+    attRef.type, offset = decodeIDENT(buf, offset)
+    attRef.origin, offset = decodeUVARI(buf, offset)
+    attRef.copy, offset = decodeUVARI(buf, offset)
+    attRef.identifier, offset = decodeIDENT(buf, offset)
+    attRef.label, offset = decodeIDENT(buf, offset)
+    return attRef, offset
+
+
+class Codec(object):
+    """
+    How to decode a representation code.
+
+    Attributes:
+        code    -   The representation code.
+
+        name    -   The symbolic name, like FSINGL.
+
+        size    -   Size in bytes of one value, or None for a variable size representation code.
+
+        format  -   The struct format character if the value is a plain number, otherwise None.
+
+        read    -   The scalar decoder which reads a single value from a stream.
+
+        decode  -   The scalar decoder of a single value at an offset of a buffer, which returns a tuple (value, offset
+        after the value).
+    """
+
+    def __init__(self, code, name, read, decode, size = None, format = None):
+        self.code = code
+        self.name = name
+        self.read = read
+        self.decode = decode
+        self.size = size
+        self.format = format
+
+    def __str__(self):
+        return "Codec[code:{} name:{} size:{}]".format(self.code, self.name, self.size)
+
+
+def _registerCodecs(*codecs):
+    return {codec.code: codec for codec in codecs}
+
+
+CODECS = _registerCodecs(
+    Codec(1, 'FSHORT', readFSHORT, decodeFSHORT, 2),
+    Codec(2, 'FSINGL', readFSINGL, decodeFSINGL, 4, 'f'),
+    Codec(3, 'FSING1', readFSING1, decodeFSING1, 8),
+    Codec(4, 'FSING2', readFSING2, decodeFSING2, 12),
+    Codec(5, 'ISINGL', readISINGL, decodeISINGL, 4),
+    Codec(6, 'VSINGL', readVSINGL, decodeVSINGL, 4),
+    Codec(7, 'FDOUBL', readFDOUBL, decodeFDOUBL, 8, 'd'),
+    Codec(8, 'FDOUB1', readFDOUB1, decodeFDOUB1, 16),
+    Codec(9, 'FDOUB2', readFDOUB2, decodeFDOUB2, 24),
+    Codec(10, 'CSINGL', readCSINGL, decodeCSINGL, 8),
+    Codec(11, 'CDOUBL', readCDOUBL, decodeCDOUBL, 16),
+    Codec(12, 'SSHORT', readSSHORT, decodeSSHORT, 1, 'b'),
+    Codec(13, 'SNORM', readSNORM, decodeSNORM, 2, 'h'),
+    Codec(14, 'SLONG', readSLONG, decodeSLONG, 4, 'i'),
+    Codec(15, 'USHORT', readUSHORT, decodeUSHORT, 1, 'B'),
+    Codec(16, 'UNORM', readUNORM, decodeUNORM, 2, 'H'),
+    Codec(17, 'ULONG', readULONG, decodeULONG, 4, 'I'),
+    Codec(18, 'UVARI', readUVARI, decodeUVARI),
+    Codec(19, 'IDENT', readIDENT, decodeIDENT),
+    Codec(20, 'ASCII', readASCII, decodeASCII),
+    Codec(21, 'DTIME', readDTIME, decodeDTIME, 8),
+    Codec(22, 'ORIGIN', readORIGIN, decodeORIGIN),
+    Codec(23, 'OBNAME', readOBNAME, decodeOBNAME),
+    Codec(24, 'OBJREF', readOBJREF, decodeOBJREF),
+    Codec(25, 'ATTREF', readATTREF, decodeATTREF),
+    Codec(26, 'STATUS', readSTATUS, decodeSTATUS, 1, 'B'),
+    Codec(27, 'UNITS', readUNITS, decodeUNITS))
+
+
+def getCodec(c):
+    """
+    :param c: Rep code in integer.
+
+    :return: The :class:`Codec` of given rep code.
+    """
+    codec = CODECS.get(c)
+    if codec is None:
+        raise Exception('Unexpected rc code :{}'.format(c))
+    return codec
 
 
 def readByRC(c, stream):
     """Given an Rep code in integer, read a single value from stream."""
-    if c < 1 or c > len(RC_TO_CODE.items()):
-        raise Exception('Unexpected rc code :{}'.format(c))
+    return getCodec(c).read(stream)
+
 
-    # index of READ_RC_METHOD starts from 0 but code starts from 1
-    f = globals()['read'+CODE_TO_RC[c]]
-    return f(stream)
\ No newline at end of file
+def read_many(code, count, buffer, offset = 0):
+    """
+    Decode count values of given rep code from a buffer. Plain numbers are decoded with a single struct unpack.
+
+    :type code: int
+    :param code: Rep code in integer.
+
+    :type count: int
+    :param count: Number of values.
+
+    :param buffer: A bytes like object.
+
+    :type offset: int
+    :param offset: Where the first value starts in the buffer.
+
+    :return: A tuple (list of values, offset right after the last value).
+    """
+    codec = getCodec(code)
+    if codec.format is not None:
+        values = list(unpack_from('>{}{}'.format(count, codec.format), buffer, offset))
+        return values, offset + codec.size * count
+    values = []
+    for i in range(count):
+        value, offset = codec.decode(buffer, offset)
+        values.append(value)
+    return values, offset
@@ -0,0 +1,282 @@
+from array import array
+
+from .RCReader import *
+from .common import myLogger, fs_seek_start, DLIS_VERSION, MemoryViewStream
+from .LogicalRecordSegment import EncryptionPacket, _checkLrSegLen, ATTR_EFLR, ATTR_PREDECESSOR, ATTR_SUCCESSOR, \
+    ATTR_ENCRYPTED, ATTR_ENCRYPTION_PKT, ATTR_TRAILING_LENGTH, ATTR_PADDING, TRAILER_LENGTHS
+
+logger = myLogger("SegmentTable")
+
+# The index value of every INDEX_SAMPLE_STEP-th FData record of a frame is sampled, see indexSamples.
+INDEX_SAMPLE_STEP = 64
+
+
+class SegmentTable(object):
+    """
+    A compact, columnar representation of all the Logical Record Segments in a DLIS file. Instead of one
+    :class:`.LogicalRecordSegment` object per segment, each segment is one row in a set of parallel arrays.
+
+    Attributes:
+        startPos    -   Position of the segment header in the file.
+
+        dataPos     -   Position of the segment body (after the encryption packet, if any) in the file.
+
+        dataLen     -   Length of the segment body, trailer and encryption packet excluded.
+
+        attrs       -   Logical Record Segment Attributes as a bitmask, see ATTR_* in :mod:`.LogicalRecordSegment`.
+
+        lrType      -   Logical Record type.
+
+        encryptPkts -   A dict with key as row number and value is the :class:`.EncryptionPacket` of that segment,
+        only segments with an encryption packet are included.
+
+        fhlrRows    -   Rows of the FHLR segments, each of them starts a Logical File.
+
+        frameRows   -   A dict with key as the raw bytes of the frame OBNAME and value is the rows of the first
+        segment of each FData record of that frame. Records whose OBNAME is not complete in the first segment are kept
+        with key None.
+
+        indexSamples    -   A dict with key as the row of the first FData record of a frame in a logical file and value
+        is the index values, i.e. values of the first channel, of every INDEX_SAMPLE_STEP-th FData record of that frame
+        and of its last record. Frames are sampled when their index is needed, see
+        :meth:`.LogicalFile.LogicalFile.read_frames`.
+    """
+
+    def __init__(self):
+        self.startPos = array('q')
+        self.dataPos = array('q')
+        self.dataLen = array('H')
+        self.attrs = array('B')
+        self.lrType = array('B')
+        self.encryptPkts = {}
+        self.fhlrRows = array('q')
+        self.frameRows = {}
+        self.indexSamples = {}
+
+    def __len__(self):
+        return len(self.attrs)
+
+    def __str__(self):
+        return 'SegmentTable[numOfSegments:{}]'.format(len(self))
+
+    def append(self, startPos, dataPos, dataLen, attrs, lrType):
+        """
+        Add a segment to the end of the table.
+
+        :return: the row number of the new segment.
+        """
+        self.startPos.append(startPos)
+        self.dataPos.append(dataPos)
+        self.dataLen.append(dataLen)
+        self.attrs.append(attrs)
+        self.lrType.append(lrType)
+        return len(self.attrs) - 1
+
+    def isEFLR(self, row):
+        return self.attrs[row] & ATTR_EFLR != 0
+
+    def hasPred(self, row):
+        """True if the segment has a predecessor segment."""
+        return self.attrs[row] & ATTR_PREDECESSOR != 0
+
+    def hasSucc(self, row):
+        """True if the segment has a successor segment."""
+        return self.attrs[row] & ATTR_SUCCESSOR != 0
+
+    def encrypted(self, row):
+        return self.attrs[row] & ATTR_ENCRYPTED != 0
+
+    def hasTrailingLength(self, row):
+        return self.attrs[row] & ATTR_TRAILING_LENGTH != 0
+
+    def readBody(self, row, fs):
+        """
+        Read the body of given segment.
+
+        :param row: The row number of the segment.
+
+        :param fs: File stream of the original DLIS file, when it is a :class:`.common.MemoryViewStream` the body is a
+         zero-copy slice.
+
+        :return: The body.
+        """
+        fs_seek_start(fs, self.dataPos[row])
+        return readBytes(fs, self.dataLen[row])
+
+    def appendSegments(self, buf, bufPos):
+        """
+        Append all the Logical Record Segments of a Visible Record to the table.
+
+        :param buf: The body of a Visible Record, see :func:`iterVisibleRecords`.
+
+        :param bufPos: Position of the buffer in the file.
+
+        :return: None
+        """
+        for startPos, dataOffset, dataLen, attrs, lrType, encryptPkt in iterSegments(buf, bufPos):
+            row = self.append(startPos, bufPos + dataOffset, dataLen, attrs, lrType)
+            if encryptPkt is not None:
+                self.encryptPkts[row] = encryptPkt
+            if lrType == 0 and attrs & (ATTR_PREDECESSOR | ATTR_ENCRYPTED) == 0:
+                if attrs & ATTR_EFLR:
+                    self.fhlrRows.append(row)
+                else:
+                    key = _obnameBytes(buf, dataOffset, dataOffset + dataLen)
+                    rows = self.frameRows.get(key)
+                    if rows is None:
+                        rows = self.frameRows[key] = array('q')
+                    rows.append(row)
+
+    @staticmethod
+    def parse(fs, totalBytes=None):
+        """
+        Scan all the Visible Records from current position to totalBytes and collect their segments.
+
+        :param fs: The file stream, it must point to the first Visible Record.
+
+        :param totalBytes: Size of the file, if None, scan until the end of the stream.
+
+        :return: The segment table.
+        """
+        table = SegmentTable()
+        numOfVr = 0
+        for bufPos, buf in iterVisibleRecords(fs, fs.tell(), totalBytes):
+            table.appendSegments(buf, bufPos)
+            numOfVr += 1
+        logger.debug("Found %s Visible Records and %s LR Segments", numOfVr, len(table))
+        return table
+
+
+S_VR_HEADER = Struct('>HBB')
+S_SEGMENT_HEADER = Struct('>HBB')
+
+
+def iterVisibleRecords(fs, pos, totalBytes=None):
+    """
+    Read the Visible Records one by one. Each Visible Record is read into a single buffer with one read, then all
+    segment headers and trailers can be found inside that buffer, see :func:`iterSegments`.
+
+    :param fs: The file stream, it must point to a Visible Record.
+
+    :param pos: Current position of the stream.
+
+    :param totalBytes: Size of the file, if None, read until the end of the stream.
+
+    :return: A generator of tuples (position of the buffer in the file, the Visible Record without its header).
+    """
+    while totalBytes is None or pos < totalBytes:
+        header = fs.read(S_VR_HEADER.size)
+        if len(header) == 0 and totalBytes is None:
+            return
+        if len(header) != S_VR_HEADER.size:
+            raise Exception('Can not read Visible Record header at file position {}'.format(pos))
+        vrLen, ff, myV = S_VR_HEADER.unpack(header)
+        assert(ff == 0xFF)
+        if myV != DLIS_VERSION:
+            raise Exception(
+                'VisibleRecord, unsupported format version. Expected {}, but get {}, at file position {}'
+                    .format(DLIS_VERSION, myV, pos))
+        buf = readBytes(fs, vrLen - S_VR_HEADER.size)
+        yield pos + S_VR_HEADER.size, buf
+        pos += vrLen
+
+
+def iterSegments(buf, bufPos):
+    """
+    Find all the Logical Record Segments in the buffer of a Visible Record, there is no file I/O.
+
+    :param buf: The body of a Visible Record, which only includes complete segments.
+
+    :param bufPos: Position of the buffer in the file.
+
+    :return: A generator of tuples (segment position in the file, body offset in buf, body length, attributes bitmask,
+     LR type, encryption packet or None).
+    """
+    offset = 0
+    bufLen = len(buf)
+    while offset < bufLen:
+        segLen, attrs, lrType = S_SEGMENT_HEADER.unpack_from(buf, offset)
+        _checkLrSegLen(segLen)
+        endOffset = offset + segLen
+        if endOffset > bufLen:
+            raise Exception('LR Segment at file position {} is beyond its Visible Record'.format(bufPos + offset))
+
+        trailerLen = TRAILER_LENGTHS[attrs]
+        if attrs & ATTR_TRAILING_LENGTH:
+            assert(S_UNORM.unpack_from(buf, endOffset - 2)[0] == segLen)
+        if attrs & ATTR_PADDING:
+            # pad count is the last byte of the padding, right before checksum and trailing length.
+            trailerLen += buf[endOffset - 1 - trailerLen]
+
+        dataOffset = offset + S_SEGMENT_HEADER.size
+        dataLen = segLen - S_SEGMENT_HEADER.size - trailerLen
+        encryptPkt = None
+        if attrs & ATTR_ENCRYPTION_PKT:
+            pktStream = MemoryViewStream(buf)
+            pktStream.seek(dataOffset)
+            encryptPkt = EncryptionPacket(pktStream)
+            # don't keep the whole Visible Record alive for the payload
+            encryptPkt.payload = bytes(encryptPkt.payload)
+            dataOffset += len(encryptPkt)
+            dataLen -= len(encryptPkt)
+        if attrs & ATTR_ENCRYPTED == 0 and dataLen < 0:
+            raise Exception('Illegal negative data length of {:d}'.format(dataLen))
+
+        yield bufPos + offset, dataOffset, max(dataLen, 0), attrs, lrType, encryptPkt
+        offset = endOffset
+
+
+def iterLogicalRecords(fs, pos, totalBytes=None, skipIFLR=False):
+    """
+    Read the stream forward and put the segments of each logical record together, only one logical record is kept in
+    memory at a time.
+
+    :param fs: The file stream, it must point to a Visible Record.
+
+    :param pos: Current position of the stream.
+
+    :param totalBytes: Size of the file, if None, read until the end of the stream.
+
+    :param skipIFLR: If True, bodies of IFLRs are not kept and IFLRs are not returned.
+
+    :return: A generator of tuples (LR type, attributes bitmask of the first segment, encryption packet of the first
+     segment or None, bodies of all the segments). The body of a single segment record is a slice of the Visible Record.
+    """
+    # one pending logical record for EFLR and one for IFLR, as their segments are not mixed together.
+    pending = {True: None, False: None}
+    for bufPos, buf in iterVisibleRecords(fs, pos, totalBytes):
+        view = memoryview(buf)
+        for _, dataOffset, dataLen, attrs, lrType, encryptPkt in iterSegments(buf, bufPos):
+            isEFLR = attrs & ATTR_EFLR != 0
+            if skipIFLR and not isEFLR:
+                continue
+            if attrs & ATTR_PREDECESSOR == 0:
+                pending[isEFLR] = (lrType, attrs, encryptPkt, [])
+            lr = pending[isEFLR]
+            if lr is None:
+                raise Exception('LR Segment at file position {} has no predecessor'.format(bufPos + dataOffset))
+            lr[3].append(view[dataOffset:dataOffset + dataLen])
+            if attrs & ATTR_SUCCESSOR:
+                continue
+            pending[isEFLR] = None
+            bodies = lr[3]
+            yield lr[0], lr[1], lr[2], bodies[0] if len(bodies) == 1 else b''.join(bodies)
+
+
+def _obnameBytes(buf, offset, end):
+    """
+    Find the raw bytes of the OBNAME at the beginning of a FData record without decoding it.
+
+    :return: The bytes of the OBNAME or None if it is not complete before end.
+    """
+    if offset >= end:
+        return None
+    b = buf[offset]
+    # ORIGIN is UVARI of 1, 2 or 4 bytes, then COPY as USHORT, then IDENT.
+    identPos = offset + (1 if b & 0x80 == 0 else (2 if b & 0x40 == 0 else 4)) + 1
+    if identPos >= end:
+        return None
+    obnameEnd = identPos + 1 + buf[identPos]
+    if obnameEnd > end:
+        return None
+    return bytes(buf[offset:obnameEnd])
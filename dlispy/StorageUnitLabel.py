@@ -56,7 +56,7 @@ class StorageUnitLabel(object):
         - Storage Set Identifier: 60xChar."""
         
         # First 4 bytes are Storage unit sequence number
-        value = readBytes(fs, StorageUnitLabel.SU_SEQNUM_LENGTH)
+        value = bytes(readBytes(fs, StorageUnitLabel.SU_SEQNUM_LENGTH))
         try:
             sul._susn = int(value)
         except ValueError:
@@ -83,5 +83,6 @@ class StorageUnitLabel(object):
         # Finally the Storage Set Identifier (60 bytes) that is common to both versions
         sul._ssi = readAsString(fs, StorageUnitLabel.SSI_LENGTH)
         logger.debug("Storage Set Identifer:%s", sul._ssi)
-        assert(StorageUnitLabel.LENGTH == fs.tell())
+        # Note: readBytes always reads exact number of bytes, so there is no need to check fs.tell() which is not
+        # supported by non-seekable streams.
         return sul
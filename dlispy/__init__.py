@@ -1,11 +1,16 @@
 from .StorageUnitLabel import StorageUnitLabel
 from .VisibleRecord import VisibleRecord
+from .SegmentTable import SegmentTable
+from .CompressedFile import CompressedFile
+from .ObjectRegistry import ObjectRegistry
+from .FrameView import FrameView
+from .FrameColumns import FrameColumns
 from .common import file_size, myLogger
 
 from .LogicalFile import LogicalFile
 from .LogicalRecord import *
-from .core import parse, dump, cli
+from .core import parse, dump, cli, iter_logical_files, iter_records, open_dlis
 
 __version__ = '0.1.0'
 __author__ = 'Teradata'
-__all__ = ['parse', 'dump']
\ No newline at end of file
+__all__ = ['parse', 'dump', 'iter_logical_files', 'iter_records', 'open_dlis']
\ No newline at end of file
@@ -16,7 +16,7 @@ def myLogger(module_name):
 def readAsString(fs, n):
     """Reads exactly n bytes and returns them as str."""
     b_value = readBytes(fs, n)
-    return b_value.decode('ascii')
+    return str(b_value, 'ascii')
 
 
 def readBytes(fs, n):
@@ -35,7 +35,7 @@ def readAsInteger(fs, n):
     if len(b) != n:
         raise Exception('Can not read {} bytes only {}'.format(n, len(b)))
     try:
-        r = int(b)
+        r = int(bytes(b))
     except ValueError:
         raise Exception('Can not determine integer RP66 version number from {}'.format(b))
     return r
@@ -69,6 +69,47 @@ def fs_seek_current(fs, offset):
     fs.seek(offset, io.SEEK_CUR)
 
 
+class MemoryViewStream(object):
+    """
+    A read-only file like stream over a buffer (bytes, bytearray, mmap...). Different from io.BytesIO, the buffer is
+    never copied and :meth:`read` returns memoryview slices of it, so the whole parsing stack can work on a memory
+    mapped DLIS file without copying the bytes.
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def read(self, n=-1):
+        start = self._pos
+        if n is None or n < 0:
+            end = len(self._view)
+        else:
+            end = min(start + n, len(self._view))
+        self._pos = end
+        return self._view[start:end]
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        else:
+            raise ValueError('Invalid whence {}'.format(whence))
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        """
+        Release the view held by this stream, slices returned by :meth:`read` are still valid.
+        """
+        self._view.release()
+
+
 class switch(object):
     """
     Since python doesn't support switch, this is a syntax sugar for it
@@ -107,8 +148,44 @@ class JsonAble:
     """
     Super class for any class which should support json serialization
     """
+    __slots__ = ()
+
     def toJSON(self):
-        return self.__dict__
+        return objectDict(self)
+
+
+# class -> names of its slots and the slots of its base classes.
+_slotNames = {}
+
+
+def objectDict(obj):
+    """
+    The attributes of an object as a dict, like `__dict__` but the attributes in `__slots__` are also included, in
+    the order they are declared from the base class. A slot which is not set is excluded.
+
+    :param obj: Any object.
+
+    :return: A dict with key as attribute name and value is the attribute value.
+    """
+    cls = type(obj)
+    names = _slotNames.get(cls)
+    if names is None:
+        names = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get('__slots__', ()):
+                if name not in ('__dict__', '__weakref__') and name not in names:
+                    names.append(name)
+        names = tuple(names)
+        _slotNames[cls] = names
+    d = {}
+    for name in names:
+        try:
+            d[name] = getattr(obj, name)
+        except AttributeError:
+            pass
+    if hasattr(obj, '__dict__'):
+        d.update(obj.__dict__)
+    return d
 
 
 def convert_bytes(num):
@@ -1,76 +1,334 @@
+import contextlib
 import io
+import mmap
 import os
+import sys
 
 import click
 import time
 
 from .StorageUnitLabel import StorageUnitLabel
-from .VisibleRecord import VisibleRecord
+from .SegmentTable import SegmentTable, iterVisibleRecords, iterLogicalRecords
+from .LogicalRecordSegment import ATTR_EFLR, ATTR_ENCRYPTED
+from .IndexFile import loadIndex, saveIndex
+from .CompressedFile import CompressedFile, compression
 from .LogicalFile import LogicalFile
-from .common import myLogger, file_size
+from .common import myLogger, file_size, MemoryViewStream
 
 logger = myLogger('core')
 
 
-def parse(path, eflr_only = False):
+def parse(path, eflr_only = False, use_mmap = False, use_index = False, index_dir = None, forward_only = None,
+          lazy_eflr = False, set_types = None, channels = None):
     """
     Parse a DLIS file which may include multiple Logical Files.
     :type path: str
-    :param path: File path to the DLIS file
+    :param path: File path to the DLIS file, or a binary file object like a pipe, stdin, a tarfile member or a gzip
+     stream. A gzip or xz compressed file path is decompressed on the fly, with random access through a seek-point
+     index, see :class:`.CompressedFile`.
 
     :type eflr_only: bool
     :param eflr_only: If Truem, then only parse EFLR in each logical file.
 
+    :type use_mmap: bool
+    :param use_mmap: If True, the file is memory mapped and all the layers work on a memoryview of it, the bodies of
+     logical record segments are slices of the mapped file rather than copies.
+
+    :type use_index: bool
+    :param use_index: If True, load the segment table from the sidecar index file (.dlisidx) instead of scanning all
+     the Visible Records. The index file is (re)built when it doesn't exist or is stale, with the index values
+     sampled from the FData records of each frame, see :meth:`.LogicalFile.read_frames`.
+
+    :type index_dir: str
+    :param index_dir: A cache directory for the index files, by default the index file is next to the DLIS file.
+
+    :type forward_only: bool
+    :param forward_only: If True, the file is read forward only and every byte is read exactly once, so that it
+     works with non-seekable streams. Then IFLRs are loaded while reading, and they can't be loaded later with
+     :meth:`.LogicalFile.loadIFLR` when eflr_only is True. By default, it is True only for a non-seekable file
+     object.
+
+    :type lazy_eflr: bool
+    :param lazy_eflr: If True, only the set type, set name and template of an EFLR are decoded while parsing, its
+     objects are decoded on first access to :attr:`.EFLR.objects`. Objects of FHLR, CHANNEL and FRAME are always
+     decoded.
+
+    :type set_types: set
+    :param set_types: The set types of the EFLRs to parse, like {'FILE-HEADER', 'ORIGIN', 'CHANNEL', 'FRAME'}. Other
+     EFLRs are skipped after reading their set header, the FHLR is always parsed. FData records are dropped unless
+     both FRAME and CHANNEL are parsed. By default all the EFLRs are parsed.
+
+    :type channels: list
+    :param channels: The identifiers of the channels to decode from FData records, like ['TDEP', 'GR']. A channel which
+     is not decoded is skipped by its size when possible, see :attr:`.LogicalFile.channels`. By default or with an
+     empty list, all the channels are decoded.
+
     :return: a tuple, first element is instance of :class:`.StorageUnitLabel` and second element is a list of :class:`.LogicalFile`.
 
     """
 
     start = time.time()
     logger.info("Start parsing DLIS file %s", path)
-    fs = None
-    try:
-        fs = open(path, 'rb')
-
-        # record the total bytes
-        fs.seek(0, io.SEEK_END)
-        total_bytes = fs.tell()
-        # move back to the beginning of the file
-        fs.seek(0, io.SEEK_SET)
-        # fs_seek_start(fs, 0)
+    with _openDlis(path, use_mmap, forward_only) as (fs, total_bytes, forward_only):
         logger.debug("Start parsing Storage Unit Label")
         sul = StorageUnitLabel.parse(fs)
         logger.debug(sul)
         logger.debug("End parsing Storage Unit Label")
-        vrList = []
-        lrSegList = []
-        while fs.tell() < total_bytes:
-            vr = VisibleRecord.parse(fs)
-            vrList.append(vr)
-            #Lazy loading for IFLR: if lrSeg is part of EFLR, then its body is loaded,
-            #  otherwise only the pos and length are recorded.
-            lrSegList.extend(vr.lrSegList)
-            logger.debug(vr)
-
-        logger.debug("Start parsing %s LR Segments", len(lrSegList))
-        lfList = _splitLogicalFiles(lrSegList, fs, eflr_only)
+        if forward_only:
+            lfList = _readLogicalFiles(fs, total_bytes, eflr_only, lazy_eflr, set_types, channels)
+            logger.info("End parsing DLIS file, found %s LogicalFiles", len(lfList))
+            return sul, lfList
+
+        # Only the position and length of each segment body is recorded, bodies are read when they are parsed.
+        segTable = None
+        if use_index:
+            if _isPath(path):
+                segTable = loadIndex(path, index_dir)
+            else:
+                logger.warning("Index file is only supported for a file path")
+        buildIndex = False
+        if segTable is None:
+            segTable = SegmentTable.parse(fs, total_bytes)
+            buildIndex = use_index and _isPath(path)
+
+        logger.debug("Start parsing %s LR Segments", len(segTable))
+        lfList = _splitLogicalFiles(segTable, fs, eflr_only, lazy_eflr, set_types, channels)
+        if buildIndex:
+            # frames are sampled once the EFLRs are parsed, which give the representation code of index channels.
+            for lf in lfList:
+                lf._sampleIndex(fs)
+            saveIndex(path, segTable, index_dir)
+        if _isPath(path):
+            for lf in lfList:
+                lf.source = path
         logger.info("End parsing DLIS file, found %s LogicalFiles", len(lfList))
 
+    end = time.time()
+    if _isPath(path):
+        logger.info("Took %s sec to parse %s file - %s", end-start, file_size(path), path)
+    return sul, lfList
+
+
+def iter_logical_files(path, eflr_only = False, use_mmap = False, forward_only = None, lazy_eflr = False,
+                       set_types = None, channels = None):
+    """
+    A generator version of :func:`parse`, each Logical File is returned as soon as all its segments have been read,
+    without waiting for the rest of the DLIS file.
+
+    :type path: str
+    :param path: File path to the DLIS file, or a binary file object.
+
+    :type eflr_only: bool
+    :param eflr_only: If True, then only parse EFLR in each logical file.
+
+    :type use_mmap: bool
+    :param use_mmap: If True, the file is memory mapped, see :func:`parse`.
+
+    :type forward_only: bool
+    :param forward_only: If True, the file is read forward only, see :func:`parse`.
+
+    :type lazy_eflr: bool
+    :param lazy_eflr: If True, objects of EFLRs are decoded on first access, see :func:`parse`.
+
+    :type set_types: set
+    :param set_types: The set types of the EFLRs to parse, see :func:`parse`.
+
+    :type channels: list
+    :param channels: The identifiers of the channels to decode, see :func:`parse`.
+
+    :return: A generator of :class:`.LogicalFile`.
+    """
+    with _openDlis(path, use_mmap, forward_only) as (fs, total_bytes, forward_only):
+        StorageUnitLabel.parse(fs)
+        if forward_only:
+            lf = None
+            for lf_read, lr in _iterRecords(fs, total_bytes, eflr_only, lazy_eflr, set_types, channels):
+                if lf_read is not lf:
+                    if lf is not None:
+                        lf._trimFrames()
+                        yield lf
+                    lf = lf_read
+                lf._addIFLR(lr)
+            if lf is not None:
+                lf._trimFrames()
+                yield lf
+            return
+
+        segTable = SegmentTable()
+        startRow = 0
+        hasFhlr = False
+        for bufPos, buf in iterVisibleRecords(fs, StorageUnitLabel.LENGTH, total_bytes):
+            numOfFhlr = len(segTable.fhlrRows)
+            segTable.appendSegments(buf, bufPos)
+            for row in segTable.fhlrRows[numOfFhlr:]:
+                if hasFhlr:
+                    # parsing the logical file moves the stream, so come back to where the scan stops.
+                    pos = fs.tell()
+                    lf = LogicalFile(segTable, startRow, row, fs, eflrOnly=eflr_only, lazyEflr=lazy_eflr,
+                                     setTypes=set_types, channels=channels)
+                    lf.source = path if _isPath(path) else None
+                    fs.seek(pos, io.SEEK_SET)
+                    yield lf
+                    startRow = row
+                hasFhlr = True
+        lf = LogicalFile(segTable, startRow, len(segTable), fs, eflrOnly=eflr_only, lazyEflr=lazy_eflr,
+                         setTypes=set_types, channels=channels)
+        lf.source = path if _isPath(path) else None
+        yield lf
+
+
+def iter_records(path, eflr_only = False, use_mmap = False):
+    """
+    Read a DLIS file forward and return its logical records one at a time, so the memory is bounded by one logical
+    record instead of the whole file. FData records are not kept in the logical file. Every byte is read exactly
+    once, so a non-seekable file object is also supported.
+
+    :type path: str
+    :param path: File path to the DLIS file, or a binary file object.
+
+    :type eflr_only: bool
+    :param eflr_only: If True, IFLRs are skipped.
+
+    :type use_mmap: bool
+    :param use_mmap: If True, the file is memory mapped, see :func:`parse`.
+
+    :return: A generator of tuples (:class:`.LogicalFile`, logical record). The logical file only includes the EFLRs
+     read so far, a new one starts at each FHLR. The logical record is either an EFLR or an IFLR, which is a
+     :class:`.FrameData` for FData, or an :class:`.UnformattedDataLR`, :class:`.EoD` or :class:`.PrivateIFLR`.
+    """
+    with _openDlis(path, use_mmap, forward_only=True) as (fs, total_bytes, _):
+        StorageUnitLabel.parse(fs)
+        for lf, lr in _iterRecords(fs, total_bytes, eflr_only):
+            yield lf, lr
+
+
+def _iterRecords(fs, total_bytes, eflr_only = False, lazy_eflr = False, set_types = None, channels = None):
+    """
+    Decode the logical records one by one, the stream must point to the first Visible Record.
+
+    :return: A generator of tuples (:class:`.LogicalFile`, logical record), see :func:`iter_records`.
+    """
+    lf = None
+    for lrType, attrs, encryptPkt, lrBytes in \
+            iterLogicalRecords(fs, StorageUnitLabel.LENGTH, total_bytes, skipIFLR=eflr_only):
+        if attrs & ATTR_EFLR:
+            if lf is None or (lrType == 0 and len(lf.eflrList) > 0):
+                lf = LogicalFile(lazyEflr=lazy_eflr, setTypes=set_types, channels=channels)
+            if lf._isSkippedEFLR(lrType, attrs & ATTR_ENCRYPTED != 0, lrBytes):
+                continue
+            lr = lf._decodeEFLR(lrType, attrs & ATTR_ENCRYPTED != 0, encryptPkt, lrBytes)
+            if not lf._addEFLR(lr):
+                # a redundant or replacement set merged into its original set
+                continue
+        else:
+            if lf is None:
+                lf = LogicalFile(lazyEflr=lazy_eflr, setTypes=set_types, channels=channels)
+            lr = lf._decodeIFLR(lrType, lrBytes)
+            if lr is None:
+                continue
+        yield lf, lr
+
+
+def _readLogicalFiles(fs, total_bytes, eflr_only = False, lazy_eflr = False, set_types = None, channels = None):
+    """
+    Read all the logical files forward, IFLRs are loaded while reading.
+
+    :return: A list of :class:`.LogicalFile`
+    """
+    lf_list = []
+    for lf, lr in _iterRecords(fs, total_bytes, eflr_only, lazy_eflr, set_types, channels):
+        if len(lf_list) == 0 or lf_list[-1] is not lf:
+            lf_list.append(lf)
+        lf._addIFLR(lr)
+    for lf in lf_list:
+        lf._trimFrames()
+    return lf_list
+
+
+def _isPath(path):
+    """
+    :return: True if path is a file path rather than a file object.
+    """
+    return not hasattr(path, 'read')
+
+
+def open_dlis(path):
+    """
+    Open a DLIS file for reading, e.g. to load IFLRs later with :meth:`.LogicalFile.loadIFLR`. A gzip or xz compressed
+    file is detected from its magic bytes and opened as a seekable :class:`.CompressedFile`.
+
+    :type path: str
+    :param path: File path to the DLIS file, it may be compressed by gzip or xz.
+
+    :return: A binary file object.
+    """
+    if compression(path) is not None:
+        return CompressedFile(path)
+    return open(path, 'rb')
+
+
+@contextlib.contextmanager
+def _openDlis(path, use_mmap = False, forward_only = None):
+    """
+    Open a DLIS file for reading.
+
+    :param path: File path to the DLIS file, or a binary file object which is not closed. A seekable file object must
+     start with the DLIS file at position 0. A file path may be a gzip or xz compressed DLIS file.
+
+    :param use_mmap: If True, the file is memory mapped and read through a :class:`.common.MemoryViewStream`.
+
+    :param forward_only: If True, the file is only read forward. By default, it is True for a non-seekable file object.
+
+    :return: A context manager of tuple (file stream, total bytes, forward only), total bytes is None when the file is
+     only read forward or it is a compressed file whose size is not known until it has been decompressed.
+    """
+    fs = None
+    file = None
+    try:
+        if _isPath(path):
+            file = open_dlis(path)
+        else:
+            fs = path
+            if forward_only is None:
+                forward_only = not (hasattr(fs, 'seekable') and fs.seekable())
+        if isinstance(file, CompressedFile):
+            if use_mmap:
+                logger.warning("Compressed file %s can't be memory mapped, use_mmap is ignored", path)
+            fs = file
+        elif use_mmap:
+            # The mapping is released by GC once no more segment body refers to it.
+            fs = MemoryViewStream(mmap.mmap((fs if file is None else file).fileno(), 0, access=mmap.ACCESS_READ))
+        elif file is not None:
+            fs = file
+
+        if forward_only:
+            yield fs, None, True
+        elif isinstance(fs, CompressedFile):
+            # read until the end, rather than decompressing the whole file just to know its size.
+            yield fs, fs.size, False
+        else:
+            # record the total bytes
+            fs.seek(0, io.SEEK_END)
+            total_bytes = fs.tell()
+            # move back to the beginning of the file
+            fs.seek(0, io.SEEK_SET)
+            yield fs, total_bytes, False
     except IOError as err:
         logger.error("Can't open DLIS file {}".format(path))
-        fs.close()
         raise err
     finally:
-        fs.close()
-    end = time.time()
-    logger.info("Took %s sec to parse %s file - %s", end-start, file_size(path), path)
-    return sul, lfList
+        if fs is not None and fs is not file and fs is not path:
+            fs.close()
+        if file is not None:
+            file.close()
 
 
-def dump(df_path, output_path, eflr_only  = False):
+def dump(df_path, output_path, eflr_only  = False, use_mmap = False, use_index = False, index_dir = None,
+         channels = None):
     """
     Dump a given DLIS file. In the "output_path", you will folder a few folder which for one logical file.
     :type df_path: str
-    :param df_path: Path to the dlis file.
+    :param df_path: Path to the dlis file, or a binary file object, see :func:`parse`.
 
     :type output_path: str
     :param output_path: Where to dump this dlis file.
@@ -78,10 +336,24 @@ def dump(df_path, output_path, eflr_only  = False):
     :type eflr_only: bool
     :param eflr_only: True if only dump EFLRs, otherwise IFLR will also be dumped.
 
+    :type use_mmap: bool
+    :param use_mmap: True if memory map the dlis file when parsing it, see :func:`parse`.
+
+    :type use_index: bool
+    :param use_index: True if use the sidecar index file, see :func:`parse`.
+
+    :type index_dir: str
+    :param index_dir: A cache directory for the index files.
+
+    :type channels: list
+    :param channels: The identifiers of the channels to dump in the csv files, see :func:`parse`. By default all
+     the channels are dumped.
+
     :return: None
     """
     print(eflr_only)
-    _, lf_list = parse(df_path, eflr_only)
+    _, lf_list = parse(df_path, eflr_only, use_mmap=use_mmap, use_index=use_index, index_dir=index_dir,
+                       channels=channels)
 
     if not os.path.exists(output_path):
         os.makedirs(output_path)
@@ -93,7 +365,7 @@ def dump(df_path, output_path, eflr_only  = False):
         lf._dump(path=lf_path, eflrOnly = eflr_only)
 
 
-def dump_all(df_folder_path, output_path, eflr_only = False):
+def dump_all(df_folder_path, output_path, eflr_only = False, channels = None):
     """
     Dump all the dlis files in the give folder recursively
 
@@ -106,6 +378,9 @@ def dump_all(df_folder_path, output_path, eflr_only = False):
     :type eflr_only: bool
     :param eflr_only:
 
+    :type channels: list
+    :param channels: The identifiers of the channels to dump, see :func:`dump`.
+
     :return: None
     """
 
@@ -124,48 +399,46 @@ def dump_all(df_folder_path, output_path, eflr_only = False):
         if not os.path.exists(df_output_path):
             os.makedirs(df_output_path)
         try:
-            dump(file, df_output_path, eflr_only)
+            dump(file, df_output_path, eflr_only, channels=channels)
         except Exception:
             logger.error("Fail to dump file \"{}\"".format(file))
 
 
 
 
-def _splitLogicalFiles(lrSegList, fs, eflr_only = False):
-    eflrSegList = []
-    iflrSegList = []
+def _splitLogicalFiles(segTable, fs, eflr_only = False, lazy_eflr = False, set_types = None, channels = None):
     lf_list = []
-    for lrSeg in lrSegList:
-        if lrSeg.isEFLR:
-            if lrSeg.lrType == 0: # FHLR, starts a new LogicalFile, note FHLR must be in a single Logical Record Segment.
-                if len(eflrSegList) == 0:    # first one
-                    eflrSegList.append(lrSeg)
-                else:       # Start a new logical file
-                    # checkLrSeg(eflrSegList)
-                    lf_list.append(LogicalFile(eflrSegList, iflrSegList, fs, eflrOnly=eflr_only))
-                    eflrSegList.clear()
-                    iflrSegList.clear()
-                    eflrSegList.append(lrSeg)
-            else:
-                eflrSegList.append(lrSeg)
-        else:
-            iflrSegList.append(lrSeg)
-    lf_list.append(LogicalFile(eflrSegList, iflrSegList, fs, eflrOnly=eflr_only))
+    # FHLR starts a new LogicalFile, note FHLR must be in a single Logical Record Segment.
+    startRows = list(segTable.fhlrRows)
+    if len(startRows) == 0 or startRows[0] != 0:
+        # segments before the first FHLR belong to the first LogicalFile.
+        startRows = [0] + startRows[1:]
+    endRows = startRows[1:] + [len(segTable)]
+    for startRow, endRow in zip(startRows, endRows):
+        lf_list.append(LogicalFile(segTable, startRow, endRow, fs, eflrOnly=eflr_only, lazyEflr=lazy_eflr,
+                                   setTypes=set_types, channels=channels))
 
     return lf_list
 
 
 @click.command()
-@click.option('--input', help='The input DLIS(dlis) file or a folder includes DLIS files for parsing')
+@click.option('--input', help='The input DLIS(dlis) file or a folder includes DLIS files for parsing, '
+                              'use - to read a DLIS file from stdin')
 @click.option('--output', default='.', help='The output path')
 @click.option('--eflronly', default=False, help='If only dump EFLRs', type=bool)
-def cli(input, output, eflronly):
+@click.option('--channels', default=None, help='Comma separated identifiers of the channels to dump, like TDEP,GR. '
+                                               'By default all the channels are dumped')
+def cli(input, output, eflronly, channels):
     print('hello world')
-    if os.path.exists(input) and os.path.isdir(input):
-        dump_all(input, output, eflr_only=eflronly)
+    if channels is not None:
+        channels = [c.strip() for c in channels.split(',') if c.strip() != '']
+    if input == '-':
+        dump(sys.stdin.buffer, output, eflr_only=eflronly, channels=channels)
+    elif os.path.exists(input) and os.path.isdir(input):
+        dump_all(input, output, eflr_only=eflronly, channels=channels)
     elif os.path.exists(input) and os.path.isfile(input):
         print(eflronly)
-        dump(input, output, eflr_only=eflronly)
+        dump(input, output, eflr_only=eflronly, channels=channels)
     else:
         print('Input dlis file or dir [{}] does not exist'.format(input))
 
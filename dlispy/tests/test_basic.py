@@ -1,5 +1,8 @@
+import json
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 from io import BytesIO
 from logging.config import fileConfig
@@ -13,15 +16,22 @@ if os.path.exists(log_conf):
     fileConfig(log_conf)
 
 
-from ..common import _find_files
+from ..common import _find_files, ComplexEncoder
 from ..core import dump_all
 
 
-from ..LogicalFile import LogicalFile
+from ..LogicalFile import LogicalFile, _readLrBytes, _replaceObjects
 from ..LogicalRecord import _getClassName
-from ..__init__ import parse, dump
+from ..__init__ import parse, dump, iter_logical_files, iter_records, open_dlis
 sys.path.insert(0, path.abspath(path.join(path.dirname(__file__), '.')))
 from ..StorageUnitLabel import StorageUnitLabel
+from ..SegmentTable import SegmentTable
+from ..IndexFile import loadIndex, indexPath
+from ..CompressedFile import CompressedFile
+from ..FrameView import FrameView
+from ..FrameColumns import FrameColumns
+from ..FrameDecoder import NumpyFrameDecoder, StructFrameDecoder, buildFrameDecoder, np
+from ..VisibleRecord import VisibleRecord
 parent_path = path.dirname(path.dirname(path.dirname(path.realpath(__file__))))
 from ..LogicalRecord import *
 
@@ -356,6 +366,840 @@ class DlisFileTest(unittest.TestCase):
         frame800T = lf.frameDataDict[ObName.instance(2, 0, '800T')]
         assert(len(frame800T) == 2301)
 
+    def testParseWithMmap(self):
+        """
+        Parsing a memory mapped file should give the same result as parsing with regular file IO.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        _, mmap_lf_list = parse(test_file, use_mmap=True)
+        assert(len(mmap_lf_list) == len(lf_list))
+        lf = lf_list[0]
+        mmap_lf = mmap_lf_list[0]
+        assert(mmap_lf.id == lf.id)
+        assert(len(mmap_lf.eflrList) == len(lf.eflrList))
+        assert(json.dumps(mmap_lf.toJSON(), cls=ComplexEncoder) == json.dumps(lf.toJSON(), cls=ComplexEncoder))
+        for frameName, frameDatas in lf.frameDataDict.items():
+            mmap_frameDatas = mmap_lf.frameDataDict[frameName]
+            assert(len(mmap_frameDatas) == len(frameDatas))
+            assert(mmap_frameDatas[-1].slots == frameDatas[-1].slots)
+
+
+    def testSegmentTable(self):
+        """
+        The segment table should describe the same segments as parsing Visible Records into objects.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        with open(test_file, 'rb') as fs:
+            total_bytes = os.path.getsize(test_file)
+            StorageUnitLabel.parse(fs)
+            lrSegList = []
+            while fs.tell() < total_bytes:
+                lrSegList.extend(VisibleRecord.parse(fs).lrSegList)
+            fs.seek(StorageUnitLabel.LENGTH)
+            segTable = SegmentTable.parse(fs, total_bytes)
+
+            assert(len(segTable) == len(lrSegList))
+            for row, lrSeg in enumerate(lrSegList):
+                assert(segTable.startPos[row] == lrSeg.startPos)
+                assert(segTable.lrType[row] == lrSeg.lrType)
+                assert(segTable.isEFLR(row) == lrSeg.isEFLR)
+                assert(segTable.hasSucc(row) == lrSeg.hasSucc)
+                assert(segTable.encrypted(row) == lrSeg.encrypted)
+                if lrSeg.isEFLR and not lrSeg.encrypted:
+                    assert(segTable.readBody(row, fs) == lrSeg.readBody(fs))
+
+
+    def testIndexFile(self):
+        """
+        The segment table is saved into a sidecar index file at the first parse, then loaded from it.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        with tempfile.TemporaryDirectory() as index_dir:
+            assert(loadIndex(test_file, index_dir) is None)
+            _, lf_list = parse(test_file, use_index=True, index_dir=index_dir)
+            assert(os.path.isfile(indexPath(test_file, index_dir)))
+
+            segTable = loadIndex(test_file, index_dir)
+            assert(segTable is not None)
+            assert(len(segTable) == len(lf_list[0].segTable))
+            assert(segTable.dataPos == lf_list[0].segTable.dataPos)
+            assert(segTable.attrs == lf_list[0].segTable.attrs)
+
+            _, index_lf_list = parse(test_file, use_index=True, index_dir=index_dir)
+            lf = index_lf_list[0]
+            assert(len(lf.eflrList) == len(lf_list[0].eflrList))
+            assert(len(lf.frameIndex[ObName.instance(2, 0, '2000T')]) == 921)
+            assert(len(lf.frameIndex[ObName.instance(2, 0, '800T')]) == 2301)
+            assert(lf.frameDataDict[ObName.instance(2, 0, '2000T')][-1].slots ==
+                   lf_list[0].frameDataDict[ObName.instance(2, 0, '2000T')][-1].slots)
+
+            # a stale index is ignored, then rebuilt.
+            copy_file = path.join(index_dir, os.path.basename(test_file))
+            shutil.copyfile(test_file, copy_file)
+            parse(copy_file, eflr_only=True, use_index=True)
+            assert(loadIndex(copy_file) is not None)
+            stat = os.stat(copy_file)
+            os.utime(copy_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+            assert(loadIndex(copy_file) is None)
+            parse(copy_file, eflr_only=True, use_index=True)
+            assert(loadIndex(copy_file) is not None)
+
+
+    def testIterLogicalFilesAndRecords(self):
+        """
+        The streaming API should return the same logical files and records as parse.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        iter_lf_list = list(iter_logical_files(test_file))
+        assert(len(iter_lf_list) == len(lf_list))
+        assert(iter_lf_list[0].id == lf_list[0].id)
+        assert(len(iter_lf_list[0].frameDataDict[ObName.instance(2, 0, '2000T')]) == 921)
+
+        numOfEflr = 0
+        numOfFData = {}
+        lastFData = None
+        for lf, lr in iter_records(test_file):
+            if isinstance(lr, EFLR):
+                numOfEflr += 1
+            elif type(lr) is FrameData:
+                numOfFData[lr.frameName] = numOfFData.get(lr.frameName, 0) + 1
+                if lr.frameName == ObName.instance(2, 0, '2000T'):
+                    lastFData = lr
+            # FData are not kept in the logical file
+            assert(len(lf.frameDataDict) == 0)
+        assert(numOfEflr + len([eflr for eflr in lf_list[0].eflrList if not isinstance(eflr, EFLR)]) ==
+               len(lf_list[0].eflrList))
+        assert(numOfFData[ObName.instance(2, 0, '2000T')] == 921)
+        assert(numOfFData[ObName.instance(2, 0, '800T')] == 2301)
+        assert(lastFData.slots == [17597260.0, 891961.0, 2363.0, 891961.0])
+
+
+    def testParseNonSeekableStream(self):
+        """
+        A DLIS file can be parsed from a non-seekable stream like a pipe.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+
+        class NonSeekableStream(object):
+            def __init__(self, fs):
+                self.fs = fs
+
+            def read(self, n=-1):
+                return self.fs.read(n)
+
+            def seekable(self):
+                return False
+
+        with open(test_file, 'rb') as fs:
+            sul, stream_lf_list = parse(NonSeekableStream(fs))
+        assert(sul._maxRecordLen == 8192)
+        assert(len(stream_lf_list) == len(lf_list))
+        lf = stream_lf_list[0]
+        assert(lf.id == lf_list[0].id)
+        assert(len(lf.eflrList) == len(lf_list[0].eflrList))
+        frame2000T = lf.frameDataDict[ObName.instance(2, 0, '2000T')]
+        assert(len(frame2000T) == 921)
+        assert(frame2000T[-1].slots == [17597260.0, 891961.0, 2363.0, 891961.0])
+        assert(len(lf.frameDataDict[ObName.instance(2, 0, '800T')]) == 2301)
+
+        with open(test_file, 'rb') as fs:
+            assert(len(list(iter_logical_files(NonSeekableStream(fs), eflr_only=True))) == 1)
+
+
+    def testParseCompressedFile(self):
+        """
+        A gzip or xz compressed DLIS file can be parsed directly, and IFLRs can be loaded later with random access.
+        :return:
+        """
+        import gzip
+        import lzma
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        with open(test_file, 'rb') as fs:
+            content = fs.read()
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            gz_file = path.join(tmp_dir, 'test.DLIS.gz')
+            with open(gz_file, 'wb') as outfile:
+                # two gzip members
+                outfile.write(gzip.compress(content[:100000]) + gzip.compress(content[100000:]))
+            xz_file = path.join(tmp_dir, 'test.DLIS.xz')
+            with open(xz_file, 'wb') as outfile:
+                # one xz stream per 64KB, and stream padding between them
+                for i in range(0, len(content), 64 * 1024):
+                    outfile.write(lzma.compress(content[i:i + 64 * 1024], format=lzma.FORMAT_XZ) + b'\0' * 4)
+
+            for compressed_file in (gz_file, xz_file):
+                with CompressedFile(compressed_file, span=64 * 1024) as fs:
+                    for pos in (500000, 80, len(content) - 10, 200000):
+                        fs.seek(pos)
+                        assert(fs.read(1000) == content[pos:pos + 1000])
+                    assert(fs.read(1000) == content[201000:202000])
+
+                sul, lf_list = parse(compressed_file, eflr_only=True)
+                assert(sul._maxRecordLen == 8192)
+                assert(len(lf_list) == 1)
+                lf = lf_list[0]
+                assert(len(lf.eflrList) == 30)
+                with open_dlis(compressed_file) as fs:
+                    assert(type(fs) is CompressedFile)
+                    lf.loadIFLR(fs)
+                frame2000T = lf.frameDataDict[ObName.instance(2, 0, '2000T')]
+                assert(len(frame2000T) == 921)
+                assert(frame2000T[-1].slots == [17597260.0, 891961.0, 2363.0, 891961.0])
+                assert(len(lf.frameDataDict[ObName.instance(2, 0, '800T')]) == 2301)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def testNumpyFrameDecoder(self):
+        """
+        FData records decoded by NumPy in bulk are the same as the ones decoded value by value.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        lf = lf_list[0]
+        frame800T = ObName.instance(2, 0, '800T')
+        assert(type(lf.frameDecoders[frame800T]) is NumpyFrameDecoder)
+
+        stream_slots = {}
+        for _, lr in iter_records(test_file):
+            if type(lr) is FrameData:
+                stream_slots.setdefault(lr.frameName, []).append((lr.frameNumber, lr.slots))
+        for frameName, frameDatas in lf.frameDataDict.items():
+            assert([(fData.frameNumber, fData.slots) for fData in frameDatas] == stream_slots[frameName])
+
+        with open(test_file, 'rb') as fs:
+            frameNumbers, columns = lf.readFrameArrays(frame800T, fs)
+        assert(len(frameNumbers) == 2301)
+        assert(frameNumbers == [fData.frameNumber for fData in lf.frameDataDict[frame800T]])
+        smsc = columns[ObName.instance(2, 0, 'SMSC')]
+        assert(smsc.dtype == np.dtype('>i4'))
+        channels = lf._getSimpleChannelsFromFrame(frame800T)
+        index = [c.ObName.identifier for c in channels].index('SMSC')
+        assert(smsc.tolist() == [fData.slots[index] for fData in lf.frameDataDict[frame800T]])
+
+
+    def testStructFrameDecoder(self):
+        """
+        Without NumPy, each FData record is decoded with the struct compiled for its frame.
+        :return:
+        """
+        from struct import pack
+        from ..LogicalFile import SimpleChannel
+        channels = [SimpleChannel(ObName.instance(0, 0, 'A'), 2, None, None, 1),
+                    SimpleChannel(ObName.instance(0, 0, 'B'), 13, None, None, 3),
+                    SimpleChannel(ObName.instance(0, 0, 'C'), 7, None, None, 1)]
+        decoder = StructFrameDecoder(channels)
+        assert(decoder.itemsize == 4 + 2 * 3 + 8)
+        assert(decoder.decodeSlots(b'\0' + pack('>f3hd', 1.5, -1, 2, 3, 2.25), 1) == [1.5, [-1, 2, 3], 2.25])
+        columns = decoder.decode(pack('>f3hd', 1.5, -1, 2, 3, 2.25) + pack('>f3hd', -0.5, 4, 5, 6, 0.0))
+        assert([column.tolist() for column in columns] == [[1.5, -0.5], [-1, 2, 3, 4, 5, 6], [2.25, 0.0]])
+        assert(buildFrameDecoder(channels + [SimpleChannel(ObName.instance(0, 0, 'D'), 19, None, None, 1)]) is None)
+
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file, eflr_only=True)
+        lf = lf_list[0]
+        for frameName in lf.simpleFrames:
+            lf.frameDecoders[frameName] = StructFrameDecoder(lf._getSimpleChannelsFromFrame(frameName))
+        with open(test_file, 'rb') as fs:
+            lf.loadIFLR(fs)
+        frame2000T = lf.frameDataDict[ObName.instance(2, 0, '2000T')]
+        assert(len(frame2000T) == 921)
+        assert(frame2000T[-1].slots == [17597260.0, 891961.0, 2363.0, 891961.0])
+
+
+    def testCodecRegistry(self):
+        """
+        Every representation code has a codec, and many values are decoded in one call.
+        :return:
+        """
+        from struct import pack
+        from ..RCReader import CODECS, CODE_TO_RC, getCodec, read_many
+        assert(sorted(CODECS.keys()) == sorted(CODE_TO_RC.keys()))
+        assert(all(CODECS[code].name == name for code, name in CODE_TO_RC.items()))
+        assert(getCodec(2).size == 4 and getCodec(19).size is None)
+        self.assertRaises(Exception, getCodec, 0)
+        self.assertRaises(Exception, readByRC, 28, BytesIO(b'\0'))
+
+        assert(read_many(13, 3, b'\0\0' + pack('>3h', -1, 2, 3), 2) == ([-1, 2, 3], 8))
+        assert(read_many(19, 2, b'\x01A\x02BC') == (['A', 'BC'], 5))
+        assert(readByRC(5, BytesIO(bytes.fromhex('C2640000'))) == -100.0)
+        assert(readByRC(6, BytesIO(bytes.fromhex('80400000'))) == 1.0)
+        assert(readByRC(10, BytesIO(pack('>2f', 1.0, 2.0))) == complex(1.0, 2.0))
+
+
+    def testBufferDecoders(self):
+        """
+        Buffer decoders return the same values as the stream readers, together with the offset after the value.
+        :return:
+        """
+        from struct import pack
+        from ..RCReader import CODECS
+        from ..LogicalRecord import decodeSet, parseSet
+        samples = {2: pack('>f', 1.5), 7: pack('>d', -2.5), 13: pack('>h', -3), 18: bytes.fromhex('C0000102'),
+                   19: b'\x05DEPTH', 20: b'\x03abc', 21: bytes([87, 0x14, 19, 21, 20, 30, 0, 0]),
+                   23: b'\x81\x02\x05\x05hello', 24: b'\x07CHANNEL\x02\x00\x04TDEP'}
+        for code, sample in samples.items():
+            buf = b'\xff' + sample + b'\xff'
+            value, offset = CODECS[code].decode(buf, 1)
+            assert(offset == len(sample) + 1)
+            assert(json.dumps(value, cls=ComplexEncoder) ==
+                   json.dumps(CODECS[code].read(BytesIO(sample)), cls=ComplexEncoder))
+
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        with open(test_file, 'rb') as fs:
+            fs.seek(StorageUnitLabel.LENGTH)
+            table = SegmentTable.parse(fs)
+            num_of_sets = 0
+            for row in range(len(table)):
+                if not table.isEFLR(row) or table.hasPred(row) or table.hasSucc(row) or table.lrType[row] > 11:
+                    continue
+                body = table.readBody(row, fs)
+                mySet, offset = decodeSet(body)
+                assert(offset == len(body))
+                assert(json.dumps(mySet, cls=ComplexEncoder) == json.dumps(parseSet(BytesIO(body)), cls=ComplexEncoder))
+                num_of_sets += 1
+        assert(num_of_sets > 0)
+
+
+    def testDescriptorTable(self):
+        """
+        The precomputed descriptor table agrees with the role and format bits of every descriptor byte.
+        :return:
+        """
+        from ..Component import DESCRIPTORS, ComponentRole
+        from ..LogicalRecordSegment import TRAILER_LENGTHS
+        assert(len(DESCRIPTORS) == 256)
+        for b in range(256):
+            bits = '{0:08b}'.format(b)
+            assert(DESCRIPTORS[b].role == ComponentRole[bits[:3]])
+            assert(list(DESCRIPTORS[b][1:]) == [bit == '1' for bit in bits[3:]])
+        assert(DESCRIPTORS[0b01110000].role == 'OBJECT' and DESCRIPTORS[0b00110101].hasValue)
+        assert(TRAILER_LENGTHS[0b00000110] == 4 and TRAILER_LENGTHS[0b10000011] == 2 and TRAILER_LENGTHS[0] == 0)
+
+
+    def testObjectParser(self):
+        """
+        Objects decoded by the parser compiled from the template are the same as the ones decoded attribute by
+        attribute.
+        :return:
+        """
+        from struct import pack
+        from ..LogicalRecord import decodeSet, decodeAttrInObj, decodeAttrInObjWithoutRef
+        template = b'\xf0\x04TEST' + b'\x34\x01A\x02' + b'\x3c\x01B\x02\x0d' + b'\x34\x01C\x13'
+        obj1 = b'\x70\x00\x00\x02O1' + b'\x21' + pack('>f', 1.5) + b'\x21' + pack('>2h', -1, 2) + b'\x00'
+        obj2 = b'\x70\x00\x00\x02O2' + b'\x25\x07' + pack('>d', 2.5) + b'\x41' + pack('>2h', 3, 4) + \
+               b'\x21\x02xy' + b'\x21\x01z'
+        buf = template + obj1 + obj2
+        mySet, offset = decodeSet(buf)
+        assert(offset == len(buf))
+        assert(mySet.template._objectParser is not None)
+        o1, o2 = mySet.objects
+        assert([a.value for a in o1.attributes] == [1.5, [-1, 2], None])
+        assert(type(o1.attributes[2]) is AbsentAttribute and o1.attributes[2].label == 'C')
+        assert([a.value for a in o2.attributes] == [2.5, [3, 4], 'xy', 'z'])
+        assert(o2.attributes[0].repCode == 7 and o2.attributes[0].label == 'A')
+        assert(type(o2.attributes[1]) is InvariantAttribute and o2.attributes[1].count == 2)
+
+        for obj, objBytes in ((o1, obj1), (o2, obj2)):
+            offset = 6
+            attributes = []
+            while offset < len(objBytes):
+                if len(attributes) < len(mySet.template.attrList):
+                    attr, offset = decodeAttrInObj(objBytes, offset, mySet.template.attrList[len(attributes)])
+                else:
+                    attr, offset = decodeAttrInObjWithoutRef(objBytes, offset)
+                attributes.append(attr)
+            assert(json.dumps(attributes, cls=ComplexEncoder) == json.dumps(obj.attributes, cls=ComplexEncoder))
+
+
+    def testAttributeColumns(self):
+        """
+        Attributes are found by their column position in the template, and a column can be read for all the objects.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file, eflr_only=True)
+        channelEflr = [eflr for eflr in lf_list[0].eflrList if type(eflr) is ChannelEFLR][0]
+        labelIndex = channelEflr.template.labelIndex
+        assert([attr.label for attr in channelEflr.template.attrList].index(Channel.UNITS) == labelIndex[Channel.UNITS])
+        channel = channelEflr.objects[0]
+        assert(channel.getAttr(Channel.UNITS) is channel.attributes[labelIndex[Channel.UNITS]])
+        assert(channel.getAttrValue('NOT-AN-ATTRIBUTE') is None)
+        repCodes = channelEflr.column(Channel.REPRESENTATION_CODE)
+        assert(len(repCodes) == len(channelEflr.objects))
+        assert(repCodes == [c.getAttrValue(Channel.REPRESENTATION_CODE) for c in channelEflr.objects])
+        assert(set(repCodes) == {2, 14})
+
+
+    def testLazyEflr(self):
+        """
+        With lazy_eflr, objects of an EFLR are decoded on first access, and the result is the same.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file, eflr_only=True)
+        _, lazy_lf_list = parse(test_file, eflr_only=True, use_mmap=True, lazy_eflr=True)
+        lf, lazy_lf = lf_list[0], lazy_lf_list[0]
+        assert(lazy_lf.id == lf.id)
+        lazyEflrs = [eflr for eflr in lazy_lf.eflrList if type(eflr) is not PrivateEncryptedEFLR]
+        assert(all(eflr._loadObjects is None for eflr in lazyEflrs if type(eflr) in (ChannelEFLR, FrameEFLR)))
+        assert(any(eflr._loadObjects is not None for eflr in lazyEflrs))
+        assert(list(lazy_lf.simpleChannels.keys()) == list(lf.simpleChannels.keys()))
+        assert(json.dumps(lazy_lf, cls=ComplexEncoder) == json.dumps(lf, cls=ComplexEncoder))
+        assert(all(eflr._loadObjects is None for eflr in lazyEflrs))
+
+
+    def testSetTypes(self):
+        """
+        Only the EFLRs with a set type in set_types are parsed, FData is dropped when its frame is skipped.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        lf = lf_list[0]
+        for forward_only in (False, True):
+            _, selected_lf_list = parse(test_file, forward_only=forward_only, set_types={'ORIGIN', 'CHANNEL'})
+            selected_lf = selected_lf_list[0]
+            assert(selected_lf.id == lf.id)
+            assert({eflr.setType for eflr in selected_lf.eflrList} == {'FILE-HEADER', 'ORIGIN', 'CHANNEL'})
+            assert(len(selected_lf.frameDataDict) == 0)
+            assert(selected_lf.skippedFrames == set(lf.frameDataDict.keys()))
+
+            _, selected_lf_list = parse(test_file, forward_only=forward_only, set_types={'CHANNEL', 'FRAME'})
+            selected_lf = selected_lf_list[0]
+            assert(len(selected_lf.eflrList) == 3)
+            assert({k: len(v) for k, v in selected_lf.frameDataDict.items()} ==
+                   {k: len(v) for k, v in lf.frameDataDict.items()})
+
+
+    def testObjectRegistry(self):
+        """
+        Objects are found by set type and name, and references are resolved through the registry.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file, eflr_only=True, lazy_eflr=True)
+        lf = lf_list[0]
+        toolEflr = [eflr for eflr in lf.eflrList if type(eflr) is StaticEFLR and eflr.setType == 'TOOL'][0]
+        assert(toolEflr._loadObjects is not None)
+        channel = lf.findObject('CHANNEL', ObName.instance(2, 0, 'LMVL_DL'))
+        assert(type(channel) is Channel)
+        channelEflr = [eflr for eflr in lf.eflrList if type(eflr) is ChannelEFLR][0]
+        assert(any(obj is channel for obj in channelEflr.objects))
+        assert(toolEflr._loadObjects is not None)
+        assert(lf.findObject('CHANNEL', ObName.instance(2, 0, 'NOT-A-CHANNEL')) is None)
+
+        frame = [eflr for eflr in lf.eflrList if type(eflr) is FrameEFLR][0].objects[0]
+        assert(lf.findObject('FRAME', frame.name) is frame)
+        channels = lf.resolve(frame.getAttrValue(Frame.CHANNELS), 'CHANNEL')
+        assert([c.name for c in channels] == frame.getAttrValue(Frame.CHANNELS))
+
+        ref = ObjRef()
+        ref.type, ref.origin, ref.copy, ref.identifier = 'CHANNEL', 2, 0, 'LMVL_DL'
+        assert(lf.resolve(ref) is channel)
+        ref = ATTREF()
+        ref.type, ref.origin, ref.copy, ref.identifier, ref.label = 'CHANNEL', 2, 0, 'LMVL_DL', Channel.UNITS
+        assert(lf.resolve(ref) is channel.getAttr(Channel.UNITS))
+
+        tool = toolEflr.objects[0]
+        assert(lf.resolve(tool.name) is tool)
+
+
+    def testRedundantAndReplacementSets(self):
+        """
+        Redundant sets are dropped and replacement sets update their original set in place.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file, eflr_only=True)
+        parsed_lf = lf_list[0]
+        with open(test_file, 'rb') as fs:
+            records = [(parsed_lf.segTable.lrType[rows[0]], bytes(_readLrBytes(parsed_lf.segTable, rows, fs)))
+                       for rows in parsed_lf._iterLrRows(True)]
+        fhlrBytes = records[0][1]
+        channlBytes = [lrBytes for lrType, lrBytes in records if lrType == PublicEFLRType.CHANNL.value][0]
+
+        def withRole(lrBytes, role):
+            return bytes([(lrBytes[0] & 0x1F) | (role << 5)]) + lrBytes[1:]
+
+        lf = LogicalFile()
+        assert(lf._addEFLR(lf._decodeEFLR(0, False, None, fhlrBytes)))
+        assert(lf._addEFLR(lf._decodeEFLR(3, False, None, channlBytes)))
+        assert(lf._addEFLR(lf._decodeEFLR(3, False, None, withRole(channlBytes, 0b101))) is False)
+        assert(len(lf.eflrList) == 2)
+        channelEflr = lf.eflrList[1]
+        channel = channelEflr.objects[0]
+        unitsAttr = channel.getAttr(Channel.UNITS)
+
+        replacement = lf._decodeEFLR(3, False, None, withRole(channlBytes, 0b110))
+        assert(replacement is channelEflr)
+        assert(lf._addEFLR(replacement) is False)
+        assert(len(lf.eflrList) == 2)
+        assert(channelEflr.objects[0] is channel)
+        assert(channel.getAttr(Channel.UNITS) is not unitsAttr)
+        assert(channel.getAttrValue(Channel.UNITS) == unitsAttr.value)
+        assert(lf.findObject('CHANNEL', channel.name) is channel)
+
+        # an object only in the replacement set is appended to the original set and registered
+        nameBytes = bytes([channel.name.origin, channel.name.copy, len(channel.name.identifier)]) + \
+                    channel.name.identifier.encode('ascii')
+        newName = ObName.instance(channel.name.origin, channel.name.copy, channel.name.identifier[:-1] + '~')
+        newNameBytes = nameBytes[:-1] + b'~'
+        assert(lf.resolve(newName, 'CHANNEL') is None)
+        lf._addEFLR(lf._decodeEFLR(3, False, None, withRole(channlBytes.replace(b'\x70' + nameBytes,
+                                                                                 b'\x70' + newNameBytes, 1), 0b110)))
+        assert(len(channelEflr.objects) == len(lf.eflrList[1].objects))
+        newChannel = lf.findObject('CHANNEL', newName)
+        assert(newChannel is channelEflr.objects[-1] and newChannel is not channel)
+        assert(lf.resolve(newName) is newChannel)
+
+        # a short object gets the template defaults up to the replaced attribute, an unknown attribute is dropped
+        template = channelEflr.template
+        last = len(template.attrList) - 1
+        del channel.attributes[1:]
+        newObj = Object()
+        newObj._name = channel.name
+        replacedAttr = template.attrList[last].clone(Attribute())
+        unknownAttr = Attribute()
+        unknownAttr._label = 'UNKNOWN'
+        newObj._attributes = [replacedAttr, unknownAttr]
+        replacementSet = EFLR(Set(), [newObj])
+        assert(_replaceObjects(channelEflr, replacementSet) == [])
+        assert(len(channel.attributes) == last + 1 and channel.attributes[last] is replacedAttr)
+        assert([attr.label for attr in channel.attributes] == [attr.label for attr in template.attrList])
+        assert(channel.getAttr('UNKNOWN') is None)
+
+        # the original set has a template but no object
+        lf = LogicalFile()
+        lf._addEFLR(lf._decodeEFLR(0, False, None, fhlrBytes))
+        lf._addEFLR(lf._decodeEFLR(3, False, None, channlBytes[:channlBytes.index(b'\x70' + nameBytes)]))
+        channelEflr = lf.eflrList[1]
+        assert(channelEflr.template is None and len(channelEflr.objects) == 0)
+        assert(lf.findObject('CHANNEL', channel.name) is None)
+        assert(lf._addEFLR(lf._decodeEFLR(3, False, None, withRole(channlBytes, 0b110))) is False)
+        assert(len(lf.eflrList) == 2 and channelEflr.template is not None)
+        assert(lf.findObject('CHANNEL', channel.name) is channelEflr.objects[0])
+        assert(channelEflr.objects[0].getAttrValue(Channel.UNITS) == unitsAttr.value)
+
+
+    def testSlottedComponents(self):
+        """
+        Metadata objects have no __dict__, attributes with template defaults are shared, and toJSON still works.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        lf = lf_list[0]
+        channelEflr = [eflr for eflr in lf.eflrList if type(eflr) is ChannelEFLR][0]
+        channel = channelEflr.objects[0]
+        fData = list(lf.frameDataDict.values())[0][0]
+        for obj in [channel, channel.attributes[0], channel.name, channelEflr.template, fData]:
+            assert(not hasattr(obj, '__dict__'))
+        assert(set(channel.toJSON()['Channel'].keys()) == {'_name', '_attributes'})
+        assert(channel.attributes[0].toJSON() ==
+               {'_label': channel.attributes[0].label, '_count': channel.attributes[0].count,
+                '_repCode': channel.attributes[0].repCode, '_units': channel.attributes[0].units,
+                '_value': channel.attributes[0].value})
+        assert(channel.name.toJSON() == {'origin': channel.name.origin, 'copy': channel.name.copy,
+                                         'identifier': channel.name.identifier})
+
+        attributes = [attr for eflr in lf.eflrList if hasattr(eflr, 'objects')
+                      for obj in eflr.objects for attr in obj.attributes]
+        assert(len(set(map(id, attributes))) < len(attributes))
+
+
+    def testInternedObName(self):
+        """
+        The same raw object name is always decoded to the same ObName.
+        :return:
+        """
+        raw = b'\x00\x02\x00\x07LMVL_DL' + b'\x81\x00\x01\x03ABC'
+        name, offset = decodeOBNAME(raw, 1)
+        assert(offset == 11)
+        assert(decodeOBNAME(bytearray(raw), 1)[0] is name)
+        assert(decodeOBNAME(memoryview(raw), 1)[0] is name)
+        assert(name == ObName.instance(2, 0, 'LMVL_DL'))
+        assert(hash(name) == hash(ObName.instance(2, 0, 'LMVL_DL')))
+        assert(name.toJSON() == {'origin': 2, 'copy': 0, 'identifier': 'LMVL_DL'})
+        name, offset = decodeOBNAME(raw, 11)
+        assert(offset == len(raw))
+        assert(name == ObName.instance(256, 1, 'ABC'))
+
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        lf = lf_list[0]
+        simpleFrameNames = {id(name) for name in lf.simpleFrames.keys()}
+        for frameName, fDataList in lf.frameDataDict.items():
+            assert(id(frameName) in simpleFrameNames)
+            assert(all(fData.frameName is frameName for fData in fDataList))
+
+
+    def testFrameView(self):
+        """
+        A frame view decodes only the FData records which are accessed, by frame number.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        fDataDict = lf_list[0].frameDataDict
+        _, lf_list = parse(test_file, eflr_only=True)
+        lf = lf_list[0]
+        assert(set(lf.frames.keys()) == set(fDataDict.keys()))
+        for frameName, view in lf.frames.items():
+            fDataList = fDataDict[frameName]
+            assert(len(view) == len(fDataList))
+            assert(view[5].frameNumber == 5 and view[5].slots == fDataList[4].slots)
+            assert([f.slots for f in view[100:110]] == [f.slots for f in fDataList[99:109]])
+            assert([f.frameNumber for f in view[:4]] == [1, 2, 3])
+            assert(view.at(-1).slots == fDataList[-1].slots)
+            assert(view.frameNumbers == [f.frameNumber for f in fDataList])
+            try:
+                view[len(fDataList) + 1]
+                assert(False)
+            except KeyError:
+                pass
+        assert(len(lf.frameDataDict) == 0)
+
+        with open(test_file, 'rb') as fs:
+            view = FrameView(lf, list(fDataDict.keys())[0], fs)
+            assert([f.frameNumber for f in view][-1] == len(view))
+
+        # a logical file read forward only has no segment table to find the records
+        with open(test_file, 'rb') as fs:
+            _, lf_list = parse(fs, eflr_only=True, forward_only=True)
+        try:
+            lf_list[0].frames
+            assert(False)
+        except Exception as e:
+            assert('forward_only' in str(e))
+
+
+    def testReadFramesByIndex(self):
+        """
+        Read the FData records within a range of index, with the index samples saved in the index file.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        fDataDict = lf_list[0].frameDataDict
+        index_dir = tempfile.mkdtemp()
+        try:
+            parse(test_file, eflr_only=True, use_index=True, index_dir=index_dir)
+            segTable = loadIndex(test_file, index_dir)
+            assert(len(segTable.indexSamples) == len(fDataDict))
+            _, lf_list = parse(test_file, eflr_only=True, use_index=True, index_dir=index_dir)
+            lf = lf_list[0]
+            for frameName, fDataList in fDataDict.items():
+                for start, stop in ((17000000, 17050000), (0, 16677260), (17597260, 18000000), (0, 1)):
+                    expected = [f.frameNumber for f in fDataList if start <= f.slots[0] < stop]
+                    assert([f.frameNumber for f in lf.read_frames(frameName, start, stop)] == expected)
+                assert(len(lf.read_frames(frameName, 17000000, 17050000)) > 0)
+        finally:
+            shutil.rmtree(index_dir)
+
+        # a logical file read forward only has no segment table to find the records
+        with open(test_file, 'rb') as fs:
+            _, lf_list = parse(fs, eflr_only=True, forward_only=True)
+            try:
+                lf_list[0].read_frames(list(fDataDict.keys())[0], 17000000, 17050000, fs)
+                assert(False)
+            except Exception as e:
+                assert('forward_only' in str(e))
+
+
+    def testChannelProjection(self):
+        """
+        Only the selected channels are decoded, in the order of the frame, whichever way FData records are decoded.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        full = lf_list[0]
+        channels = ['HMCU', 'TDEP', 'SMSC']
+
+        def expected(frameName):
+            names = [c.ObName.identifier for c in full._getSimpleChannelsFromFrame(frameName)]
+            positions = [i for i, name in enumerate(names) if name in channels]
+            return [[fData.slots[i] for i in positions] for fData in full.frameDataDict[frameName]]
+
+        _, lf_list = parse(test_file, channels=channels)
+        lf = lf_list[0]
+        for frameName in full.frameDataDict:
+            assert([fData.slots for fData in lf.frameDataDict[frameName]] == expected(frameName))
+            assert([c.ObName.identifier for c in lf._getProjectedChannels(frameName)] ==
+                   [c.ObName.identifier for c in full._getSimpleChannelsFromFrame(frameName)
+                    if c.ObName.identifier in channels])
+            # the index channel is not decoded
+            assert(len(lf.read_frames(frameName, 17000000, 17050000)) > 0)
+
+        frameName = [f for f in full.frameDataDict if f.identifier == '800T'][0]
+        with open(test_file, 'rb') as fs:
+            for decodeByValue in (False, True):
+                if decodeByValue:
+                    _, lf_list = parse(test_file, eflr_only=True, channels=['SMSC'])
+                    lf = lf_list[0]
+                    # decode value by value, skipping channels by their size
+                    lf.frameDecoders = {f: None for f in lf.frameIndex}
+                    lf.loadIFLR(fs)
+                else:
+                    _, lf_list = parse(test_file, eflr_only=True)
+                    lf = lf_list[0]
+                    lf.loadIFLR(fs, channels=['SMSC'])
+                assert([fData.slots for fData in lf.frameDataDict[frameName]] ==
+                       [[fData.slots[39]] for fData in full.frameDataDict[frameName]])
+                # no channel of 2000T is selected
+                assert(len(lf.frameDataDict) == 1)
+
+        # load again with other channels
+        with open(test_file, 'rb') as fs:
+            lf.loadIFLR(fs, channels=['TDEP', 'HMCU'])
+        frameColumns = lf.frameDataDict[frameName]
+        assert(len(frameColumns) == len(full.frameDataDict[frameName]))
+        assert([name.identifier for name in frameColumns.columns] == ['TDEP', 'HMCU'])
+        assert([fData.slots for fData in frameColumns] ==
+               [[fData.slots[1], fData.slots[41]] for fData in full.frameDataDict[frameName]])
+        frameName = ObName.instance(2, 0, '2000T')
+        assert([fData.slots for fData in lf.frameDataDict[frameName]] ==
+               [[fData.slots[1]] for fData in full.frameDataDict[frameName]])
+        frameName = ObName.instance(2, 0, '800T')
+
+        # without channels, the channels given when the logical file is created are decoded
+        _, lf_list = parse(test_file, eflr_only=True, channels=['SMSC'])
+        lf = lf_list[0]
+        with open(test_file, 'rb') as fs:
+            lf.loadIFLR(fs, channels=['TDEP'])
+            assert([name.identifier for name in lf.frameDataDict[frameName].columns] == ['TDEP'])
+            lf.loadIFLR(fs)
+            assert([name.identifier for name in lf.frameDataDict[frameName].columns] == ['SMSC'])
+            assert(len(lf.frameDataDict[frameName]) == len(full.frameDataDict[frameName]))
+            # an empty list decodes all the channels
+            lf.loadIFLR(fs, channels=[])
+            assert(lf.channels is None)
+            for name, fDataList in full.frameDataDict.items():
+                assert([fData.slots for fData in lf.frameDataDict[name]] == [fData.slots for fData in fDataList])
+
+        decoder = StructFrameDecoder(full._getSimpleChannelsFromFrame(frameName),
+                                     [c.ObName.identifier in channels
+                                      for c in full._getSimpleChannelsFromFrame(frameName)])
+        assert(len(decoder.channels) == 3)
+        assert(decoder.itemsize == buildFrameDecoder(full._getSimpleChannelsFromFrame(frameName)).itemsize)
+
+        output_path = tempfile.mkdtemp()
+        try:
+            dump(test_file, output_path, channels=channels)
+            with open(path.join(output_path, full.id.strip(), '2_0_800T.csv')) as csvfile:
+                header = csvfile.readline()
+            assert(header.startswith('frameNumber,"TDEP,') and 'SMSC' in header and 'TIME' not in header)
+        finally:
+            shutil.rmtree(output_path)
+
+
+    def testFrameColumns(self):
+        """
+        FData records are stored column-wise, and the columns are trimmed at the EoD of the frame.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        full = lf_list[0]
+        for frameName, frameColumns in full.frameDataDict.items():
+            assert(type(frameColumns) is FrameColumns)
+            fDataList = list(frameColumns)
+            assert(list(frameColumns.frameNumbers) == [fData.frameNumber for fData in fDataList])
+            for i, (channelName, column) in enumerate(frameColumns.columns.items()):
+                assert(channelName == frameColumns.channels[i].ObName)
+                assert(len(column) == len(fDataList))
+                assert(column.tolist() == [fData.slots[i] for fData in fDataList])
+            assert([fData.slots for fData in frameColumns[10:20]] == [fData.slots for fData in fDataList[10:20]])
+            assert(frameColumns[-1].slots == fDataList[-1].slots)
+
+        _, lf_list = parse(test_file, eflr_only=True)
+        lf = lf_list[0]
+        # the number of records is not known
+        lf.frameIndex = {}
+        frameName = ObName.instance(2, 0, '800T')
+        for fData in full.frameDataDict[frameName]:
+            lf._addIFLR(fData)
+        irregular = FrameData(2302, frameName)
+        irregular.slots = [1.0, 2.0]
+        lf._addIFLR(irregular)
+        frameColumns = lf.frameDataDict[frameName]
+        assert(len(frameColumns) == 2302 and len(frameColumns.frameNumbers) == 2302)
+        assert(len(frameColumns._frameNumbers._data) > 2302)
+        lf._addIFLR(EoD(frameName, 0))
+        assert(len(frameColumns._frameNumbers._data) == 2302)
+        assert(frameColumns[-1].slots == [1.0, 2.0] and frameColumns[-1].frameNumber == 2302)
+        assert(frameColumns[-2].slots == full.frameDataDict[frameName][-1].slots)
+
+        frameColumns = FrameColumns(frameName, full._getSimpleChannelsFromFrame(frameName), 10)
+        for fData in full.frameDataDict[frameName][:20]:
+            frameColumns.append(fData)
+        if np is not None:
+            with open_dlis(test_file) as fs:
+                frameNumbers, columns = full.readFrameArrays(frameName, fs)
+            frameColumns.extendColumns(frameNumbers[20:], [column[20:] for column in columns.values()])
+            assert([fData.slots for fData in frameColumns] ==
+                   [fData.slots for fData in full.frameDataDict[frameName]])
+
+
+    def testIterFrameBatches(self):
+        """
+        FData records of a frame are read batch by batch, each batch is decoded into one array per channel.
+        :return:
+        """
+        test_file = path.join(parent_path,'data','206_05a-_3_DWL_DWL_WIRE_258276498.DLIS')
+        _, lf_list = parse(test_file)
+        fDataDict = lf_list[0].frameDataDict
+        _, lf_list = parse(test_file, eflr_only=True)
+        lf = lf_list[0]
+        structDecoders = {frameName: StructFrameDecoder(lf._getSimpleChannelsFromFrame(frameName))
+                          for frameName in lf.frameIndex if lf._getFrameDecoder(frameName) is not None}
+        assert(len(structDecoders) > 0)
+        for frameDecoders in (None, structDecoders, {frameName: None for frameName in lf.frameIndex}):
+            if frameDecoders is not None:
+                lf.frameDecoders = frameDecoders
+            for frameName, fDataList in fDataDict.items():
+                frameNumbers = []
+                rows = []
+                for batchFrameNumbers, columns in lf.iter_frame_batches(frameName, batch_size=500):
+                    assert(len(batchFrameNumbers) == min(500, len(fDataList) - len(frameNumbers)))
+                    assert(list(columns.keys()) == [c.ObName for c in lf._getSimpleChannelsFromFrame(frameName)])
+                    frameNumbers.extend(batchFrameNumbers)
+                    rows.extend(zip(*[column.tolist() for column in columns.values()]))
+                assert(frameNumbers == [fData.frameNumber for fData in fDataList])
+                assert([list(row) for row in rows] == [fData.slots for fData in fDataList])
+        assert(len(lf.frameDataDict) == 0)
+
+        _, lf_list = parse(test_file, eflr_only=True, channels=['SMSC'])
+        lf = lf_list[0]
+        frameName = ObName.instance(2, 0, '800T')
+        with open(test_file, 'rb') as fs:
+            batches = list(lf.iter_frame_batches(frameName, fs=fs))
+        assert(len(batches) == 1 and list(batches[0][1].keys()) == [ObName.instance(2, 0, 'SMSC')])
+        assert(batches[0][1][ObName.instance(2, 0, 'SMSC')].tolist() ==
+               [fData.slots[39] for fData in fDataDict[frameName]])
+
+        # a logical file read forward only has no segment table to find the records
+        with open(test_file, 'rb') as fs:
+            _, lf_list = parse(fs, eflr_only=True, forward_only=True)
+            try:
+                next(lf_list[0].iter_frame_batches(frameName, fs=fs))
+                assert(False)
+            except Exception as e:
+                assert('forward_only' in str(e))
+
+
     def testMultiLogicalFile(self):
         """
         A test case to verify that one physical .DLIS file including multiple logical files.
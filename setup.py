@@ -14,6 +14,7 @@ setuptools.setup(
     url="https://github.com/teradata/dlispy",
     packages=setuptools.find_packages(exclude=["tests.*", "tests"]),
     include_package_data=True,
+    extras_require={'numpy': ['numpy']},
     install_requires=['atomicwrites==1.1.5',
                       'attrs==18.1.0',
                       'click==6.7',